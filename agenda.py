@@ -0,0 +1,206 @@
+# agenda.py
+"""
+Índice temporal del calendario: partidos ordenados por fecha y hora (bisect), consultas por
+rango y detección incremental de conflictos de programación.
+
+Conflictos que se controlan al agregar o reprogramar un partido:
+- 'descanso': un equipo juega dos partidos consecutivos con menos de `descanso_minimo`
+  entre inicios.
+- 'horario': más de `capacidad` partidos se superponen en la misma franja (`duracion`).
+Solo se miran los vecinos en el índice (bisect), nunca todos los pares.
+"""
+import os
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple
+import pandas as pd
+from eventos import PartidoAgregado, PartidoReprogramado, CruceActualizado
+from metricas import leer_excel
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVO_GRUPOS = "FIFA_Sub20_2025_FaseGrupos partidos.xlsx"
+
+
+class Conflicto(NamedTuple):
+    tipo: str          # 'descanso' | 'horario'
+    match_id: str
+    otro: str
+    detalle: str
+
+
+def inicio_partido(p):
+    """datetime de inicio del partido, o None si no tiene fecha."""
+    if not p.fecha:
+        return None
+    try:
+        return datetime.strptime(f"{p.fecha} {p.hora or '00:00'}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def fechas_oficiales_grupos(path=None):
+    """{frozenset({país local, país visitante}): (fecha, hora)} del fixture oficial de grupos."""
+    from core import fecha_iso, hora_hhmm    # core importa este módulo a través de Torneo
+    path = path or os.path.join(SCRIPT_DIR, ARCHIVO_GRUPOS)
+    if not os.path.exists(path):
+        return {}
+    df = leer_excel(path)
+    return {frozenset((str(r['Equipo Local']).strip(), str(r['Equipo Visitante']).strip())):
+            (fecha_iso(r['Fecha']), hora_hhmm(r['Hora'])) for _, r in df.iterrows()}
+
+
+class AgendaPartidos:
+    def __init__(self, torneo, descanso_minimo=timedelta(hours=48), duracion=timedelta(hours=2), capacidad=2):
+        self.torneo = torneo
+        self.descanso_minimo = descanso_minimo
+        self.duracion = duracion
+        self.capacidad = capacidad
+        self._construida = False
+        self._orden: List[tuple] = []                  # [(inicio, match_id)] ordenado
+        self._por_equipo: Dict[str, List[tuple]] = {}  # id_equipo -> [(inicio, match_id)] ordenado
+        self._indexado: Dict[str, tuple] = {}          # match_id -> (inicio, id1, id2) tal como se indexó
+        self._conflictos: Dict[tuple, Conflicto] = {}  # (tipo, id menor, id mayor) -> Conflicto
+        self._por_partido: Dict[str, set] = {}         # match_id -> claves de sus conflictos
+        torneo.eventos.suscribir(self._al_cambiar, (PartidoAgregado, PartidoReprogramado, CruceActualizado))
+
+    def invalidar(self):
+        self._construida = False
+
+    def _al_cambiar(self, evento):
+        if self._construida:
+            self._reindexar(evento.match_id)
+
+    def _asegurar(self):
+        if self._construida:
+            return
+        self._orden, self._por_equipo, self._indexado = [], {}, {}
+        self._conflictos, self._por_partido = {}, {}
+        self._construida = True
+        for mid in self.torneo.calendario:
+            self._reindexar(mid)
+
+    # ============================ ÍNDICE ============================
+    def _reindexar(self, mid):
+        """Saca el partido del índice y lo vuelve a insertar con su programación actual."""
+        franjas = []
+        anterior = self._indexado.pop(mid, None)
+        if anterior is not None:
+            inicio, id1, id2 = anterior
+            self._orden.pop(bisect_left(self._orden, (inicio, mid)))
+            self._quitar_conflictos(mid)
+            for eq in (id1, id2):
+                lista = self._por_equipo[eq]
+                i = bisect_left(lista, (inicio, mid))
+                lista.pop(i)
+                # el partido anterior y el siguiente del equipo pasan a ser consecutivos
+                if 0 < i < len(lista):
+                    self._revisar_descanso(eq, lista[i - 1], lista[i])
+            franjas.append(inicio)
+
+        p = self.torneo.calendario.get(mid)
+        inicio = inicio_partido(p) if p else None
+        if inicio is not None:
+            self._indexado[mid] = (inicio, p.id_equipo1, p.id_equipo2)
+            insort(self._orden, (inicio, mid))
+            for eq in (p.id_equipo1, p.id_equipo2):
+                lista = self._por_equipo.setdefault(eq, [])
+                insort(lista, (inicio, mid))
+                i = bisect_left(lista, (inicio, mid))
+                if 0 < i < len(lista) - 1:
+                    # el anterior y el siguiente dejan de ser consecutivos
+                    self._descartar(('descanso', *sorted((lista[i - 1][1], lista[i + 1][1]))))
+                if i > 0:
+                    self._revisar_descanso(eq, lista[i - 1], lista[i])
+                if i + 1 < len(lista):
+                    self._revisar_descanso(eq, lista[i], lista[i + 1])
+            franjas.append(inicio)
+        for instante in franjas:
+            self._revisar_franja(instante)
+
+    def _superpuestos(self, inicio, excluir=None):
+        """match_ids cuyo inicio cae a menos de `duracion` de `inicio` (bisect, sin recorrer todo)."""
+        desde = bisect_right(self._orden, (inicio - self.duracion, '\uffff'))
+        hasta = bisect_left(self._orden, (inicio + self.duracion, ''))
+        return [m for _, m in self._orden[desde:hasta] if m != excluir]
+
+    def _revisar_descanso(self, eq, previo, siguiente):
+        separacion = siguiente[0] - previo[0]
+        if separacion < self.descanso_minimo:
+            horas = separacion.total_seconds() / 3600
+            self._agregar('descanso', previo[1], siguiente[1], f"{self._nombre(eq)} juega con {horas:.0f} h de diferencia")
+
+    def _revisar_franja(self, instante):
+        """
+        Solo cambia la saturación de los partidos que se superponen con `instante`: se
+        descartan sus conflictos de horario y se recalculan contra sus propios vecinos.
+        """
+        afectados = self._superpuestos(instante)
+        for m in afectados:
+            for clave in [c for c in self._por_partido.get(m, ()) if c[0] == 'horario']:
+                self._descartar(clave)
+        for m in afectados:
+            inicio = self._indexado[m][0]
+            vecinos = self._superpuestos(inicio, excluir=m)
+            for otro in vecinos:
+                if len(vecinos) >= self.capacidad or len(self._superpuestos(self._indexado[otro][0], excluir=otro)) >= self.capacidad:
+                    self._agregar('horario', m, otro, f"más de {self.capacidad} partidos superpuestos a las {inicio:%d/%m %H:%M}")
+
+    def _agregar(self, tipo, a, b, detalle):
+        a, b = sorted((a, b))
+        clave = (tipo, a, b)
+        if clave in self._conflictos:
+            return
+        self._conflictos[clave] = Conflicto(tipo, a, b, detalle)
+        self._por_partido.setdefault(a, set()).add(clave)
+        self._por_partido.setdefault(b, set()).add(clave)
+
+    def _descartar(self, clave):
+        c = self._conflictos.pop(clave, None)
+        if c is None:
+            return
+        for m in (c.match_id, c.otro):
+            claves = self._por_partido.get(m)
+            if claves:
+                claves.discard(clave)
+
+    def _quitar_conflictos(self, mid):
+        for clave in list(self._por_partido.pop(mid, ())):
+            self._descartar(clave)
+
+    def _nombre(self, id_equipo):
+        e = self.torneo.equipos.get(id_equipo)
+        return e.pais if e else id_equipo
+
+    # ============================ CONSULTAS ============================
+    def entre(self, desde, hasta):
+        """match_ids con inicio en [desde, hasta), en orden cronológico."""
+        self._asegurar()
+        i = bisect_left(self._orden, (desde, ''))
+        j = bisect_left(self._orden, (hasta, ''))
+        return [mid for _, mid in self._orden[i:j]]
+
+    def del_dia(self, fecha):
+        """Partidos de un día ('2025-10-01', date o datetime)."""
+        dia = pd.Timestamp(fecha).to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.entre(dia, dia + timedelta(days=1))
+
+    def proximas_horas(self, horas=3, ahora=None):
+        ahora = ahora or datetime.now()
+        return self.entre(ahora, ahora + timedelta(hours=horas))
+
+    def proximo_de(self, id_equipo, ahora=None):
+        """match_id del próximo partido del equipo desde `ahora`, o None."""
+        self._asegurar()
+        lista = self._por_equipo.get(id_equipo, [])
+        i = bisect_left(lista, (ahora or datetime.now(), ''))
+        return lista[i][1] if i < len(lista) else None
+
+    def conflictos_de(self, match_id):
+        """Conflictos del partido, vistos desde él (match_id siempre es el consultado)."""
+        self._asegurar()
+        return sorted(c if c.match_id == match_id else c._replace(match_id=match_id, otro=c.match_id)
+                      for c in (self._conflictos[k] for k in self._por_partido.get(match_id, ())))
+
+    def todos_los_conflictos(self):
+        self._asegurar()
+        return sorted(self._conflictos.values())
@@ -0,0 +1,593 @@
+# api.py
+"""
+Servicio HTTP/JSON local (solo biblioteca estándar, asyncio) sobre el Torneo.
+
+    GET  /api/posiciones               tablas de todos los grupos
+    GET  /api/posiciones/<grupo>       tabla de un grupo (?jornada=N: al cierre de esa jornada, 409 si no cerró)
+    GET  /api/trayectoria/<id_equipo>  posición y puntos del equipo jornada a jornada
+    GET  /api/partidos?fase=&grupo=    fixture filtrado
+    GET  /api/resultados               partidos con resultado
+    GET  /api/llaves                   partidos de eliminación por fase
+    GET  /api/agenda?fecha=AAAA-MM-DD  partidos del día en orden de inicio
+    GET  /api/conflictos               descansos insuficientes y horarios superpuestos
+    GET  /api/cara_a_cara?a=&b=        historial entre dos selecciones (todas las ediciones)
+    GET  /api/historial?equipo=&fase=  récord de una selección por fase
+    GET  /api/render/<vista>.<svg|png> llave, posiciones o grupo-X como imagen (render.py)
+    POST /api/resultados/<match_id>    {"goles_e1": 2, "goles_e2": 1, "ta1": 0, ..., "penales": [4, 3]}
+                                       (requiere "Authorization: Bearer <token>"; tarjetas y
+                                       penales omitidos conservan los del partido)
+    GET  /api/stream?desde=<id>        server-sent events con un diff por cambio
+    GET  /metrics                      métricas en formato Prometheus (con MUNDIAL_METRICAS)
+
+Las lecturas se sirven desde respuestas ya serializadas y cacheadas por versión del
+torneo, con ETag: entre un resultado y el siguiente cada consulta es un lookup.
+Torneo.version vuelve a 0 en cada proceso, así que los ETag y los ids del stream llevan
+además un identificador del arranque: los de una ejecución anterior nunca coinciden.
+"""
+import os
+import json
+import hmac
+import asyncio
+import threading
+import queue
+from collections import deque
+from datetime import date
+from concurrent.futures import Future
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from eventos import ResultadoRegistrado, FaseAvanzada
+from enfrentamientos import obtener_indice
+from planificador import obtener_planificador
+from render import RenderizadorTorneo, FORMATOS
+import metricas
+
+ARRANQUE = os.urandom(4).hex()    # distingue esta ejecución de las anteriores
+FASES_ELIMINACION = ['Dieciseisavos', 'Octavos', 'Cuartos', 'Semifinal', 'Tercer puesto', 'Final']
+
+
+# ============================ VISTAS (dicts serializables) ============================
+class VistaNoDisponible(LookupError):
+    """La vista existe pero todavía no tiene datos (p. ej. una jornada que no cerró)."""
+
+
+def _fila_posicion(pos, e):
+    return {'pos': pos, 'id': e.identificador, 'equipo': e.pais, 'abreviatura': e.abreviatura,
+            **{k: e.stats.get(k, 0) for k in ('PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts')}}
+
+
+def vista_posiciones(torneo, grupo=None):
+    grupos = [grupo] if grupo else sorted(torneo.grupos)
+    return {g: [_fila_posicion(i, e) for i, e in enumerate(torneo.calcular_tabla_posiciones(g), start=1)]
+            for g in grupos}
+
+
+def vista_posiciones_jornada(torneo, grupo, jornada):
+    tabla = torneo.historial.tabla(grupo, jornada)
+    if tabla is None:
+        raise VistaNoDisponible(f"la jornada {jornada} del grupo {grupo} todavía no cerró")
+    return [{'pos': i, 'id': f.id, 'equipo': torneo.equipos[f.id].pais, **f._asdict()}
+            for i, f in enumerate(tabla, start=1)]
+
+
+def vista_trayectoria(torneo, id_equipo):
+    return [t._asdict() for t in torneo.historial.trayectoria(id_equipo)]
+
+
+def _partido_json(torneo, mid, p):
+    e1 = torneo.equipos.get(p.id_equipo1)
+    e2 = torneo.equipos.get(p.id_equipo2)
+    return {
+        'id': mid, 'codigo': p.codigo, 'fase': p.fase, 'grupo': p.grupo, 'jornada': p.jornada,
+        'fecha': p.fecha, 'hora': p.hora,
+        'equipo1': e1.pais if e1 else p.id_equipo1, 'equipo2': e2.pais if e2 else p.id_equipo2,
+        'id_equipo1': p.id_equipo1, 'id_equipo2': p.id_equipo2,
+        'goles_e1': p.goles_e1, 'goles_e2': p.goles_e2,
+        'penales': p.penales,
+    }
+
+
+def vista_partidos(torneo, fase=None, grupo=None):
+    out = []
+    for mid, p in torneo.calendario.items():
+        if fase and p.fase != fase:
+            continue
+        if grupo:
+            g = p.grupo or getattr(torneo.equipos.get(p.id_equipo1), 'grupo', '')
+            if g != grupo:
+                continue
+        out.append(_partido_json(torneo, mid, p))
+    return out
+
+
+def vista_resultados(torneo):
+    return [_partido_json(torneo, mid, p) for mid, p in torneo.calendario.items()
+            if p.goles_e1 is not None and p.goles_e2 is not None]
+
+
+def vista_llaves(torneo):
+    llaves = {}
+    for mid, p in torneo.calendario.items():
+        if p.fase != "Fase de Grupos":
+            llaves.setdefault(p.fase, []).append(_partido_json(torneo, mid, p))
+    orden = {f: i for i, f in enumerate(FASES_ELIMINACION)}
+    return dict(sorted(llaves.items(), key=lambda kv: orden.get(kv[0], len(orden))))
+
+
+def vista_agenda(torneo, fecha):
+    return [_partido_json(torneo, mid, torneo.calendario[mid]) for mid in torneo.agenda.del_dia(fecha)]
+
+
+def vista_conflictos(torneo):
+    return [c._asdict() for c in torneo.agenda.todos_los_conflictos()]
+
+
+def vista_cara_a_cara(indice, pais_a, pais_b):
+    return {'equipo': pais_a, 'rival': pais_b, 'totales': indice.cara_a_cara(pais_a, pais_b)}
+
+
+def vista_historial_equipo(indice, pais, fase=None):
+    if fase:
+        return {fase: indice.en_fase(pais, fase)}
+    return indice.por_fase(pais)
+
+
+def diff_evento(torneo, evento):
+    """Cambio compacto para el stream: el partido, las dos filas de posiciones afectadas y la llave."""
+    if isinstance(evento, FaseAvanzada):
+        return {'seq': evento.version, 'tipo': 'fase', 'fase_anterior': evento.fase_anterior,
+                'fase_nueva': evento.fase_nueva}
+    p = evento.partido
+    diff = {'seq': evento.version, 'tipo': 'resultado', 'accion': evento.accion,
+            'partido': _partido_json(torneo, evento.match_id, p), 'posiciones': [], 'llave': None}
+    for id_equipo in (p.id_equipo1, p.id_equipo2):
+        e = torneo.equipos.get(id_equipo)
+        if e is None or not e.grupo or p.fase != "Fase de Grupos":
+            continue
+        tabla = torneo.calcular_tabla_posiciones(e.grupo)
+        diff['posiciones'].append(dict(_fila_posicion(tabla.index(e) + 1, e), grupo=e.grupo))
+    if p.fase != "Fase de Grupos" and p.jugado():
+        # a qué partido y lado pasa cada equipo (match_id None si ese cruce todavía no se creó)
+        cuadro = getattr(torneo, 'cuadro', None)
+        diff['llave'] = {'match_id': evento.match_id, 'fase': p.fase, 'ganador': p.ganador(),
+                         'destinos': cuadro.destinos(torneo, p.codigo) if cuadro and p.codigo else []}
+    return diff
+
+
+class _ClienteStream:
+    def __init__(self, capacidad, pendientes):
+        self.cola = asyncio.Queue(maxsize=capacidad)
+        self.pendientes = deque(pendientes)   # backlog para reanudar (se envía primero)
+        self.desbordado = False
+
+
+class DifusorEventos:
+    """
+    Reparte los diffs a los clientes del stream. Cada cliente tiene una cola acotada:
+    si se llena, se lo desconecta (puede reconectarse con Last-Event-ID) en lugar de
+    frenar a quien registra resultados. Se guardan los últimos diffs para reanudar.
+    """
+    def __init__(self, torneo, capacidad_cliente=256, historial=2048):
+        self.torneo = torneo
+        self.capacidad_cliente = capacidad_cliente
+        self._historial = deque(maxlen=historial)   # (seq, mensaje SSE)
+        self._clientes = set()
+        self._seq_descartado = 0   # lo anterior a esta secuencia ya no se puede reenviar
+        self._loop = None
+        self._token = None
+
+    def conectar(self, loop):
+        self._loop = loop
+        self._seq_descartado = self.torneo.version
+        self._token = self.torneo.eventos.suscribir(self._al_evento, (ResultadoRegistrado, FaseAvanzada))
+
+    def desconectar(self):
+        if self._token is not None:
+            self.torneo.eventos.desuscribir(self._token)
+            self._token = None
+
+    def _al_evento(self, evento):
+        # corre en el hilo del torneo: se arma el diff ahí y se pasa al loop sin bloquear
+        diff = diff_evento(self.torneo, evento)
+        datos = json.dumps(diff, ensure_ascii=False)
+        mensaje = f"id: {ARRANQUE}-{diff['seq']}\nevent: {diff['tipo']}\ndata: {datos}\n\n".encode('utf-8')
+        self._loop.call_soon_threadsafe(self._difundir, diff['seq'], mensaje)
+
+    def _difundir(self, seq, mensaje):
+        if len(self._historial) == self._historial.maxlen:
+            self._seq_descartado = self._historial[0][0]
+        self._historial.append((seq, mensaje))
+        for cliente in list(self._clientes):
+            try:
+                cliente.cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                self._clientes.discard(cliente)
+                cliente.desbordado = True
+                cliente.cola.get_nowait()
+                cliente.cola.put_nowait(None)   # despierta al cliente para que cierre
+
+    def suscribir(self, desde=None):
+        """
+        Registra un cliente. Con `desde` se le reenvía lo ocurrido después de esa secuencia;
+        devuelve None si eso ya salió del historial (el cliente debe pedir el estado completo).
+        """
+        pendientes = []
+        if desde is not None:
+            if desde < self._seq_descartado:
+                return None
+            pendientes = [m for seq, m in self._historial if seq > desde]
+        cliente = _ClienteStream(self.capacidad_cliente, pendientes)
+        self._clientes.add(cliente)
+        return cliente
+
+    def quitar(self, cliente):
+        self._clientes.discard(cliente)
+
+
+def _seq_evento(id_evento):
+    """Secuencia de un id del stream ('<arranque>-<seq>'); -1 si es de otra ejecución y no se puede reanudar."""
+    arranque, _, seq = id_evento.rpartition('-')
+    return int(seq) if arranque == ARRANQUE and seq.isdigit() else -1
+
+
+# ============================ DESPACHO AL HILO DEL TORNEO ============================
+def despacho_directo(fn):
+    """El torneo vive en el mismo hilo que el loop (modo sin interfaz)."""
+    fut = Future()
+    try:
+        fut.set_result(fn())
+    except Exception as ex:
+        fut.set_exception(ex)
+    return fut
+
+
+class DespachoTk:
+    """
+    Ejecuta las funciones en el hilo de Tk (dueño del Torneo y de las ventanas suscriptas)
+    mediante una cola que se vacía con una tarea periódica del planificador.
+    """
+    def __init__(self, root, intervalo_ms=50):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self._cola = queue.Queue()
+        obtener_planificador(root).cada("api:despacho", self.intervalo_ms, self._procesar)
+
+    def __call__(self, fn):
+        fut = Future()
+        self._cola.put((fn, fut))
+        return fut
+
+    def _procesar(self):
+        while True:
+            try:
+                fn, fut = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fut.set_result(fn())
+            except Exception as ex:
+                fut.set_exception(ex)
+
+
+# ============================ SERVIDOR ============================
+def _penales(valor):
+    """{'p1': a, 'p2': b} desde [a, b] o {"p1": a, "p2": b}; None si viene null."""
+    if valor is None:
+        return None
+    if isinstance(valor, dict):
+        valor = (valor['p1'], valor['p2'])
+    if not isinstance(valor, (list, tuple)) or len(valor) != 2:
+        raise ValueError("'penales' debe ser [local, visitante]")
+    return {'p1': int(valor[0]), 'p2': int(valor[1])}
+
+
+class ServidorAPI:
+    def __init__(self, torneo, token=None, despachar=despacho_directo):
+        self.torneo = torneo
+        self.token = token if token is not None else os.environ.get("MUNDIAL_API_TOKEN", "")
+        self.despachar = despachar
+        self._cache = {}   # ruta+query -> (version, etag, cuerpo)
+        self.difusor = DifusorEventos(torneo)
+        self.renderizador = None
+        self._server = None
+        self.loop = None
+        self.puerto = None
+        self._rutas_get = [
+            (('api', 'posiciones'), lambda q: vista_posiciones(self.torneo)),
+            (('api', 'partidos'), lambda q: vista_partidos(self.torneo, q.get('fase'), q.get('grupo'))),
+            (('api', 'resultados'), lambda q: vista_resultados(self.torneo)),
+            (('api', 'llaves'), lambda q: vista_llaves(self.torneo)),
+            (('api', 'conflictos'), lambda q: vista_conflictos(self.torneo)),
+        ]
+
+    # ----------------------------- ciclo de vida -----------------------------
+    async def iniciar(self, host="127.0.0.1", puerto=8765):
+        self._server = await asyncio.start_server(self._atender, host, puerto)
+        self.puerto = self._server.sockets[0].getsockname()[1]
+        self.difusor.conectar(asyncio.get_running_loop())
+        return self.puerto
+
+    async def detener(self):
+        self.difusor.desconectar()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def iniciar_en_hilo(self, host="127.0.0.1", puerto=8765):
+        """Levanta el servidor en un hilo propio (para usarlo junto a la UI). Devuelve el puerto."""
+        listo = threading.Event()
+
+        def _correr():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.iniciar(host, puerto))
+            listo.set()
+            self.loop.run_forever()
+        threading.Thread(target=_correr, name="api-torneo", daemon=True).start()
+        listo.wait()
+        return self.puerto
+
+    # ----------------------------- HTTP -----------------------------
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, objetivo, version_http = linea.decode('latin-1').split()
+                except ValueError:
+                    await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': 'solicitud inválida'})
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    k, _, v = h.decode('latin-1').partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                cuerpo = b''
+                largo = int(headers.get('content-length', 0) or 0)
+                if largo:
+                    cuerpo = await reader.readexactly(largo)
+                mantener = version_http == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                seguir = await self._despachar_http(writer, metodo, objetivo, headers, cuerpo, mantener)
+                if not mantener or not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _despachar_http(self, writer, metodo, objetivo, headers, cuerpo, mantener):
+        url = urlsplit(objetivo)
+        partes = tuple(p for p in url.path.split('/') if p)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if metodo == 'GET' and partes == ('api', 'stream'):
+            await self._stream(writer, headers, query)
+            return False
+        if metodo == 'GET' and partes == ('metrics',):
+            if not metricas.ACTIVO:
+                await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': 'métricas desactivadas'}, mantener=mantener)
+            else:
+                await self._escribir(writer, HTTPStatus.OK, metricas.REGISTRO.texto_prometheus().encode('utf-8'),
+                                     {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}, mantener)
+        elif metodo == 'GET':
+            await self._get(writer, partes, query, url, headers, mantener)
+        elif metodo == 'POST' and partes[:2] == ('api', 'resultados') and len(partes) == 3:
+            await self._post_resultado(writer, partes[2], headers, cuerpo, mantener)
+        else:
+            await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': 'ruta no encontrada'}, mantener=mantener)
+        return True
+
+    async def _stream(self, writer, headers, query, intervalo_ping=15):
+        desde = headers.get('last-event-id') or query.get('desde')
+        desde = _seq_evento(desde) if desde else None
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\nretry: 2000\n\n")
+        cliente = self.difusor.suscribir(desde)
+        if cliente is None:
+            # se perdieron eventos: el cliente debe volver a pedir el estado completo
+            writer.write(f"event: reset\ndata: {{\"version\": {self.torneo.version}}}\n\n".encode())
+            cliente = self.difusor.suscribir()
+        try:
+            while cliente.pendientes:
+                writer.write(cliente.pendientes.popleft())
+            await writer.drain()
+            while True:
+                try:
+                    mensaje = await asyncio.wait_for(cliente.cola.get(), intervalo_ping)
+                except asyncio.TimeoutError:
+                    mensaje = b": ping\n\n"
+                if mensaje is None or cliente.desbordado:
+                    break
+                writer.write(mensaje)
+                await writer.drain()
+        finally:
+            self.difusor.quitar(cliente)
+
+    async def _get(self, writer, partes, query, url, headers, mantener):
+        generador = None
+        if partes[:2] == ('api', 'render') and len(partes) == 3:
+            await self._render(writer, partes[2], headers, mantener)
+            return
+        if partes[:2] == ('api', 'posiciones') and len(partes) == 3:
+            grupo = partes[2].upper()
+            if grupo not in self.torneo.grupos:
+                await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': f'grupo {grupo} inexistente'}, mantener=mantener)
+                return
+            if 'jornada' in query:
+                if not query['jornada'].isdigit():
+                    await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': 'jornada inválida'}, mantener=mantener)
+                    return
+                generador = lambda q: vista_posiciones_jornada(self.torneo, grupo, int(q['jornada']))
+            else:
+                generador = lambda q: vista_posiciones(self.torneo, grupo)
+        elif partes[:2] == ('api', 'trayectoria') and len(partes) == 3:
+            id_equipo = partes[2].upper()
+            if id_equipo not in self.torneo.equipos:
+                await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': f'equipo {id_equipo} inexistente'}, mantener=mantener)
+                return
+            generador = lambda q: vista_trayectoria(self.torneo, id_equipo)
+        elif partes == ('api', 'agenda'):
+            try:
+                date.fromisoformat(query.get('fecha', ''))
+            except ValueError:
+                await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': 'fecha inválida (AAAA-MM-DD)'}, mantener=mantener)
+                return
+            generador = lambda q: vista_agenda(self.torneo, q['fecha'])
+        elif partes == ('api', 'cara_a_cara'):
+            if not query.get('a') or not query.get('b'):
+                await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': 'faltan los parámetros a y b'}, mantener=mantener)
+                return
+            generador = lambda q: vista_cara_a_cara(obtener_indice(self.torneo), q['a'], q['b'])
+        elif partes == ('api', 'historial'):
+            if not query.get('equipo'):
+                await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': 'falta el parámetro equipo'}, mantener=mantener)
+                return
+            generador = lambda q: vista_historial_equipo(obtener_indice(self.torneo), q['equipo'], q.get('fase'))
+        else:
+            generador = next((g for ruta, g in self._rutas_get if partes == ruta), None)
+        if generador is None:
+            await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': 'ruta no encontrada'}, mantener=mantener)
+            return
+
+        try:
+            version, etag, cuerpo = await self._respuesta_cacheada(url.path + '?' + url.query, generador, query)
+        except VistaNoDisponible as ex:
+            await self._responder(writer, HTTPStatus.CONFLICT, {'error': str(ex)}, mantener=mantener)
+            return
+        if headers.get('if-none-match') == etag:
+            await self._escribir(writer, HTTPStatus.NOT_MODIFIED, b'', {'ETag': etag}, mantener)
+            return
+        await self._escribir(writer, HTTPStatus.OK, cuerpo, {'ETag': etag, 'Content-Type': 'application/json; charset=utf-8',
+                                                              'Cache-Control': 'no-cache'}, mantener)
+
+    async def _respuesta_cacheada(self, clave, generador, query):
+        version = self.torneo.version
+        cacheada = self._cache.get(clave)
+        if cacheada and cacheada[0] == version:
+            return cacheada
+        # la vista se arma en el hilo dueño del torneo para no leerlo mientras se modifica
+        datos = await asyncio.wrap_future(self.despachar(lambda: (self.torneo.version, generador(query))))
+        version, vista = datos
+        cuerpo = json.dumps(vista, ensure_ascii=False).encode('utf-8')
+        entrada = (version, f'"{ARRANQUE}-v{version}"', cuerpo)
+        if len(self._cache) > 256:  # consultas con query arbitraria no deben crecer sin límite
+            self._cache.clear()
+        self._cache[clave] = entrada
+        return entrada
+
+    async def _render(self, writer, nombre, headers, mantener):
+        vista, _, formato = nombre.rpartition('.')
+
+        def _obtener():
+            if self.renderizador is None:
+                self.renderizador = RenderizadorTorneo(self.torneo)
+                self.renderizador.conectar()
+            if vista not in self.renderizador.vistas():
+                return None
+            return self.renderizador.obtener(vista, formato)
+
+        if formato not in FORMATOS:
+            await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': 'formato desconocido (svg o png)'}, mantener=mantener)
+            return
+        ruta = await asyncio.wrap_future(self.despachar(_obtener))
+        if ruta is None:
+            await self._responder(writer, HTTPStatus.NOT_FOUND, {'error': f'vista {vista} inexistente'}, mantener=mantener)
+            return
+        # la huella del contenido ya está en el nombre del archivo
+        etag = f'"{os.path.basename(ruta)}"'
+        if headers.get('if-none-match') == etag:
+            await self._escribir(writer, HTTPStatus.NOT_MODIFIED, b'', {'ETag': etag}, mantener)
+            return
+        with open(ruta, 'rb') as f:
+            cuerpo = f.read()
+        await self._escribir(writer, HTTPStatus.OK, cuerpo, {'ETag': etag, 'Content-Type': FORMATOS[formato],
+                                                              'Cache-Control': 'no-cache'}, mantener)
+
+    async def _post_resultado(self, writer, match_id, headers, cuerpo, mantener):
+        auth = headers.get('authorization', '')
+        esperado = f"Bearer {self.token}"
+        if not self.token or not hmac.compare_digest(auth.encode(), esperado.encode()):
+            await self._responder(writer, HTTPStatus.UNAUTHORIZED, {'error': 'token inválido'}, mantener=mantener)
+            return
+        try:
+            datos = json.loads(cuerpo or b'{}')
+            g1 = int(datos['goles_e1']); g2 = int(datos['goles_e2'])
+            tarjetas = {k: int(datos[k]) for k in ('ta1', 'ta2', 'tr1', 'tr2') if datos.get(k) is not None}
+            conservar_penales = 'penales' not in datos
+            penales = None if conservar_penales else _penales(datos['penales'])
+            if min(g1, g2, *tarjetas.values(), *(penales or {}).values()) < 0:
+                raise ValueError("valores negativos")
+        except (ValueError, KeyError, TypeError) as ex:
+            await self._responder(writer, HTTPStatus.BAD_REQUEST, {'error': f'datos inválidos: {ex}'}, mantener=mantener)
+            return
+
+        def _registrar():
+            # se valida antes para que registrar_resultado no abra diálogos de error
+            if not self.torneo.configuracion_cerrada:
+                return HTTPStatus.CONFLICT, {'error': 'la configuración del torneo no está cerrada'}
+            p = self.torneo.calendario.get(match_id)
+            if p is None:
+                return HTTPStatus.NOT_FOUND, {'error': f'partido {match_id} no encontrado'}
+            if p.id_equipo1 not in self.torneo.equipos or p.id_equipo2 not in self.torneo.equipos:
+                return HTTPStatus.CONFLICT, {'error': 'equipos del partido no cargados'}
+            # una corrección que solo trae el marcador conserva tarjetas y penales
+            actuales = {'ta1': p.tarj_ama_e1, 'ta2': p.tarj_ama_e2, 'tr1': p.tarj_roja_e1, 'tr2': p.tarj_roja_e2}
+            for k, v in actuales.items():
+                tarjetas.setdefault(k, v or 0)
+            pen = p.penales if conservar_penales and g1 == g2 else penales
+            if p.fase != "Fase de Grupos" and g1 == g2 and (not pen or pen['p1'] == pen['p2']):
+                return HTTPStatus.BAD_REQUEST, {'error': 'empate en eliminación sin definición por penales'}
+            self.torneo.registrar_resultado(match_id, g1, g2, jugador_stats=datos.get('jugador_stats'),
+                                            penales=pen, **tarjetas)
+            return HTTPStatus.OK, _partido_json(self.torneo, match_id, p)
+
+        estado, respuesta = await asyncio.wrap_future(self.despachar(_registrar))
+        await self._responder(writer, estado, respuesta, mantener=mantener)
+
+    async def _responder(self, writer, estado, datos, mantener=False):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        await self._escribir(writer, estado, cuerpo, {'Content-Type': 'application/json; charset=utf-8'}, mantener)
+
+    async def _escribir(self, writer, estado, cuerpo, headers, mantener):
+        lineas = [f"HTTP/1.1 {estado.value} {estado.phrase}",
+                  f"Content-Length: {len(cuerpo)}",
+                  f"Connection: {'keep-alive' if mantener else 'close'}"]
+        lineas += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lineas) + "\r\n\r\n").encode('latin-1') + cuerpo)
+        await writer.drain()
+
+
+# ============================ EJECUCIÓN SIN INTERFAZ ============================
+def main():
+    import argparse
+    import core
+    from core import Torneo
+    from llaves import cargar_llaves
+
+    ap = argparse.ArgumentParser(description="API JSON local del torneo")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8765)
+    ap.add_argument("--token", default=None, help="token para escrituras (o MUNDIAL_API_TOKEN)")
+    args = ap.parse_args()
+
+    core.modo_sin_interfaz()
+    torneo = Torneo()
+    # sin la UI nadie más conecta el cuadro: los resultados de eliminación deben propagarse solos
+    cargar_llaves(torneo.formato).conectar(torneo)
+
+    async def _correr():
+        servidor = ServidorAPI(torneo, token=args.token)
+        puerto = await servidor.iniciar(args.host, args.puerto)
+        print(f"API del torneo en http://{args.host}:{puerto}/api/posiciones")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(_correr())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# archivo_historico.py
+"""
+Archivo histórico de todos los mundiales juveniles en columnas de ancho fijo.
+
+Cada columna es un archivo binario propio dentro del directorio del archivo
+(torneo.bin, anio.bin, fecha.bin, ...) y se abre con numpy.memmap, así que una consulta
+como "partidos de eliminación de Argentina desde 1977" es una máscara vectorizada sobre
+arreglos contiguos; solo se decodifican las filas del resultado.
+
+Los equipos se guardan internados (índice en la lista 'equipos' de meta.json) por nombre
+de país, que es lo único estable entre ediciones. meta.json, escrito de forma atómica al
+final de cada agregado, fija cuántas filas son válidas: un agregado interrumpido deja
+bytes de más en las columnas que el siguiente agregado recorta.
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from persistencia import escribir_atomico
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO = os.path.join(SCRIPT_DIR, "historico")
+ARCHIVO_META = "meta.json"
+
+# códigos de fase (uint8); el orden es parte del formato, solo se agregan al final
+FASES = ('Fase de Grupos', 'Octavos', 'Cuartos', 'Semifinal', 'Tercer puesto', 'Final', 'Dieciseisavos')
+CODIGO_FASE = {f: i for i, f in enumerate(FASES)}
+SIN_PENALES = -1
+
+COLUMNAS = {
+    'torneo': np.uint16,          # índice en meta['torneos']
+    'anio': np.uint16,
+    'fecha': 'datetime64[D]',     # NaT si el partido no tenía fecha
+    'fase': np.uint8,
+    'equipo1': np.uint16,
+    'equipo2': np.uint16,
+    'goles1': np.int8,
+    'goles2': np.int8,
+    'penales1': np.int8,          # SIN_PENALES si no hubo definición por penales
+    'penales2': np.int8,
+}
+
+
+def origen_torneo(torneo):
+    """Identidad estable de un Torneo en el archivo, independiente del nombre con que se agregó."""
+    return f"{torneo.nombre}|{torneo.fecha_inicio}"
+
+
+class ArchivoHistorico:
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self.meta = {'filas': 0, 'equipos': [], 'torneos': []}
+        self._ids = {}
+        self._columnas = {}
+        self.abrir()
+
+    # ============================ APERTURA ============================
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, f"{nombre}.bin")
+
+    def abrir(self):
+        ruta_meta = os.path.join(self.directorio, ARCHIVO_META)
+        if os.path.exists(ruta_meta):
+            with open(ruta_meta, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        self._ids = {nombre: i for i, nombre in enumerate(self.meta['equipos'])}
+        filas = self.meta['filas']
+        self._columnas = {}
+        for nombre, dtype in COLUMNAS.items():
+            if filas == 0:
+                # mmap no admite archivos vacíos
+                self._columnas[nombre] = np.empty(0, dtype=dtype)
+            else:
+                self._columnas[nombre] = np.memmap(self._ruta(nombre), dtype=dtype, mode='r', shape=(filas,))
+
+    def __len__(self):
+        return self.meta['filas']
+
+    def columna(self, nombre):
+        return self._columnas[nombre]
+
+    def id_equipo(self, pais):
+        return self._ids.get(pais)
+
+    @property
+    def torneos(self):
+        return list(self.meta['torneos'])
+
+    # ============================ AGREGADO ============================
+    def agregar_torneo(self, torneo, nombre=None, anio=None):
+        """Agrega de una vez todos los partidos jugados de un Torneo terminado. Devuelve cuántos."""
+        from core import ErrorTorneo
+        nombre = nombre or torneo.nombre
+        origen = origen_torneo(torneo)
+        if any(t['nombre'] == nombre for t in self.meta['torneos']):
+            raise ErrorTorneo(f"El torneo '{nombre}' ya está en el archivo histórico.")
+        repetido = next((t for t in self.meta['torneos'] if t.get('origen') == origen), None)
+        if repetido is not None:
+            raise ErrorTorneo(f"El torneo ya está en el archivo histórico como '{repetido['nombre']}'.")
+        anio = int(anio or str(torneo.fecha_inicio)[:4])
+
+        equipos = list(self.meta['equipos'])
+        ids = dict(self._ids)
+
+        def _interno(id_equipo):
+            e = torneo.equipos.get(id_equipo)
+            pais = e.pais if e else id_equipo
+            if pais not in ids:
+                ids[pais] = len(equipos)
+                equipos.append(pais)
+            return ids[pais]
+
+        jugados = [p for p in torneo.calendario.values() if p.jugado()]
+        desconocidas = sorted({p.fase for p in jugados} - set(CODIGO_FASE))
+        if desconocidas:
+            raise ErrorTorneo(f"Fases sin código en el archivo histórico: {', '.join(desconocidas)}")
+        n = len(jugados)
+        indice_torneo = len(self.meta['torneos'])
+        nuevas = {
+            'torneo': np.full(n, indice_torneo, dtype=COLUMNAS['torneo']),
+            'anio': np.full(n, anio, dtype=COLUMNAS['anio']),
+            'fecha': np.array([p.fecha or 'NaT' for p in jugados], dtype=COLUMNAS['fecha']),
+            'fase': np.array([CODIGO_FASE[p.fase] for p in jugados], dtype=COLUMNAS['fase']),
+            'equipo1': np.array([_interno(p.id_equipo1) for p in jugados], dtype=COLUMNAS['equipo1']),
+            'equipo2': np.array([_interno(p.id_equipo2) for p in jugados], dtype=COLUMNAS['equipo2']),
+            'goles1': np.array([p.goles_e1 for p in jugados], dtype=COLUMNAS['goles1']),
+            'goles2': np.array([p.goles_e2 for p in jugados], dtype=COLUMNAS['goles2']),
+            'penales1': np.array([(p.penales or {}).get('p1', SIN_PENALES) for p in jugados], dtype=COLUMNAS['penales1']),
+            'penales2': np.array([(p.penales or {}).get('p2', SIN_PENALES) for p in jugados], dtype=COLUMNAS['penales2']),
+        }
+
+        os.makedirs(self.directorio, exist_ok=True)
+        filas = self.meta['filas']
+        self._columnas = {}   # se sueltan los memmap antes de escribir (Windows no trunca archivos mapeados)
+        for columna, datos in nuevas.items():
+            ruta = self._ruta(columna)
+            with open(ruta, 'ab') as f:
+                # descarta restos de un agregado interrumpido
+                f.truncate(filas * datos.dtype.itemsize)
+                f.write(datos.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        meta = {'filas': filas + n, 'equipos': equipos,
+                'torneos': self.meta['torneos'] + [{'nombre': nombre, 'origen': origen, 'anio': anio, 'partidos': n}]}
+        escribir_atomico(os.path.join(self.directorio, ARCHIVO_META),
+                         json.dumps(meta, indent=2, ensure_ascii=False).encode('utf-8'))
+        self.abrir()
+        return n
+
+    # ============================ CONSULTAS ============================
+    def mascara(self, equipo=None, desde=None, hasta=None, fases=None, eliminacion=None, rival=None):
+        """
+        Máscara booleana de filas. `desde`/`hasta` son años (int) o fechas ('AAAA-MM-DD');
+        `eliminacion=True` deja solo partidos fuera de la fase de grupos.
+        """
+        c = self._columnas
+        m = np.ones(len(self), dtype=bool)
+        for pais in (equipo, rival):
+            if pais is None:
+                continue
+            id_pais = self.id_equipo(pais)
+            if id_pais is None:
+                return np.zeros(len(self), dtype=bool)
+            m &= (c['equipo1'] == id_pais) | (c['equipo2'] == id_pais)
+        for limite, mayor in ((desde, True), (hasta, False)):
+            if limite is None:
+                continue
+            if isinstance(limite, int):
+                m &= c['anio'] >= limite if mayor else c['anio'] <= limite
+            else:
+                fecha = np.datetime64(limite, 'D')
+                m &= c['fecha'] >= fecha if mayor else c['fecha'] <= fecha
+        if fases is not None:
+            m &= np.isin(c['fase'], [CODIGO_FASE[f] for f in fases])
+        if eliminacion is not None:
+            grupos = c['fase'] == CODIGO_FASE['Fase de Grupos']
+            m &= ~grupos if eliminacion else grupos
+        return m
+
+    def consultar(self, **filtros):
+        """Índices de las filas que cumplen los filtros de `mascara`, en orden de archivo."""
+        return np.flatnonzero(self.mascara(**filtros))
+
+    def filas(self, indices):
+        """Decodifica a dicts solo las filas pedidas."""
+        c, equipos, torneos = self._columnas, self.meta['equipos'], self.meta['torneos']
+        salida = []
+        for i in indices:
+            fecha = c['fecha'][i]
+            p1, p2 = int(c['penales1'][i]), int(c['penales2'][i])
+            salida.append({
+                'torneo': torneos[c['torneo'][i]]['nombre'],
+                'anio': int(c['anio'][i]),
+                'fecha': "" if np.isnat(fecha) else str(fecha),
+                'fase': FASES[c['fase'][i]],
+                'equipo1': equipos[c['equipo1'][i]],
+                'equipo2': equipos[c['equipo2'][i]],
+                'goles1': int(c['goles1'][i]),
+                'goles2': int(c['goles2'][i]),
+                'penales': None if p1 == SIN_PENALES else {'p1': p1, 'p2': p2},
+            })
+        return salida
+
+    def balance(self, equipo, **filtros):
+        """PJ/G/E/P/GF/GC del equipo sobre las filas filtradas (los penales cuentan como empate)."""
+        id_pais = self.id_equipo(equipo)
+        if id_pais is None:
+            return {'PJ': 0, 'G': 0, 'E': 0, 'P': 0, 'GF': 0, 'GC': 0}
+        m = self.mascara(equipo=equipo, **filtros)
+        c = self._columnas
+        local = c['equipo1'][m] == id_pais
+        g1, g2 = c['goles1'][m].astype(np.int32), c['goles2'][m].astype(np.int32)
+        gf, gc = np.where(local, g1, g2), np.where(local, g2, g1)
+        return {'PJ': int(m.sum()), 'G': int((gf > gc).sum()), 'E': int((gf == gc).sum()),
+                'P': int((gf < gc).sum()), 'GF': int(gf.sum()), 'GC': int(gc.sum())}
+
+
+# ============================ LÍNEA DE COMANDOS ============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivo histórico de mundiales juveniles.")
+    parser.add_argument('--archivo', default=DIRECTORIO, help="Directorio del archivo histórico.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    agregar = sub.add_parser('agregar', help="Agrega un torneo terminado (torneo_data.json).")
+    agregar.add_argument('datos')
+    agregar.add_argument('--nombre')
+    agregar.add_argument('--anio', type=int)
+
+    consultar = sub.add_parser('consultar', help="Lista partidos del archivo.")
+    consultar.add_argument('--equipo')
+    consultar.add_argument('--rival')
+    consultar.add_argument('--desde', type=int)
+    consultar.add_argument('--hasta', type=int)
+    consultar.add_argument('--eliminacion', action='store_true')
+
+    args = parser.parse_args(argv)
+    archivo = ArchivoHistorico(args.archivo)
+    if args.comando == 'agregar':
+        from core import Torneo, modo_sin_interfaz
+        modo_sin_interfaz()
+        torneo = Torneo(archivo=args.datos)
+        n = archivo.agregar_torneo(torneo, nombre=args.nombre, anio=args.anio)
+        print(f"Se agregaron {n} partidos ({len(archivo)} en total).")
+        return 0
+
+    filtros = dict(equipo=args.equipo, rival=args.rival, desde=args.desde, hasta=args.hasta,
+                   eliminacion=True if args.eliminacion else None)
+    for f in archivo.filas(archivo.consultar(**filtros)):
+        penales = f" ({f['penales']['p1']}-{f['penales']['p2']} pen.)" if f['penales'] else ""
+        print(f"{f['anio']} {f['fase']:<15} {f['equipo1']} {f['goles1']}-{f['goles2']} {f['equipo2']}{penales}")
+    if args.equipo:
+        print(archivo.balance(args.equipo, **{k: v for k, v in filtros.items() if k != 'equipo'}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import pandas as pd
 from utils import apply_style, center_fullscreen
-from core import load_teams_from_excel
+from core import load_teams_from_excel, leer_paises_excel, obtener_torneo, ARCHIVO_EQUIPOS
+from formatos import fixture_grupo
+from tareas import obtener_ejecutor, exportar_varios
+from pool_equipos import PoolEquipos
+from bisect import bisect_left
 import os
 
+TODAS = "Todas"
+
 class GroupAssigner:
     def __init__(self, master):
         self.master = master
@@ -12,18 +18,45 @@ class GroupAssigner:
         apply_style(self.master)
         center_fullscreen(self.master)
 
-        teams = load_teams_from_excel()
-        unique = []
-        for t in teams:
-            if isinstance(t, str) and t.strip() and t.strip() not in unique:
-                unique.append(t.strip())
-        self.pool = unique
-        self.groups_order = ['A','B','C','D','E','F']
+        self.pool = PoolEquipos()
+        formato = obtener_torneo().formato
+        self.groups_order = list(formato.grupos)
+        self.group_size = formato.equipos_por_grupo
         self.groups = {g: [] for g in self.groups_order}
+        self.asignados = {}          # país -> grupo
+        self._visibles = []          # países que muestra la lista, en el orden del bolillero
+        self._posiciones = []        # posición de cada visible en el bolillero (para bisect)
         self.current_group_idx = 0
 
         self.build_ui()
         self.update_ui()
+        self._cargar_equipos()
+
+    def _cargar_equipos(self):
+        """Lee la planilla de equipos en segundo plano; la ventana queda usable mientras tanto."""
+        path = os.path.join(os.path.dirname(__file__), ARCHIVO_EQUIPOS)
+        if not os.path.exists(path):
+            self._equipos_cargados(load_teams_from_excel())   # muestra el aviso y usa la lista de ejemplo
+            return
+        self.info_label.config(text="Cargando equipos...")
+
+        def _fallo(e):
+            messagebox.showerror("Error", f"No se pudo leer '{ARCHIVO_EQUIPOS}': {e}")
+            self._equipos_cargados([])
+
+        obtener_ejecutor(self.master).enviar(lambda tarea: leer_paises_excel(path, con_confederacion=True),
+                                             titulo="Cargando equipos",
+                                             al_terminar=self._equipos_cargados, al_fallar=_fallo, master=self.master)
+
+    def _equipos_cargados(self, teams):
+        if not self.master.winfo_exists():
+            return
+        self.pool = PoolEquipos(t for t in teams if t)
+        for pais in self.asignados:
+            self.pool.quitar(pais)
+        self.conf_combo.config(values=[TODAS] + self.pool.confederaciones())
+        self.refresh_pool_listbox()
+        self.info_label.config(text=f"Cada grupo tiene {self.group_size} equipos. Avanza con los botones.")
 
     def build_ui(self):
         header = ttk.Frame(self.master, padding=8)
@@ -36,12 +69,26 @@ class GroupAssigner:
         left = ttk.Frame(main)
         left.pack(side='left', fill='both', expand=True, padx=(0, 12))
         ttk.Label(left, text="Países disponibles").pack(anchor='w')
+
+        # 🔹 Filtro: búsqueda mientras se escribe (Enter asigna el primero) y confederación
+        filtro = ttk.Frame(left)
+        filtro.pack(fill='x', pady=(2, 6))
+        ttk.Label(filtro, text="Buscar:").pack(side='left')
+        self.filtro_texto = tk.StringVar()
+        self.search_entry = ttk.Entry(filtro, textvariable=self.filtro_texto, width=24)
+        self.search_entry.pack(side='left', padx=(4, 10))
+        self.search_entry.bind("<Return>", self.on_search_enter)
+        ttk.Label(filtro, text="Confederación:").pack(side='left')
+        self.filtro_conf = tk.StringVar(value=TODAS)
+        self.conf_combo = ttk.Combobox(filtro, textvariable=self.filtro_conf, values=[TODAS], state='readonly', width=12)
+        self.conf_combo.pack(side='left', padx=4)
+        self.filtro_texto.trace_add('write', lambda *_: self.refresh_pool_listbox())
+        self.filtro_conf.trace_add('write', lambda *_: self.refresh_pool_listbox())
+
         self.pool_listbox = tk.Listbox(left, font=('Segoe UI',12), bg="#4d115d", fg="black",
                                        selectbackground="#38568f", selectforeground="#cdaa1f") 
         self.pool_listbox.pack(fill='both', expand=True)
         self.pool_listbox.bind("<Button-1>", self.on_country_click)
-        for p in self.pool: 
-            self.pool_listbox.insert(tk.END, p)
 
         right = ttk.Frame(main)
         right.pack(side='right', fill='both', expand=True)
@@ -54,7 +101,7 @@ class GroupAssigner:
         pos_frame = ttk.Frame(right)
         pos_frame.pack(fill='x', pady=(6,12))
         self.position_labels = []
-        for i in range(4):
+        for i in range(self.group_size):
             lbl = ttk.Label(pos_frame, text=f"{i+1}. ---", relief='ridge', padding=6)
             lbl.pack(side='left', expand=True, fill='x', padx=4)
             self.position_labels.append(lbl)
@@ -68,7 +115,7 @@ class GroupAssigner:
 
         bottom = ttk.Frame(self.master, padding=10)
         bottom.pack(fill='x')
-        self.info_label = ttk.Label(bottom, text="Cada grupo tiene 4 equipos. Avanza con los botones.")
+        self.info_label = ttk.Label(bottom, text=f"Cada grupo tiene {self.group_size} equipos. Avanza con los botones.")
         self.info_label.pack(side='left')
         self.save_btn = ttk.Button(bottom, text="Finalizar asignación", command=self.finish_assignments, state='disabled')
         self.save_btn.pack(side='right')
@@ -83,43 +130,57 @@ class GroupAssigner:
         if country:
             self.assign_country(country)
 
+    def on_search_enter(self, event=None):
+        if self._visibles:
+            self.assign_country(self._visibles[0])
+            self.filtro_texto.set("")
+
     def assign_country(self, country):
         # Evitar duplicados
-        for g in self.groups:
-            if country in self.groups[g]:
-                messagebox.showinfo("Duplicado", f"{country} ya está en el Grupo {g}.")
-                return
+        g = self.asignados.get(country)
+        if g is not None:
+            messagebox.showinfo("Duplicado", f"{country} ya está en el Grupo {g}.")
+            return
 
         cg = self.groups_order[self.current_group_idx]
-        if len(self.groups[cg]) >= 4:
+        if len(self.groups[cg]) >= self.group_size:
             messagebox.showwarning("Grupo completo", f"Grupo {cg} ya está completo.")
             return
 
         self.groups[cg].append(country)
-        try:
-            self.pool.remove(country)
-        except ValueError:
-            pass
+        self.asignados[country] = cg
+        self.pool.quitar(country)
 
-        self.refresh_pool_listbox()
+        self._quitar_de_lista(country)
         self.update_assigned()
 
-        if len(self.groups[cg]) == 4 and self.current_group_idx < len(self.groups_order) - 1:
+        if len(self.groups[cg]) == self.group_size and self.current_group_idx < len(self.groups_order) - 1:
             self.current_group_idx += 1
 
         self.update_ui()
 
     def refresh_pool_listbox(self):
+        """Rearma la lista solo cuando cambia el filtro; al asignar se usa _quitar_de_lista."""
+        conf = self.filtro_conf.get()
+        self._visibles = self.pool.buscar(self.filtro_texto.get(), None if conf == TODAS else conf)
+        self._posiciones = [self.pool.posicion(p) for p in self._visibles]
         self.pool_listbox.delete(0, tk.END)
-        for p in self.pool:
-            self.pool_listbox.insert(tk.END, p)
+        if self._visibles:
+            self.pool_listbox.insert(tk.END, *self._visibles)
+
+    def _quitar_de_lista(self, pais):
+        i = bisect_left(self._posiciones, self.pool.posicion(pais))
+        if i < len(self._visibles) and self._visibles[i] == pais:
+            self.pool_listbox.delete(i)
+            del self._visibles[i]
+            del self._posiciones[i]
 
     def update_assigned(self):
         cg = self.groups_order[self.current_group_idx]
         self.assigned_listbox.delete(0, tk.END)
         for i, p in enumerate(self.groups[cg], start=1):
             self.assigned_listbox.insert(tk.END, f"{i}. {p}")
-        for i in range(4):
+        for i in range(self.group_size):
             self.position_labels[i].config(
                 text=f"{i+1}. {self.groups[cg][i] if i < len(self.groups[cg]) else '---'}"
             )
@@ -130,7 +191,7 @@ class GroupAssigner:
         self.update_assigned()
         self.prev_btn.config(state='normal' if self.current_group_idx>0 else 'disabled')
         self.next_btn.config(state='normal' if self.current_group_idx < len(self.groups_order)-1 else 'disabled')
-        all_full = all(len(self.groups[g])==4 for g in self.groups_order)
+        all_full = all(len(self.groups[g])==self.group_size for g in self.groups_order)
         self.save_btn.config(state='normal' if all_full else 'disabled')
 
     def go_prev_group(self):
@@ -145,8 +206,8 @@ class GroupAssigner:
 
     def finish_assignments(self):
         for g in self.groups_order:
-            if len(self.groups[g]) != 4:
-                messagebox.showwarning("Faltan equipos", f"El Grupo {g} no tiene 4 equipos.")
+            if len(self.groups[g]) != self.group_size:
+                messagebox.showwarning("Faltan equipos", f"El Grupo {g} no tiene {self.group_size} equipos.")
                 return
 
         rows=[]
@@ -155,40 +216,41 @@ class GroupAssigner:
                 rows.append({'Grupo':g,'Posicion':pos,'Equipo':pais})
         df = pd.DataFrame(rows)
         out = os.path.join(os.path.dirname(__file__),'Grupos_Asignados_Sub20_2025.xlsx')
-        try:
-            df.to_excel(out,index=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se guardaron grupos: {e}")
-            return
 
-        # Generar partidos
+        # Generar partidos (todos contra todos según el tamaño de grupo del formato)
         matches=[]
         for g in self.groups_order:
             teams = self.groups[g]
-            matches += [
-                {'Grupo':g,'Jornada':1,'Equipo1':teams[0],'Equipo2':teams[1]},
-                {'Grupo':g,'Jornada':1,'Equipo1':teams[2],'Equipo2':teams[3]},
-                {'Grupo':g,'Jornada':2,'Equipo1':teams[0],'Equipo2':teams[2]},
-                {'Grupo':g,'Jornada':2,'Equipo1':teams[3],'Equipo2':teams[1]},
-                {'Grupo':g,'Jornada':3,'Equipo1':teams[3],'Equipo2':teams[0]},
-                {'Grupo':g,'Jornada':3,'Equipo1':teams[1],'Equipo2':teams[2]}
-            ]
+            matches += [{'Grupo':g,'Jornada':j,'Equipo1':teams[a],'Equipo2':teams[b]}
+                        for j, a, b in fixture_grupo(self.group_size)]
         dfm = pd.DataFrame(matches)
         outm = os.path.join(os.path.dirname(__file__),'FIFA_Sub20_2025_FaseGrupos_Partidos.xlsx')
-        try:
-            dfm.to_excel(outm,index=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se guardaron partidos: {e}")
-            return
 
-        messagebox.showinfo("Guardado exitoso",
-                            "Grupos y partidos guardados correctamente.\n"
-                            "Ahora podés abrir la Fase de Grupos desde el menú principal.")
-        self.master.lift()
-        self.master.focus_force()
+        # Las dos planillas se escriben en segundo plano; la ventana se cierra cuando quedaron guardadas
+        self.save_btn.config(state='disabled')
+
+        def _listo(_):
+            messagebox.showinfo("Guardado exitoso",
+                                "Grupos y partidos guardados correctamente.\n"
+                                "Ahora podés abrir la Fase de Grupos desde el menú principal.")
+            self._cerrar(matches)
+
+        def _fallo(e):
+            messagebox.showerror("Error", f"No se guardaron grupos y partidos: {e}")
+            if self.master.winfo_exists():
+                self.update_ui()
+
+        obtener_ejecutor(self.master).enviar(exportar_varios, [(df, out), (dfm, outm)], titulo="Guardando grupos",
+                                             archivos=(out, outm), al_terminar=_listo, al_fallar=_fallo,
+                                             master=self.master)
+
+    def _cerrar(self, matches):
+        if self.master.winfo_exists():
+            self.master.lift()
+            self.master.focus_force()
 
-        # ✅ Cerrar solo la ventana de asignación
-        self.master.destroy()
+            # ✅ Cerrar solo la ventana de asignación
+            self.master.destroy()
 
         # Mantener referencias de datos
         self.assigned_data = self.groups.copy()
@@ -0,0 +1,210 @@
+# cli.py
+"""
+Procesa un torneo completo sin interfaz gráfica: equipos y fixture desde los libros oficiales,
+resultados desde un archivo JSON/JSONL, y cuadro de eliminación desde fechas_fase_eliminatoria.xlsx.
+
+    python cli.py --resultados resultados.json --salida salida/
+
+Cada resultado identifica el partido por código oficial ("partido": "M37") o por equipos
+("local"/"visitante", con código de posición o nombre del país, y "fase" si no es de grupos):
+
+    {"local": "A1", "visitante": "A2", "goles": [2, 1]}
+    {"local": "Chile", "visitante": "Egipto", "fase": "Semifinal", "goles": [0, 0], "penales": [5, 4]}
+    {"partido": "M52", "goles": [1, 1], "penales": [4, 3], "amarillas": [2, 0], "rojas": [0, 0]}
+"""
+import os
+import sys
+import json
+import argparse
+import pandas as pd
+import core
+from core import Torneo, ErrorTorneo, cargar_equipos_excel, cargar_partidos_grupos_excel
+from llaves import Llaves, cargar_llaves
+from formatos import cargar_formato, formato_predeterminado
+from metricas import escribir_excel
+
+FASE_GRUPOS = "Fase de Grupos"
+FASES_EXPORTACION = ["Fase de Grupos", "Dieciseisavos", "Octavos", "Cuartos", "Semifinal", "Tercer puesto", "Final"]
+
+
+def leer_resultados(path):
+    """Lista de resultados desde un .json (lista) o .jsonl (uno por línea)."""
+    with open(path, encoding='utf-8') as f:
+        texto = f.read()
+    if path.lower().endswith('.jsonl'):
+        return [json.loads(l) for l in texto.splitlines() if l.strip()]
+    datos = json.loads(texto)
+    return datos.get('resultados', []) if isinstance(datos, dict) else datos
+
+
+def _par(r, clave):
+    """Lee 'goles': [a, b] o 'goles_local'/'goles_visitante'."""
+    if clave in r:
+        a, b = r[clave]
+        return int(a), int(b)
+    a, b = r.get(f"{clave}_local"), r.get(f"{clave}_visitante")
+    if a is None and b is None:
+        return None
+    return int(a or 0), int(b or 0)
+
+
+class IndiceResultados:
+    """
+    Busca el resultado de un partido por código oficial o por fase y par de equipos (en
+    cualquier orden): dos equipos del mismo grupo pueden volver a cruzarse en la eliminación.
+    """
+    def __init__(self, resultados, torneo):
+        nombres = {}
+        for e in torneo.equipos.values():
+            for alias in (e.identificador, e.pais, e.abreviatura):
+                if alias:
+                    nombres[alias.strip().lower()] = e.identificador
+        self.por_codigo = {}
+        self.por_equipos = {}
+        for n, r in enumerate(resultados, start=1):
+            if r.get('partido'):
+                self.por_codigo[str(r['partido']).strip().upper()] = r
+                continue
+            try:
+                id1 = nombres[str(r['local']).strip().lower()]
+                id2 = nombres[str(r['visitante']).strip().lower()]
+            except KeyError as ex:
+                raise ErrorTorneo(f"Resultado {n}: equipo desconocido {ex}")
+            fase = str(r.get('fase') or FASE_GRUPOS).strip()
+            self.por_equipos[(fase, id1, id2)] = r
+
+    def buscar(self, partido):
+        """Devuelve (resultado, invertido) o (None, False)."""
+        if partido.codigo and partido.codigo in self.por_codigo:
+            return self.por_codigo[partido.codigo], False
+        r = self.por_equipos.get((partido.fase, partido.id_equipo1, partido.id_equipo2))
+        if r is not None:
+            return r, False
+        r = self.por_equipos.get((partido.fase, partido.id_equipo2, partido.id_equipo1))
+        return (r, True) if r is not None else (None, False)
+
+
+def aplicar_resultado(torneo, match_id, r, invertido):
+    partido = torneo.calendario[match_id]
+    goles = _par(r, 'goles')
+    if goles is None:
+        raise ErrorTorneo(f"{partido.codigo or match_id}: falta el marcador")
+    ama = _par(r, 'amarillas') or (0, 0)
+    rojas = _par(r, 'rojas') or (0, 0)
+    penales = _par(r, 'penales')
+    if invertido:
+        goles, ama, rojas = goles[::-1], ama[::-1], rojas[::-1]
+        penales = penales[::-1] if penales else None
+    if partido.fase != FASE_GRUPOS and goles[0] == goles[1] and (not penales or penales[0] == penales[1]):
+        raise ErrorTorneo(f"{partido.codigo or match_id}: empate en eliminación sin definición por penales")
+    torneo.registrar_resultado(match_id, goles[0], goles[1], ama[0], ama[1], rojas[0], rojas[1],
+                               jugador_stats=r.get('jugadores'),
+                               penales={'p1': penales[0], 'p2': penales[1]} if penales else None)
+
+
+def procesar(args):
+    os.makedirs(args.salida, exist_ok=True)
+    formato = cargar_formato(args.formato_torneo) if args.formato_torneo else formato_predeterminado()
+    torneo = Torneo(archivo=os.path.join(args.salida, "torneo_data.json"), cargar=False, formato=formato)
+    llaves = Llaves.desde_excel(args.eliminatoria) if args.eliminatoria else cargar_llaves(formato)
+    llaves.conectar(torneo)
+
+    with torneo.en_lote():
+        for e in cargar_equipos_excel(args.equipos):
+            torneo.agregar_equipo(e)
+        for p in cargar_partidos_grupos_excel(args.partidos):
+            torneo.upsert_partido(p)
+        torneo.cerrar_configuracion()
+        indice = IndiceResultados(leer_resultados(args.resultados), torneo)
+
+        # ---- Fase de grupos ----
+        pendientes = []
+        for mid, p in list(torneo.calendario.items()):
+            r, invertido = indice.buscar(p)
+            if r is None:
+                pendientes.append(mid)
+            else:
+                aplicar_resultado(torneo, mid, r, invertido)
+        if pendientes:
+            print(f"Fase de grupos incompleta ({len(pendientes)} partidos sin resultado); no se arma el cuadro.")
+            return torneo
+
+        # ---- Eliminación: el cuadro crea cada cruce al conocerse sus dos equipos ----
+        llaves.sincronizar(torneo)
+        for codigo in llaves.orden_topologico():
+            encontrado = torneo.partido_por_codigo(codigo)
+            if encontrado is None:
+                continue
+            mid, p = encontrado
+            r, invertido = indice.buscar(p)
+            if r is None:
+                continue
+            aplicar_resultado(torneo, mid, r, invertido)
+    return torneo
+
+
+def exportar(torneo, salida, formato):
+    def _escribir(rows, nombre):
+        df = pd.DataFrame(rows)
+        out = os.path.join(salida, f"{nombre}.{formato}")
+        if formato == 'csv':
+            df.to_csv(out, index=False, encoding='utf-8')
+        else:
+            escribir_excel(df, out)
+        return out
+
+    archivos = []
+    for fase in FASES_EXPORTACION:
+        rows = []
+        for mid, p in torneo.calendario.items():
+            if p.fase != fase:
+                continue
+            extra = f"Penales {p.penales['p1']}-{p.penales['p2']}" if p.penales else ""
+            rows.append({'ID': mid, 'Codigo': p.codigo, 'Fecha': p.fecha, 'Hora': p.hora, 'Fase': p.fase,
+                         'Equipo1': torneo.equipos[p.id_equipo1].pais, 'G1': p.goles_e1,
+                         'G2': p.goles_e2, 'Equipo2': torneo.equipos[p.id_equipo2].pais, 'Extra': extra})
+        if rows:
+            archivos.append(_escribir(rows, f"Resultados_{fase}"))
+
+    rows = []
+    for g in sorted(torneo.grupos):
+        for pos, e in enumerate(torneo.calcular_tabla_posiciones(g), start=1):
+            rows.append({'Grupo': g, 'Pos': pos, 'Equipo': e.pais,
+                         **{k: e.stats[k] for k in ('PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts')},
+                         'MaxAvance': e.stats.get('MaxAvance', '')})
+    archivos.append(_escribir(rows, "Posiciones"))
+    return archivos
+
+
+def main(argv=None):
+    base = core.SCRIPT_DIR
+    ap = argparse.ArgumentParser(description="Procesa el torneo completo sin interfaz gráfica")
+    ap.add_argument("--equipos", default=os.path.join(base, "FIFA_Sub20_2025_Equipos.xlsx"))
+    ap.add_argument("--partidos", default=os.path.join(base, "FIFA_Sub20_2025_FaseGrupos partidos.xlsx"))
+    ap.add_argument("--eliminatoria", default=None, help="cuadro en Excel (por defecto, el del formato)")
+    ap.add_argument("--formato-torneo", default=None, help="sub20-24, mundial-32, mundial-48 o un .json (o MUNDIAL_FORMATO)")
+    ap.add_argument("--resultados", required=True, help="archivo .json o .jsonl con los resultados")
+    ap.add_argument("--salida", default=os.path.join(base, "salida"))
+    ap.add_argument("--formato", choices=("xlsx", "csv"), default="xlsx")
+    args = ap.parse_args(argv)
+
+    core.modo_sin_interfaz()
+    try:
+        torneo = procesar(args)
+        archivos = exportar(torneo, args.salida, args.formato)
+    except (ErrorTorneo, ValueError, OSError) as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 1
+
+    campeon = next((e for e in torneo.equipos.values() if e.stats.get('MaxAvance') == 'Campeón'), None)
+    jugados = sum(1 for p in torneo.calendario.values() if p.jugado())
+    print(f"{jugados} resultados procesados; estado en {torneo.FILENAME}")
+    for out in archivos:
+        print(f"  {out}")
+    if campeon:
+        print(f"Campeón: {campeon.pais}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,36 @@
 # core.py
 import os
 import json
+from contextlib import contextmanager
+from datetime import datetime, date, time as dtime
 from dataclasses import dataclass, field
 from typing import Dict
 import pandas as pd
 from tkinter import messagebox
+from disciplina import Disciplina
+from historial_posiciones import HistorialPosiciones
+from agenda import AgendaPartidos
+from persistencia import GuardadoDiferido, escribir_atomico, serializar
+from eventos import BusEventos, ResultadoRegistrado, PartidoAgregado, FaseAvanzada, CruceActualizado, PartidoReprogramado
+from metricas import instrumentar, leer_excel, tamano_archivo
+import formatos
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+VENTANA_GUARDADO = 0.5  # segundos en que se agrupan los guardados de la UI
+
+class ErrorTorneo(Exception):
+    pass
+
+def _error_sin_interfaz(titulo, mensaje):
+    raise ErrorTorneo(f"{titulo}: {mensaje}")
+
+# Las ventanas muestran los errores en un messagebox; el modo batch (cli.py) los convierte en excepciones
+reportar_error = messagebox.showerror
+
+def modo_sin_interfaz():
+    """Hace que los errores del Torneo se lancen como ErrorTorneo en lugar de abrir diálogos."""
+    global reportar_error
+    reportar_error = _error_sin_interfaz
 
 @dataclass
 class Equipo:
@@ -45,13 +69,51 @@ class Partido:
     tarj_roja_e1: int = 0
     tarj_roja_e2: int = 0
     jugador_stats: list = field(default_factory=list)
+    grupo: str = ""
+    jornada: int = None
+    codigo: str = ""   # código oficial FIFA (p. ej. "M37"), si se conoce
+    alargue: dict = None   # {'goles_et1': x, 'goles_et2': y}
+    penales: dict = None   # {'p1': x, 'p2': y}
 
     def to_dict(self):
         return self.__dict__
 
+    def jugado(self):
+        return self.goles_e1 is not None and self.goles_e2 is not None
+
+    def ganador(self):
+        """Id del ganador (los goles incluyen el alargue; si siguen iguales deciden los penales)."""
+        if not self.jugado():
+            return None
+        if self.goles_e1 != self.goles_e2:
+            return self.id_equipo1 if self.goles_e1 > self.goles_e2 else self.id_equipo2
+        if self.penales and self.penales.get('p1') != self.penales.get('p2'):
+            return self.id_equipo1 if self.penales.get('p1', 0) > self.penales.get('p2', 0) else self.id_equipo2
+        return None
+
+    def perdedor(self):
+        g = self.ganador()
+        if g is None:
+            return None
+        return self.id_equipo2 if g == self.id_equipo1 else self.id_equipo1
+
+    def clave(self):
+        """
+        Clave natural del partido: el código oficial si existe; si no, la fase y el par de equipos
+        (dentro de una fase un par se cruza una sola vez, lo que ya fija grupo y jornada).
+        """
+        if self.codigo:
+            return ('codigo', self.codigo)
+        return self.clave_cruce()
+
+    def clave_cruce(self):
+        return (self.fase,) + tuple(sorted((self.id_equipo1, self.id_equipo2)))
+
 class Torneo:
-    def __init__(self, nombre="Copa Mundial Sub-20 de la FIFA Chile 2025"):
+    def __init__(self, nombre="Copa Mundial Sub-20 de la FIFA Chile 2025", ventana_guardado=None, archivo=None, cargar=True,
+                 formato=None):
         self.nombre = nombre
+        self.formato = formato or formatos.formato_predeterminado()   # grupos, clasificados y cuadro (formatos.py)
         self.pais_sede = "Chile"
         self.fecha_inicio = "2025-09-27"
         self.fecha_fin = "2025-10-19"
@@ -59,15 +121,43 @@ class Torneo:
         self.equipos: Dict[str, Equipo] = {}
         self.grupos = set()
         self.calendario: Dict[str, Partido] = {}
+        self._indice_claves: Dict[tuple, str] = {}
         self._match_id_counter = 1
-        self.FILENAME = os.path.join(SCRIPT_DIR, 'torneo_data.json') #en enta parte crea la BD digamos
-        self.cargar_datos()
+        self.disciplina = Disciplina()
+        self._aportes: Dict[str, dict] = {}
+        self.historial_cambios = []
+        self.eventos = BusEventos()
+        self.version = 0
+        self.historial = HistorialPosiciones(self)
+        self.agenda = AgendaPartidos(self)
+        self.cuadro = None      # llaves.Llaves conectado a este torneo (lo asigna Llaves.conectar)
+        self.FILENAME = archivo or os.path.join(SCRIPT_DIR, 'torneo_data.json') #en enta parte crea la BD digamos
+        self._lote = 0
+        self._guardado_en_lote = False
+        # con ventana_guardado los guardados se escriben en segundo plano (ver persistencia.py)
+        self._guardado = GuardadoDiferido(self.FILENAME, ventana_guardado) if ventana_guardado is not None else None
+        if cargar:
+            self.cargar_datos()
 
     def agregar_equipo(self, equipo: Equipo):
         self.equipos[equipo.identificador] = equipo
         if equipo.grupo:
             self.grupos.add(equipo.grupo)
 
+    def upsert_equipo(self, equipo: Equipo):
+        """Agrega el equipo o actualiza sus datos conservando las estadísticas acumuladas."""
+        existente = self.equipos.get(equipo.identificador)
+        if existente is None:
+            self.agregar_equipo(equipo)
+            return equipo
+        existente.pais = equipo.pais
+        existente.abreviatura = equipo.abreviatura or existente.abreviatura
+        existente.confederacion = equipo.confederacion or existente.confederacion
+        existente.grupo = equipo.grupo or existente.grupo
+        if existente.grupo:
+            self.grupos.add(existente.grupo)
+        return existente
+
     def agregar_equipo_dict(self, d):
         e = Equipo(d['identificador'], d['pais'], d.get('abreviatura',''), d.get('confederacion',''), d.get('grupo',''))
         self.agregar_equipo(e)
@@ -76,78 +166,329 @@ class Torneo:
         match_id = f"M{self._match_id_counter:03d}"
         self.calendario[match_id] = partido
         self._match_id_counter += 1
+        self._indice_claves.setdefault(partido.clave(), match_id)
+        self.disciplina.partido_agregado(match_id, partido)
+        self.publicar(PartidoAgregado, match_id=match_id, partido=partido)
         return match_id
 
+    def upsert_partido(self, partido: Partido):
+        """
+        Agrega el partido solo si no existe otro con la misma clave natural; si existe,
+        completa sus datos de programación y reutiliza su id. Devuelve (match_id, creado).
+        """
+        match_id = self._indice_claves.get(partido.clave())
+        if match_id is None and partido.codigo:
+            # cruces creados antes de conocer el código oficial: se adoptan por fase y equipos
+            match_id = self._indice_claves.get(partido.clave_cruce())
+            if match_id is not None and self.calendario[match_id].codigo:
+                match_id = None
+        if match_id is None:
+            return self.agregar_partido(partido), True
+        existente = self.calendario[match_id]
+        if partido.codigo and not existente.codigo:
+            self._indice_claves.pop(existente.clave(), None)
+            self._indice_claves[('codigo', partido.codigo)] = match_id
+        programacion = (existente.fecha, existente.hora)
+        for campo in ('fecha', 'hora', 'grupo', 'jornada', 'codigo'):
+            valor = getattr(partido, campo)
+            if valor not in ("", None):
+                setattr(existente, campo, valor)
+        if (existente.fecha, existente.hora) != programacion:
+            self.publicar(PartidoReprogramado, match_id=match_id, partido=existente)
+        return match_id, False
+
+    def reprogramar_partido(self, match_id, fecha, hora):
+        """Mueve un partido a otra fecha/hora. Devuelve los conflictos de agenda que genera."""
+        partido = self.calendario[match_id]
+        partido.fecha = fecha
+        partido.hora = hora
+        self.guardar_datos()
+        self.publicar(PartidoReprogramado, match_id=match_id, partido=partido)
+        return self.agenda.conflictos_de(match_id)
+
+    def reasignar_equipo(self, match_id, lado, id_equipo):
+        """Cambia un equipo (lado 0 o 1) de un partido sin jugar, p. ej. al corregirse el cruce anterior."""
+        partido = self.calendario[match_id]
+        if partido.jugado():
+            reportar_error("Error", f"El partido {match_id} ya tiene resultado; anúlelo antes de cambiar sus equipos.")
+            return False
+        setattr(partido, 'id_equipo1' if lado == 0 else 'id_equipo2', id_equipo)
+        if not partido.codigo:
+            self._indice_claves = {p.clave(): mid for mid, p in self.calendario.items()}
+        self.disciplina.reconstruir(self.calendario, self.equipos)
+        self.guardar_datos()
+        self.publicar(CruceActualizado, match_id=match_id, partido=partido)
+        return True
+
+    def partido_por_codigo(self, codigo):
+        """(match_id, Partido) del partido con ese código oficial (p. ej. 'M37'), o None."""
+        match_id = self._indice_claves.get(('codigo', codigo))
+        return (match_id, self.calendario[match_id]) if match_id else None
+
+    def compactar_calendario(self):
+        """
+        Elimina partidos duplicados (misma clave natural) que dejaban las versiones anteriores
+        al reabrir pantallas. Se conserva el que tiene resultado. Devuelve cuántos se quitaron.
+        """
+        por_clave = {}
+        for mid, p in self.calendario.items():
+            por_clave.setdefault(p.clave(), []).append(mid)
+        eliminar = []
+        for mids in por_clave.values():
+            if len(mids) < 2:
+                continue
+            conservar = next((m for m in mids if m in self._aportes), None) \
+                or next((m for m in mids if self.calendario[m].goles_e1 is not None), None) \
+                or mids[0]
+            eliminar.extend(m for m in mids if m != conservar)
+        if not eliminar:
+            return 0
+        for mid in eliminar:
+            del self.calendario[mid]
+            # si la copia también tenía resultado, sus goles y puntos salen de las estadísticas
+            if mid in self._aportes:
+                self._aplicar_aporte(self._aportes.pop(mid), -1)
+        self._indice_claves = {p.clave(): mid for mid, p in self.calendario.items()}
+        self.disciplina.reconstruir(self.calendario, self.equipos)
+        self.historial.invalidar()
+        self.agenda.invalidar()
+        return len(eliminar)
+
+    def publicar(self, tipo_evento, **datos):
+        """Incrementa la versión del torneo y avisa a las ventanas suscriptas."""
+        self.version += 1
+        evento = tipo_evento(version=self.version, **datos)
+        self.eventos.publicar(evento)
+        return evento
+
     def cerrar_configuracion(self):
         self.configuracion_cerrada = True
         self.guardar_datos()
 
-    def registrar_resultado(self, match_id, goles_e1, goles_e2, ta1=0, ta2=0, tr1=0, tr2=0):
+    @instrumentar("registrar_resultado")
+    def registrar_resultado(self, match_id, goles_e1, goles_e2, ta1=0, ta2=0, tr1=0, tr2=0, jugador_stats=None, penales=None):
         if not self.configuracion_cerrada:
-            messagebox.showerror("Error", "Debe cerrar la configuración antes de registrar resultados.")
+            reportar_error("Error", "Debe cerrar la configuración antes de registrar resultados.")
             return False
         partido = self.calendario.get(match_id)
         if not partido:
-            messagebox.showerror("Error", f"Partido {match_id} no encontrado.")
+            reportar_error("Error", f"Partido {match_id} no encontrado.")
+            return False
+
+        e1 = self.equipos.get(partido.id_equipo1)
+        e2 = self.equipos.get(partido.id_equipo2)
+        if not e1 or not e2:
+            reportar_error("Error", "Equipos del partido no encontrados en torneo.")
             return False
 
+        # Si el partido ya tenía resultado se revierte su aporte antes de aplicar el nuevo
+        anterior = self._resultado_partido(partido) if match_id in self._aportes else None
+        if anterior is not None:
+            self._aplicar_aporte(self._aportes.pop(match_id), -1)
+            self.disciplina.anular_partido(match_id, self.calendario, self.equipos)
+
         partido.goles_e1 = goles_e1
         partido.goles_e2 = goles_e2
         partido.tarj_ama_e1 = ta1
         partido.tarj_ama_e2 = ta2
         partido.tarj_roja_e1 = tr1
         partido.tarj_roja_e2 = tr2
+        if jugador_stats is not None:
+            partido.jugador_stats = list(jugador_stats)
+        partido.penales = dict(penales) if penales else None
 
-        e1 = self.equipos.get(partido.id_equipo1)
-        e2 = self.equipos.get(partido.id_equipo2)
-        if not e1 or not e2:
-            messagebox.showerror("Error", "Equipos del partido no encontrados en torneo.")
-            return False
+        aporte = self._calcular_aporte(partido)
+        self._aplicar_aporte(aporte, +1)
+        self._aportes[match_id] = aporte
 
-        e1.stats['PJ'] += 1
-        e2.stats['PJ'] += 1
-        e1.stats['GF'] += goles_e1
-        e2.stats['GF'] += goles_e2
-        e1.stats['GC'] += goles_e2
-        e2.stats['GC'] += goles_e1
-
-        if goles_e1 > goles_e2:
-            e1.stats['G'] += 1; e2.stats['P'] += 1; e1.stats['Pts'] += 3
-        elif goles_e1 < goles_e2:
-            e2.stats['G'] += 1; e1.stats['P'] += 1; e2.stats['Pts'] += 3
-        else:
-            e1.stats['E'] += 1; e2.stats['E'] += 1; e1.stats['Pts'] += 1; e2.stats['Pts'] += 1
+        self.disciplina.registrar_partido(match_id, partido, self.equipos)
 
-        e1.stats['DG'] = e1.stats['GF'] - e1.stats['GC']
-        e2.stats['DG'] = e2.stats['GF'] - e2.stats['GC']
+        accion = 'correccion' if anterior else 'registro'
+        self._auditar(match_id, accion, anterior, self._resultado_partido(partido))
+        self.guardar_datos()
+        self.publicar(ResultadoRegistrado, match_id=match_id, accion=accion, partido=partido)
+        return True
+
+    def anular_resultado(self, match_id, motivo=""):
+        """Deja el partido sin resultado, revirtiendo su aporte a las estadísticas."""
+        partido = self.calendario.get(match_id)
+        if not partido:
+            reportar_error("Error", f"Partido {match_id} no encontrado.")
+            return False
+        if match_id not in self._aportes:
+            return False
 
+        anterior = self._resultado_partido(partido)
+        self._aplicar_aporte(self._aportes.pop(match_id), -1)
+        self.disciplina.anular_partido(match_id, self.calendario, self.equipos)
+        partido.goles_e1 = None
+        partido.goles_e2 = None
+        partido.tarj_ama_e1 = partido.tarj_ama_e2 = 0
+        partido.tarj_roja_e1 = partido.tarj_roja_e2 = 0
+        partido.jugador_stats = []
+        partido.penales = None
+
+        self._auditar(match_id, 'anulacion', anterior, None, motivo)
         self.guardar_datos()
+        self.publicar(ResultadoRegistrado, match_id=match_id, accion='anulacion', partido=partido)
         return True
 
+    # ============================================================
+    # 🔹 Aportes por partido (permiten corregir sin recalcular todo)
+    # ============================================================
+    @staticmethod
+    def _calcular_aporte(partido):
+        # solo la fase de grupos suma a las tablas; en eliminación cuentan MaxAvance y disciplina
+        if partido.fase != "Fase de Grupos":
+            return {}
+        g1, g2 = partido.goles_e1, partido.goles_e2
+        d1 = {'PJ': 1, 'G': 0, 'E': 0, 'P': 0, 'GF': g1, 'GC': g2, 'Pts': 0}
+        d2 = {'PJ': 1, 'G': 0, 'E': 0, 'P': 0, 'GF': g2, 'GC': g1, 'Pts': 0}
+        if g1 > g2:
+            d1['G'] = 1; d2['P'] = 1; d1['Pts'] = 3
+        elif g1 < g2:
+            d2['G'] = 1; d1['P'] = 1; d2['Pts'] = 3
+        else:
+            d1['E'] = d2['E'] = 1; d1['Pts'] = d2['Pts'] = 1
+        return {partido.id_equipo1: d1, partido.id_equipo2: d2}
+
+    def _aplicar_aporte(self, aporte, signo):
+        for id_equipo, delta in aporte.items():
+            e = self.equipos.get(id_equipo)
+            if not e:
+                continue
+            for k, v in delta.items():
+                e.stats[k] = e.stats.get(k, 0) + signo * v
+            e.stats['DG'] = e.stats['GF'] - e.stats['GC']
+
+    @staticmethod
+    def _resultado_partido(partido):
+        return {
+            'goles_e1': partido.goles_e1, 'goles_e2': partido.goles_e2, 'penales': partido.penales,
+            'tarj_ama_e1': partido.tarj_ama_e1, 'tarj_ama_e2': partido.tarj_ama_e2,
+            'tarj_roja_e1': partido.tarj_roja_e1, 'tarj_roja_e2': partido.tarj_roja_e2,
+        }
+
+    def _auditar(self, match_id, accion, anterior, nuevo, motivo=""):
+        self.historial_cambios.append({
+            'fecha_hora': datetime.now().isoformat(timespec='seconds'),
+            'match_id': match_id,
+            'accion': accion,
+            'anterior': anterior,
+            'nuevo': nuevo,
+            'motivo': motivo,
+        })
+
+    def recalcular_estadisticas(self):
+        """Estadísticas calculadas desde cero a partir de los resultados del calendario."""
+        campos = ('PJ', 'G', 'E', 'P', 'GF', 'GC', 'Pts')
+        totales = {id_: dict.fromkeys(campos, 0) for id_ in self.equipos}
+        for p in self.calendario.values():
+            if p.goles_e1 is None or p.goles_e2 is None:
+                continue
+            for id_equipo, delta in self._calcular_aporte(p).items():
+                if id_equipo in totales:
+                    for k, v in delta.items():
+                        totales[id_equipo][k] += v
+        for t in totales.values():
+            t['DG'] = t['GF'] - t['GC']
+        return totales
+
+    def _corregir_estadisticas(self):
+        """Reemplaza las estadísticas de tabla por el recálculo completo (se conservan tarjetas y avance)."""
+        for id_, esperado in self.recalcular_estadisticas().items():
+            self.equipos[id_].stats.update(esperado)
+
+    def verificar_consistencia(self):
+        """
+        Compara las estadísticas incrementales con un recálculo completo.
+        Devuelve una lista de (id_equipo, campo, valor_actual, valor_esperado); vacía si todo cuadra.
+        """
+        diferencias = []
+        for id_, esperado in self.recalcular_estadisticas().items():
+            stats = self.equipos[id_].stats
+            for k, v in esperado.items():
+                if stats.get(k, 0) != v:
+                    diferencias.append((id_, k, stats.get(k, 0), v))
+        return diferencias
+
+    def suspendidos_para(self, partido):
+        """Jugadores suspendidos para el partido indicado (código oficial, p. ej. 'M45', o match_id), por id de equipo."""
+        encontrado = self.partido_por_codigo(partido)
+        return self.disciplina.suspendidos(encontrado[0] if encontrado else partido)
+
+    @instrumentar("calcular_tabla_posiciones")
     def calcular_tabla_posiciones(self, grupo_id):
         equipos_grupo = [e for e in self.equipos.values() if e.grupo == grupo_id]
-        tabla_ordenada = sorted(equipos_grupo, key=lambda e: (e.stats['Pts'], e.stats['DG'], e.stats['GF']), reverse=True)
+        tabla_ordenada = sorted(equipos_grupo, key=formatos.clave_tabla, reverse=True)
         return tabla_ordenada
 
+    @contextmanager
+    def en_lote(self):
+        """Agrupa muchos cambios: los guardados intermedios se omiten y se guarda una vez al final."""
+        self._lote += 1
+        try:
+            yield self
+        finally:
+            self._lote -= 1
+            if self._lote == 0 and self._guardado_en_lote:
+                self._guardado_en_lote = False
+                self.guardar_datos()
+
+    @instrumentar("guardar_datos")
     def guardar_datos(self):
-        data = {
+        if self._lote:
+            self._guardado_en_lote = True
+            return
+        data = self._snapshot()
+        if self._guardado:
+            self._guardado.solicitar(data)
+            return
+        try:
+            escribir_atomico(self.FILENAME, serializar(data))
+        except Exception as ex:
+            reportar_error("Error", f"No se pudo guardar datos: {ex}")
+
+    def flush(self):
+        """Espera a que los guardados pendientes lleguen a disco (al cerrar ventanas o salir)."""
+        if self._guardado and not self._guardado.flush():
+            reportar_error("Error", f"No se pudo guardar datos: {self._guardado.ultimo_error}")
+            return False
+        return True
+
+    def esperar_guardado(self, timeout=None):
+        """Como flush, pero sin diálogos y desde cualquier hilo: True si lo pedido hasta ahora ya está en disco."""
+        return self._guardado.flush(timeout) if self._guardado else True
+
+    def _snapshot(self):
+        """Copia del estado serializable; el hilo de guardado nunca toca objetos vivos."""
+        equipos = {}
+        for id, e in self.equipos.items():
+            d = e.to_dict()
+            d['stats'] = dict(d['stats'])
+            equipos[id] = d
+        calendario = {}
+        for id, p in self.calendario.items():
+            d = dict(p.to_dict())
+            d['jugador_stats'] = [dict(js) for js in d.get('jugador_stats') or []]
+            calendario[id] = d
+        return {
             'torneo': {
                 'nombre': self.nombre,
                 'pais_sede': self.pais_sede,
                 'fecha_inicio': self.fecha_inicio,
                 'fecha_fin': self.fecha_fin,
                 'configuracion_cerrada': self.configuracion_cerrada,
-                '_match_id_counter': self._match_id_counter
+                '_match_id_counter': self._match_id_counter,
+                'formato': self.formato.a_dict()
             },
-            'equipos': {id: e.to_dict() for id, e in self.equipos.items()},
-            'calendario': {id: p.to_dict() for id, p in self.calendario.items()}
+            'equipos': equipos,
+            'calendario': calendario,
+            'partidos_computados': sorted(self._aportes),
+            'historial_cambios': list(self.historial_cambios)
         }
-        try:
-            with open(self.FILENAME, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-        except Exception as ex:
-            messagebox.showerror("Error", f"No se pudo guardar datos: {ex}")
 
+    @instrumentar("cargar_datos", bytes_leidos=lambda a, k, r: tamano_archivo(a[0].FILENAME))
     def cargar_datos(self):
         if not os.path.exists(self.FILENAME):
             return
@@ -160,6 +501,9 @@ class Torneo:
         self.nombre = t_data.get('nombre', self.nombre)
         self.configuracion_cerrada = t_data.get('configuracion_cerrada', False)
         self._match_id_counter = t_data.get('_match_id_counter', 1)
+        if t_data.get('formato'):
+            # un torneo ya armado sigue con su formato aunque cambie MUNDIAL_FORMATO
+            self.formato = formatos.FormatoTorneo.desde_dict(t_data['formato'])
         self.equipos = {}
         for id, e_data in data.get('equipos', {}).items():
             equipo = Equipo(e_data['identificador'], e_data['pais'], e_data.get('abreviatura',''), e_data.get('confederacion',''), e_data.get('grupo',''))
@@ -177,7 +521,50 @@ class Torneo:
             partido.tarj_roja_e1 = p_data.get('tarj_roja_e1', 0)
             partido.tarj_roja_e2 = p_data.get('tarj_roja_e2', 0)
             partido.jugador_stats = p_data.get('jugador_stats', [])
+            partido.grupo = p_data.get('grupo', '')
+            partido.jornada = p_data.get('jornada')
+            partido.codigo = p_data.get('codigo', '')
+            partido.alargue = p_data.get('alargue')
+            partido.penales = p_data.get('penales')
             self.calendario[id] = partido
+        # Archivos previos no guardaban qué partidos sumaron estadísticas: solo lo hacía la fase de grupos
+        computados = data.get('partidos_computados')
+        computados = set(computados) if computados is not None else None
+        self._aportes = {id: self._calcular_aporte(p) for id, p in self.calendario.items()
+                         if p.goles_e1 is not None and p.goles_e2 is not None
+                         and (id in computados if computados is not None else p.fase == "Fase de Grupos")}
+        # archivos previos sumaban también la eliminación a las tablas de grupo
+        contaminados = any(self.calendario[id].fase != "Fase de Grupos" for id in self._aportes) \
+            and bool(self.verificar_consistencia())
+        if contaminados:
+            self._corregir_estadisticas()
+        self.historial_cambios = data.get('historial_cambios', [])
+        self._indice_claves = {}
+        for id, p in self.calendario.items():
+            self._indice_claves.setdefault(p.clave(), id)
+        self.disciplina.reconstruir(self.calendario, self.equipos)
+        self.historial.invalidar()
+        self.agenda.invalidar()
+        # Compactación única de archivos inflados por duplicados
+        quitados = self.compactar_calendario()
+        if quitados:
+            print(f"Se quitaron {quitados} partidos duplicados de {os.path.basename(self.FILENAME)}.")
+        if contaminados:
+            print(f"Se quitaron los partidos de eliminación de las tablas de {os.path.basename(self.FILENAME)}.")
+        if quitados or contaminados:
+            self.guardar_datos()
+    # ============================================================
+    # 🔹 Clasificados de la fase de grupos
+    # ============================================================
+    def calcular_clasificados(self, mejores_terceros=None):
+        """
+        Ids de primeros, segundos y mejores terceros según las tablas actuales y el formato
+        del torneo (formatos.calcular_clasificados). `mejores_terceros` reemplaza la cantidad
+        del formato, p. ej. con los cupos de terceros del cuadro.
+        """
+        mejores = None if mejores_terceros is None else {3: mejores_terceros}
+        return formatos.calcular_clasificados(self, self.formato, mejores)
+
     # ============================================================
     # 🔹 Obtener equipo por posición (para las llaves de eliminación)
     # ============================================================
@@ -222,66 +609,17 @@ class Torneo:
     # ============================================================
     def generar_rondas_eliminacion(self):
         """
-        Genera automáticamente los partidos de las siguientes fases de eliminación
-        (Octavos → Cuartos → Semifinal → Final)
-        en base a los ganadores de los encuentros anteriores.
+        Pone al día los partidos de eliminación según el cuadro oficial (llaves.py): crea los
+        cruces cuyos equipos ya se conocen, con su código, fecha y hora.
         """
-        nuevas_rondas = []
-
-        # --- Orden de fases ---
-        fases_orden = ["Octavos de final", "Cuartos de final", "Semifinal", "Final"]
-
-        # Buscar la fase actual
-        fase_actual = None
-        for fase in fases_orden:
-            if any(p.fase == fase for p in self.calendario.values()):
-                fase_actual = fase
-                break
-
-        if not fase_actual:
-            print("⚠️ No hay fase de eliminación actual para avanzar.")
-            return
-
-        # --- Obtener ganadores ---
-        ganadores = []
-        for p in self.calendario.values():
-            if p.fase != fase_actual:
-                continue
-            if p.goles_e1 is None or p.goles_e2 is None:
-                continue
-            if p.goles_e1 > p.goles_e2:
-                ganadores.append(self.equipos[p.id_equipo1])
-            elif p.goles_e2 > p.goles_e1:
-                ganadores.append(self.equipos[p.id_equipo2])
-
-        if not ganadores:
-            print("⚠️ No hay ganadores aún en la fase actual.")
-            return
-
-        # --- Siguiente fase ---
-        idx = fases_orden.index(fase_actual)
-        if idx + 1 >= len(fases_orden):
-            print("🏁 El torneo ya llegó a la final.")
-            return
-
-        fase_siguiente = fases_orden[idx + 1]
-        print(f"➡️ Generando {fase_siguiente} con {len(ganadores)} equipos...")
-
-        # --- Crear nuevos partidos ---
-        for i in range(0, len(ganadores), 2):
-            if i + 1 < len(ganadores):
-                e1 = ganadores[i]
-                e2 = ganadores[i + 1]
-                nuevo_partido = Partido(e1.id_equipo1 if hasattr(e1, 'id_equipo1') else e1.identificador,
-                                        e2.id_equipo1 if hasattr(e2, 'id_equipo1') else e2.identificador,
-                                        fecha="", hora="", fase=fase_siguiente)
-                self.agregar_partido(nuevo_partido)
-                nuevas_rondas.append(nuevo_partido)
-
-        # Guardar resultados
-        if nuevas_rondas:
+        from llaves import obtener_llaves   # llaves importa core
+        nuevos = obtener_llaves(self).sincronizar(self)
+        if nuevos:
             self.guardar_datos()
-            print(f"✅ {len(nuevas_rondas)} partidos creados para {fase_siguiente}.")
+            fases = [self.calendario[mid].fase for mid in nuevos]
+            self.publicar(FaseAvanzada, fase_anterior="", fase_nueva=fases[-1])
+            print(f"✅ {len(nuevos)} partidos de eliminación creados ({', '.join(sorted(set(fases)))}).")
+        return nuevos
 
     # ============================================================
     # 🔹 Obtener ganadores de una fase específica
@@ -300,34 +638,123 @@ class Torneo:
                 ganadores.append(self.equipos[p.id_equipo2])
         return ganadores
 
-def load_teams_from_excel(filename="FIFA_Sub20_2025_Equipos.xlsx"):
+# ============================================================
+# 🔹 Instancia compartida por todas las ventanas del proceso
+# ============================================================
+_torneo_compartido = None
+
+def obtener_torneo():
+    """Devuelve el Torneo único del proceso (se carga de disco solo la primera vez)."""
+    global _torneo_compartido
+    if _torneo_compartido is None:
+        _torneo_compartido = Torneo(ventana_guardado=VENTANA_GUARDADO)
+    return _torneo_compartido
+
+ARCHIVO_EQUIPOS = "FIFA_Sub20_2025_Equipos.xlsx"
+EQUIPOS_EJEMPLO = [
+    "Arabia Saudita","Argentina","Australia","Brasil","Chile","Colombia",
+    "Corea del Sur","Cuba","Egipto","España","Estados Unidos","Francia",
+    "Italia","Japón","Marruecos","México","Nigeria","Noruega",
+    "Nueva Caledonia","Nueva Zelanda","Panamá","Paraguay","Sudáfrica","Ucrania"
+]
+
+@instrumentar("load_teams_from_excel")
+def load_teams_from_excel(filename=ARCHIVO_EQUIPOS):
     path = os.path.join(SCRIPT_DIR, filename)
     if not os.path.exists(path):
         # fallback sample 24
-        sample = [
-            "Arabia Saudita","Argentina","Australia","Brasil","Chile","Colombia",
-            "Corea del Sur","Cuba","Egipto","España","Estados Unidos","Francia",
-            "Italia","Japón","Marruecos","México","Nigeria","Noruega",
-            "Nueva Caledonia","Nueva Zelanda","Panamá","Paraguay","Sudáfrica","Ucrania"
-        ]
-        messagebox.showwarning("Archivo no encontrado", f"No se encontró '{os.path.basename(path)}' en la carpeta del script.\nSe cargó una lista de ejemplo ({len(sample)} países).")
-        return sample
+        messagebox.showwarning("Archivo no encontrado", f"No se encontró '{os.path.basename(path)}' en la carpeta del script.\nSe cargó una lista de ejemplo ({len(EQUIPOS_EJEMPLO)} países).")
+        return list(EQUIPOS_EJEMPLO)
     try:
-        df = pd.read_excel(path)
+        return leer_paises_excel(path)
     except Exception as e:
         messagebox.showerror("Error", f"No se pudo leer '{os.path.basename(path)}': {e}")
         return []
+
+def leer_paises_excel(path, con_confederacion=False):
+    """
+    Lista de países sin repetir de la planilla de equipos (sin diálogos: sirve en un hilo de
+    trabajo). Con con_confederacion devuelve pares (país, confederación).
+    """
+    df = leer_excel(path)
     col_name = None
+    col_conf = None
     for c in df.columns:
-        if str(c).strip().lower() in ('pais','país','equipo','team','country','selección','seleccion'):
+        nombre = str(c).strip().lower()
+        if col_name is None and nombre in ('pais','país','equipo','team','country','selección','seleccion'):
             col_name = c
-            break
+        elif col_conf is None and nombre in ('confederación','confederacion','confederation'):
+            col_conf = c
     if not col_name:
         col_name = df.columns[0]
-    equipos = df[col_name].dropna().astype(str).tolist()
     seen = set(); unique = []
-    for e in equipos:
-        en = e.strip()
+    for _, row in df.iterrows():
+        if pd.isna(row[col_name]):
+            continue
+        en = str(row[col_name]).strip()
         if en and en not in seen:
-            seen.add(en); unique.append(en)
-    return unique
\ No newline at end of file
+            seen.add(en)
+            if con_confederacion:
+                conf = row[col_conf] if col_conf is not None and not pd.isna(row[col_conf]) else ""
+                unique.append((en, str(conf).strip()))
+            else:
+                unique.append(en)
+    return unique
+
+# ============================================================
+# 🔹 Lectura de los libros oficiales (equipos y fixture con fechas)
+# ============================================================
+def fecha_iso(valor):
+    """'27/09/2025', datetime/Timestamp o serial de Excel -> '2025-09-27' ('' si no hay dato)."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime("%Y-%m-%d")
+    if isinstance(valor, (int, float)):
+        return (pd.Timestamp("1899-12-30") + pd.Timedelta(days=int(valor))).strftime("%Y-%m-%d")
+    texto = str(valor).strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return texto
+
+def hora_hhmm(valor):
+    """'17:00', datetime.time o fracción de día de Excel -> '17:00' ('' si no hay dato)."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    if isinstance(valor, (dtime, datetime)):
+        return valor.strftime("%H:%M")
+    if isinstance(valor, (int, float)):
+        minutos = round(float(valor) % 1 * 24 * 60)
+        return f"{minutos // 60:02d}:{minutos % 60:02d}"
+    return str(valor).strip()[:5]
+
+def cargar_equipos_excel(path):
+    """Equipos del libro oficial (Código, País, Abreviatura, Confederación); el grupo es la letra del código."""
+    df = leer_excel(path)
+    equipos = []
+    for _, row in df.iterrows():
+        codigo = str(row['Código']).strip().upper()
+        equipos.append(Equipo(codigo, str(row['País']).strip(), str(row.get('Abreviatura', '') or '').strip(),
+                              str(row.get('Confederación', '') or '').strip(), grupo=codigo[0]))
+    return equipos
+
+def cargar_partidos_grupos_excel(path):
+    """
+    Fixture de la fase de grupos (Fecha, Hora, Código Local, Código Visitante). La jornada se
+    deduce del orden: cada grupo juega dos partidos por jornada.
+    """
+    df = leer_excel(path)
+    partidos = []
+    jugados_por_grupo = {}
+    for _, row in df.iterrows():
+        id1 = str(row['Código Local']).strip().upper()
+        id2 = str(row['Código Visitante']).strip().upper()
+        grupo = id1[0]
+        n = jugados_por_grupo.get(grupo, 0)
+        jugados_por_grupo[grupo] = n + 1
+        partidos.append(Partido(id1, id2, fecha=fecha_iso(row['Fecha']), hora=hora_hhmm(row['Hora']),
+                                fase="Fase de Grupos", grupo=grupo, jornada=n // 2 + 1))
+    return partidos
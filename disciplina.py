@@ -0,0 +1,193 @@
+# disciplina.py
+from typing import Dict, List, Set, Tuple
+
+# Puntos de fair play según reglamento FIFA (por jugador y partido)
+FAIR_PLAY_AMARILLA = -1
+FAIR_PLAY_DOBLE_AMARILLA = -3
+FAIR_PLAY_ROJA_DIRECTA = -4
+FAIR_PLAY_AMARILLA_Y_ROJA = -5
+
+
+class Disciplina:
+    """
+    Acumula tarjetas por equipo y por jugador a medida que se registran resultados
+    y mantiene las suspensiones pendientes para los próximos partidos.
+
+    Los datos por jugador se toman de Partido.jugador_stats, una lista de dicts:
+    {'jugador': 'Nombre', 'equipo': 'A1', 'amarillas': 1, 'rojas': 0}
+    """
+    def __init__(self, umbral_amarillas=2, partidos_por_roja=1, reset_amarillas_tras="Cuartos"):
+        self.umbral_amarillas = umbral_amarillas
+        self.partidos_por_roja = partidos_por_roja
+        self.reset_amarillas_tras = reset_amarillas_tras
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.equipos: Dict[str, dict] = {}
+        self.jugadores: Dict[Tuple[str, str], dict] = {}
+        # equipo -> {jugador: partidos de suspensión aún sin asignar a un partido}
+        self._pendientes: Dict[str, Dict[str, int]] = {}
+        # match_id -> {equipo: {jugadores suspendidos}}
+        self._suspendidos: Dict[str, Dict[str, Set[str]]] = {}
+        # equipo -> match_ids en orden de calendario
+        self._fixtures: Dict[str, List[str]] = {}
+        self._aplicados: Set[str] = set()
+
+    # ============================ CONSULTAS ============================
+    def suspendidos(self, match_id) -> Dict[str, List[str]]:
+        """Jugadores suspendidos para un partido, agrupados por id de equipo."""
+        por_equipo = self._suspendidos.get(match_id, {})
+        return {eq: sorted(js) for eq, js in por_equipo.items() if js}
+
+    def esta_suspendido(self, match_id, equipo_id, jugador):
+        return jugador in self._suspendidos.get(match_id, {}).get(equipo_id, ())
+
+    def resumen_equipo(self, equipo_id):
+        return dict(self.equipos.get(equipo_id, {'TA': 0, 'TR': 0, 'FairPlay': 0}))
+
+    def resumen_jugador(self, equipo_id, jugador):
+        return dict(self.jugadores.get((equipo_id, jugador), {'TA': 0, 'TR': 0, 'Acumuladas': 0}))
+
+    # ============================ ACTUALIZACIÓN ============================
+    def partido_agregado(self, match_id, partido):
+        """Indexa el partido y le asigna suspensiones que estaban esperando un rival."""
+        for eq in (partido.id_equipo1, partido.id_equipo2):
+            self._fixtures.setdefault(eq, []).append(match_id)
+            if self._pendientes.get(eq):
+                self._asignar_pendientes(eq)
+
+    def registrar_partido(self, match_id, partido, equipos=None):
+        """Suma las tarjetas de un partido jugado (una sola vez por partido)."""
+        if match_id in self._aplicados:
+            return
+        self._aplicados.add(match_id)
+        for eq in (partido.id_equipo1, partido.id_equipo2):
+            self._aplicar_lado(partido, eq)
+            if equipos is not None and eq in equipos:
+                self._sincronizar_equipo(equipos[eq])
+
+    def anular_partido(self, match_id, calendario, equipos=None):
+        """
+        Quita el aporte de un partido. Solo se rehace el historial de los dos equipos
+        involucrados (a lo sumo siete partidos cada uno), no el torneo completo.
+        """
+        if match_id not in self._aplicados:
+            return
+        self._aplicados.discard(match_id)
+        partido = calendario[match_id]
+        for eq in (partido.id_equipo1, partido.id_equipo2):
+            self._rehacer_equipo(eq, calendario)
+            if equipos is not None and eq in equipos:
+                self._sincronizar_equipo(equipos[eq])
+
+    def reconstruir(self, calendario, equipos=None):
+        """Recalcula todo desde el calendario (solo al cargar datos)."""
+        self._reiniciar()
+        for mid, p in calendario.items():
+            self.partido_agregado(mid, p)
+        for mid, p in calendario.items():
+            if p.goles_e1 is not None and p.goles_e2 is not None:
+                self.registrar_partido(mid, p)
+        if equipos is not None:
+            for e in equipos.values():
+                self._sincronizar_equipo(e)
+
+    # ============================ INTERNOS ============================
+    def _aplicar_lado(self, partido, eq):
+        if eq == partido.id_equipo1:
+            ta, tr = partido.tarj_ama_e1 or 0, partido.tarj_roja_e1 or 0
+        else:
+            ta, tr = partido.tarj_ama_e2 or 0, partido.tarj_roja_e2 or 0
+        jugadores = [js for js in partido.jugador_stats or []
+                     if js.get('equipo') == eq and js.get('jugador')]
+
+        reg = self.equipos.setdefault(eq, {'TA': 0, 'TR': 0, 'FairPlay': 0})
+        reg['TA'] += ta
+        reg['TR'] += tr
+        if jugadores:
+            reg['FairPlay'] += sum(self._fair_play_jugador(js) for js in jugadores)
+        else:
+            reg['FairPlay'] += FAIR_PLAY_AMARILLA * ta + FAIR_PLAY_ROJA_DIRECTA * tr
+        for js in jugadores:
+            self._sumar_jugador(eq, js)
+
+        if self.reset_amarillas_tras and partido.fase.startswith(self.reset_amarillas_tras):
+            for (e, _), rj in self.jugadores.items():
+                if e == eq:
+                    rj['Acumuladas'] = 0
+
+        self._asignar_pendientes(eq)
+
+    def _rehacer_equipo(self, eq, calendario):
+        self.equipos.pop(eq, None)
+        for clave in [k for k in self.jugadores if k[0] == eq]:
+            del self.jugadores[clave]
+        self._pendientes.pop(eq, None)
+        for mid in self._fixtures.get(eq, []):
+            self._suspendidos.get(mid, {}).pop(eq, None)
+        # se reaplica en orden de calendario marcando como "no jugados" los posteriores
+        aplicados = [mid for mid in self._fixtures.get(eq, []) if mid in self._aplicados]
+        self._aplicados.difference_update(aplicados)
+        for mid in aplicados:
+            self._aplicados.add(mid)
+            self._aplicar_lado(calendario[mid], eq)
+
+    @staticmethod
+    def _fair_play_jugador(js):
+        ama = js.get('amarillas', 0) or 0
+        roja = js.get('rojas', 0) or 0
+        # la doble amarilla suele cargarse también con la roja que la acompaña (amarillas 2, rojas 1)
+        if ama >= 2:
+            return FAIR_PLAY_DOBLE_AMARILLA
+        if roja and ama == 1:
+            return FAIR_PLAY_AMARILLA_Y_ROJA
+        if roja:
+            return FAIR_PLAY_ROJA_DIRECTA
+        return FAIR_PLAY_AMARILLA * ama
+
+    def _sumar_jugador(self, eq, js):
+        nombre = js['jugador']
+        ama = js.get('amarillas', 0) or 0
+        roja = js.get('rojas', 0) or 0
+        rj = self.jugadores.setdefault((eq, nombre), {'TA': 0, 'TR': 0, 'Acumuladas': 0})
+        rj['TA'] += ama
+        rj['TR'] += roja
+        pendientes = self._pendientes.setdefault(eq, {})
+        if roja or ama >= 2:
+            # doble amarilla o roja: las amarillas del partido no se acumulan
+            pendientes[nombre] = pendientes.get(nombre, 0) + self.partidos_por_roja
+            return
+        rj['Acumuladas'] += ama
+        if rj['Acumuladas'] >= self.umbral_amarillas:
+            rj['Acumuladas'] = 0
+            pendientes[nombre] = pendientes.get(nombre, 0) + 1
+
+    def _proximo_partido(self, eq, excluir=()):
+        for mid in self._fixtures.get(eq, []):
+            if mid not in self._aplicados and mid not in excluir:
+                return mid
+        return None
+
+    def _asignar_pendientes(self, eq):
+        pendientes = self._pendientes.get(eq)
+        if not pendientes:
+            return
+        for nombre in list(pendientes):
+            # una fecha de suspensión por partido: se asigna a los siguientes que no la tengan
+            ocupados = {mid for mid in self._fixtures.get(eq, [])
+                        if nombre in self._suspendidos.get(mid, {}).get(eq, ())}
+            while pendientes[nombre] > 0:
+                mid = self._proximo_partido(eq, excluir=ocupados)
+                if mid is None:
+                    break
+                self._suspendidos.setdefault(mid, {}).setdefault(eq, set()).add(nombre)
+                ocupados.add(mid)
+                pendientes[nombre] -= 1
+            if pendientes[nombre] <= 0:
+                del pendientes[nombre]
+
+    def _sincronizar_equipo(self, equipo):
+        reg = self.equipos.get(equipo.identificador, {'TA': 0, 'TR': 0, 'FairPlay': 0})
+        equipo.stats['TA'] = reg['TA']
+        equipo.stats['TR'] = reg['TR']
+        equipo.stats['FairPlay'] = reg['FairPlay']
@@ -2,16 +2,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from utils import apply_style, center_fullscreen
-from core import Torneo, Partido, Equipo
+from core import Torneo, Equipo
+from eventos import ResultadoRegistrado, PartidoAgregado, FaseAvanzada, CruceActualizado
+from llaves import obtener_llaves
+from tareas import obtener_ejecutor, exportar_excel
+from monitor_ui import medir_accion
 import pandas as pd
 import os
 import random
 
 class EliminationUI:
     """
-    Gestiona octavos, cuartos, semis y final.
+    Gestiona las fases de eliminación del formato (dieciseisavos u octavos, cuartos, semis,
+    tercer puesto y final).
     Recibe Torneo ya con resultados de fase de grupos para calcular clasificados.
-    Avance entre fases con botones manuales.
+    Los cruces salen del cuadro oficial (llaves.py): cada resultado lleva al ganador y al
+    perdedor a su próximo partido; los botones solo cambian la fase que se muestra.
     """
     def __init__(self, master, torneo: Torneo):
         self.master = master
@@ -19,8 +25,9 @@ class EliminationUI:
         apply_style(self.master)
         center_fullscreen(self.master)
         self.torneo = torneo
-        self.current_phase = 'Octavos'
-        self.phases_order = ['Octavos','Cuartos','Semifinal','Final']
+        # las fases salen del formato del torneo (Dieciseisavos con 32 clasificados, Octavos con 16...)
+        self.phases_order = torneo.formato.fases_eliminacion
+        self.current_phase = self.phases_order[0]
         # storage for matches per phase
         self.phase_matches = {p: [] for p in self.phases_order}
         # calculate qualifiers (IDs)
@@ -29,106 +36,40 @@ class EliminationUI:
         except Exception as e:
             # _calculate_qualifiers mostrará mensajes adecuados
             self.qualifiers = None
-        # generate octavos according to reglamento (simplified common mapping)
-        if self.qualifiers:
-            self._generate_octavos()
+        try:
+            self.llaves = obtener_llaves(self.torneo)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"No se pudo leer el cuadro de eliminación: {e}")
+            self.llaves = None
+        # generate the first round according to the official bracket
+        if self.qualifiers and self.llaves:
+            self._generate_first_round()
         self.build_ui()
         self.load_phase(self.current_phase)
+        ev = self.torneo.eventos
+        ev.suscribir_widget(self.master, self._on_resultado, ResultadoRegistrado)
+        ev.suscribir_widget(self.master, self._on_partido_agregado, PartidoAgregado)
+        ev.suscribir_widget(self.master, self._on_resultado, CruceActualizado)
 
     def _calculate_qualifiers(self):
-        # Build mapping pais -> id for safe lookup
-        pais_to_id = {e.pais: id for id, e in self.torneo.equipos.items()}
-
-        # take top 2 from each group (return IDs, keep order)
-        groups = sorted(set(e.grupo for e in self.torneo.equipos.values()))
-        firsts = []; seconds = []; thirds = []
-        for g in groups:
-            tabla = self.torneo.calcular_tabla_posiciones(g)
-            if len(tabla) >= 1:
-                pid = pais_to_id.get(tabla[0].pais)
-                if pid: firsts.append(pid)
-            if len(tabla) >= 2:
-                pid = pais_to_id.get(tabla[1].pais)
-                if pid: seconds.append(pid)
-            if len(tabla) >= 3:
-                # store pais and stats for sorting best thirds
-                thirds.append({'pais': tabla[2].pais, 'grupo': g, 'stats': tabla[2].stats})
-
-        # choose best 4 thirds by Pts, DG, GF (convert to ids)
-        thirds_sorted = sorted(thirds, key=lambda t: (t['stats']['Pts'], t['stats']['DG'], t['stats']['GF']), reverse=True)
-        best_thirds_paises = [t['pais'] for t in thirds_sorted[:4]]
-        best_thirds = [pais_to_id[p] for p in best_thirds_paises if p in pais_to_id]
-
-        # combine lists preserving order and remove duplicates while preserving order
-        combined = []
-        for lst in (firsts, seconds, best_thirds):
-            for id_ in lst:
-                if id_ not in combined:
-                    combined.append(id_)
-
-        # After building, there must be exactly 16 unique teams for octavos
-        if len(combined) != 16:
-            messagebox.showerror("Error", f"Se esperaban 16 equipos para octavos, pero se encontraron {len(combined)}. Revisa los resultados de fase de grupos.")
-            raise Exception("Insuficientes clasificados para octavos")
-
-        # return structured dict of ids to preserve previous API
-        # We'll keep keys '1os','2os','3os_best' but with IDs
-        # For convenience, compute firsts_ids and seconds_ids trimmed to group counts
-        # reconstruct firsts and seconds in same order but only ids (avoid duplicates)
-        # Note: original UI expects qualifiers['1os'] etc; keep same keys but with IDs
-        # We'll return firsts (6), seconds (6), best_thirds (4)
-        # Ensure lengths: firsts len(groups), seconds len(groups)
-        firsts_ids = [id for id in firsts if id in self.torneo.equipos]
-        seconds_ids = [id for id in seconds if id in self.torneo.equipos]
-        third_ids = best_thirds
-        return {'1os': firsts_ids, '2os': seconds_ids, '3os_best': third_ids}
-
-    def _generate_octavos(self):
-        # Use the validated qualifier IDs to build 8 matches without duplicates
-        if not self.qualifiers:
-            return
-
-        f = self.qualifiers['1os']
-        s = self.qualifiers['2os']
-        t = self.qualifiers['3os_best']
-
-        # Validate we have exactly 16 unique IDs
-        combined = []
-        for lst in (f, s, t):
-            for id_ in lst:
-                if id_ not in combined:
-                    combined.append(id_)
-        if len(combined) != 16:
-            messagebox.showerror("Error", "No se pudo generar Octavos: la lista de clasificados no contiene 16 equipos únicos.")
-            return
-
-        # Build 8 pairs determinísticamente: emparejar en orden (0-1, 2-3, ...)
-        pairs = []
-        for i in range(0, 16, 2):
-            a = combined[i]; b = combined[i+1]
-            # safety: si por alguna razón a==b (no debería): intentar buscar un compañero distinto
-            if a == b:
-                # buscar primer id distinto
-                for cand in combined:
-                    if cand != a and (a, cand) not in pairs and (cand, a) not in pairs:
-                        b = cand
-                        break
-            if a != b:
-                pairs.append((a, b))
-
-        # If for alguna razón no llegamos a 8 parejas, intentar rellenar
-        i = 0
-        ids = combined.copy()
-        while len(pairs) < 8 and i + 1 < len(ids):
-            if (ids[i], ids[i+1]) not in pairs and ids[i] != ids[i+1]:
-                pairs.append((ids[i], ids[i+1]))
-            i += 2
+        qualifiers = self.torneo.calcular_clasificados()
+        combined = {i for ids in qualifiers.values() for i in ids}
+        # After building, there must be exactly as many unique teams as the format qualifies
+        esperados = self.torneo.formato.cantidad_clasificados
+        if len(combined) != esperados:
+            messagebox.showerror("Error", f"Se esperaban {esperados} equipos para {self.current_phase}, pero se encontraron {len(combined)}. Revisa los resultados de fase de grupos.")
+            raise Exception(f"Insuficientes clasificados para {self.current_phase}")
+        return qualifiers
 
-        # create Partido objects
-        for a, b in pairs:
-            p = Partido(a, b, fecha="", hora="", fase="Octavos")
-            mid = self.torneo.agregar_partido(p)
-            self.phase_matches['Octavos'].append(mid)
+    def _generate_first_round(self):
+        # Cruces por código oficial (M37...); si ya existen solo se completan los cupos pendientes
+        self.llaves.sincronizar(self.torneo)
+        fase = self.phases_order[0]
+        for n in self.llaves.por_fase().get(fase, []):
+            encontrado = self.torneo.partido_por_codigo(n.codigo)
+            if encontrado:
+                self.phase_matches[fase].append(encontrado[0])
+        self.torneo.guardar_datos()
 
     def build_ui(self):
         header = ttk.Frame(self.master,padding=8); header.pack(fill='x')
@@ -150,11 +91,24 @@ class EliminationUI:
         # show matches that have p.fase == phase
         for mid, p in self.torneo.calendario.items():
             if p.fase != phase: continue
-            e1 = self.torneo.equipos.get(p.id_equipo1).pais if p.id_equipo1 in self.torneo.equipos else p.id_equipo1
-            e2 = self.torneo.equipos.get(p.id_equipo2).pais if p.id_equipo2 in self.torneo.equipos else p.id_equipo2
-            res = f"{p.goles_e1} : {p.goles_e2}" if p.goles_e1 is not None else "PENDIENTE"
-            self.tree.insert("", tk.END, iid=mid, values=(mid, p.fase, e1, p.goles_e1 if p.goles_e1 is not None else "", "vs", p.goles_e2 if p.goles_e2 is not None else "", e2, res))
+            self.tree.insert("", tk.END, iid=mid, values=self._row_values(mid, p))
+
+    def _row_values(self, mid, p):
+        e1 = self.torneo.equipos.get(p.id_equipo1).pais if p.id_equipo1 in self.torneo.equipos else p.id_equipo1
+        e2 = self.torneo.equipos.get(p.id_equipo2).pais if p.id_equipo2 in self.torneo.equipos else p.id_equipo2
+        res = f"{p.goles_e1} : {p.goles_e2}" if p.goles_e1 is not None else "PENDIENTE"
+        return (mid, p.fase, e1, p.goles_e1 if p.goles_e1 is not None else "", "vs", p.goles_e2 if p.goles_e2 is not None else "", e2, res)
 
+    # ----- eventos del torneo compartido: solo se tocan las filas afectadas -----
+    def _on_resultado(self, evento):
+        if self.tree.exists(evento.match_id):
+            self.tree.item(evento.match_id, values=self._row_values(evento.match_id, evento.partido))
+
+    def _on_partido_agregado(self, evento):
+        if evento.partido.fase == self.current_phase and not self.tree.exists(evento.match_id):
+            self.tree.insert("", tk.END, iid=evento.match_id, values=self._row_values(evento.match_id, evento.partido))
+
+    @medir_accion("doble clic → diálogo (eliminación)")
     def _on_double_click(self, event):
         item = self.tree.selection()
         if not item:
@@ -214,6 +168,7 @@ class EliminationUI:
             pen1, pen2 = simulate_penales()
             return (g1_et, g2_et, (et1, et2), (pen1, pen2))
 
+        @medir_accion("guardar → tabla (eliminación)")
         def save():
             try:
                 g1 = int(e1.get()); g2 = int(e2.get())
@@ -222,19 +177,18 @@ class EliminationUI:
                 return
 
             # If this match is in an elimination phase, handle tie-break rules
+            penales = None
             if p.fase in self.phases_order:
                 # if tie, simulate alargue and possibly penales
                 if g1 == g2:
                     g1_final, g2_final, alargue_res, penales_res = simulate_alargue_and_penales(g1, g2)
-                    # store final goles (including alargue) and also attach extra info
-                    p.goles_e1 = g1_final
-                    p.goles_e2 = g2_final
+                    # final goles include alargue; the extra info goes with the result
                     if alargue_res:
-                        p.alargue = {'goles_et1': alargue_res[0], 'goles_et2': alargue_res[1]}
+                        alargue = {'goles_et1': alargue_res[0], 'goles_et2': alargue_res[1]}
                     else:
-                        p.alargue = {'goles_et1': 0, 'goles_et2': 0}
+                        alargue = {'goles_et1': 0, 'goles_et2': 0}
                     if penales_res:
-                        p.penales = {'p1': penales_res[0], 'p2': penales_res[1]}
+                        penales = {'p1': penales_res[0], 'p2': penales_res[1]}
                         # Winner determined by penales; do not alter goles, penales decide
                         winner = e1_name if penales_res[0] > penales_res[1] else e2_name
                         msg = f"Empate en tiempo regular ({g1} - {g2}). Alargue: {alargue_res[0]} - {alargue_res[1]}. Penales: {penales_res[0]} - {penales_res[1]}. Clasificado: {winner}."
@@ -243,22 +197,23 @@ class EliminationUI:
                         winner = e1_name if g1_final > g2_final else e2_name
                         msg = f"Empate en tiempo regular ({g1} - {g2}). Resultado tras alargue: {g1_final} - {g2_final}. Clasificado: {winner}."
                 else:
-                    # No empate: resultado normal
-                    p.goles_e1 = g1; p.goles_e2 = g2
-                    # clear previous tie-break attributes if present
-                    if hasattr(p, 'alargue'): delattr(p, 'alargue') if False else None
-                    if hasattr(p, 'penales'): delattr(p, 'penales') if False else None
+                    # No empate: resultado normal (clears previous tie-break info)
+                    g1_final, g2_final, alargue = g1, g2, None
                     winner = e1_name if g1 > g2 else e2_name
                     msg = f"Resultado guardado: {e1_name} {g1} : {g2} {e2_name}. Clasificado: {winner}."
             else:
                 # Not an elimination match: just save as entered
-                p.goles_e1 = g1; p.goles_e2 = g2
+                g1_final, g2_final, alargue = g1, g2, p.alargue
                 msg = f"Resultado guardado: {e1_name} {g1} : {g2} {e2_name}."
 
-            # save and refresh
-            self.torneo.guardar_datos()
+            # Same path as the CLI/API/ingesta: aporte, auditoría, disciplina y evento
+            # (la fila y el cuadro se actualizan vía ResultadoRegistrado)
+            p.alargue = alargue
+            if not self.torneo.registrar_resultado(mid, g1_final, g2_final, p.tarj_ama_e1, p.tarj_ama_e2,
+                                                   p.tarj_roja_e1, p.tarj_roja_e2, jugador_stats=p.jugador_stats,
+                                                   penales=penales):
+                return
             win.destroy()
-            self.load_phase(self.current_phase)
 
             # mostrar mensaje solo si hubo empate y se aplicó alargue/penales
             if p.fase in self.phases_order and g1 == g2:
@@ -280,53 +235,42 @@ class EliminationUI:
             e2 = self.torneo.equipos.get(p.id_equipo2).pais if p.id_equipo2 in self.torneo.equipos else p.id_equipo2
             # include extra info if present
             extra = ""
-            if hasattr(p, 'alargue'):
+            if p.alargue:
                 extra += f" Alargue {p.alargue.get('goles_et1',0)}-{p.alargue.get('goles_et2',0)}"
-            if hasattr(p, 'penales'):
+            if p.penales:
                 extra += f" Penales {p.penales.get('p1',0)}-{p.penales.get('p2',0)}"
             rows.append({'ID': mid, 'Fase': p.fase, 'Equipo1': e1, 'G1': p.goles_e1, 'G2': p.goles_e2, 'Equipo2': e2, 'Extra': extra})
         out = os.path.join(os.path.dirname(__file__), f"Resultados_{self.current_phase}.xlsx")
-        try:
-            pd.DataFrame(rows).to_excel(out, index=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar: {e}")
-            return
-        messagebox.showinfo("Guardado", f"Fase {self.current_phase} guardada y exportada.")
+        fase = self.current_phase
+        # la exportación corre en segundo plano; dos guardados seguidos de la misma fase se encolan
+        obtener_ejecutor(self.master).enviar(
+            exportar_excel, pd.DataFrame(rows), out, titulo=f"Exportando {fase}", archivos=(out,),
+            al_terminar=lambda _: messagebox.showinfo("Guardado", f"Fase {fase} guardada y exportada."),
+            al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo exportar: {e}"),
+            master=self.master)
 
+    @medir_accion("cambiar de fase")
     def next_phase(self):
         idx = self.phases_order.index(self.current_phase)
         if idx < len(self.phases_order) - 1:
             # confirm
             if not messagebox.askyesno("Confirmar", f"¿Desea avanzar a la siguiente fase ({self.phases_order[idx+1]})?"):
                 return
-            # compute winners from current phase to produce next phase matches (simple pairing sequential)
-            winners = []
+            # every match must be resolved; the bracket already placed winners and losers
             for mid, p in list(self.torneo.calendario.items()):
                 if p.fase != self.current_phase: continue
                 if p.goles_e1 is None or p.goles_e2 is None:
                     messagebox.showwarning("Faltan resultados", "Hay partidos sin resultado. Complete antes de avanzar.")
                     return
-                # For elimination matches, penales or alargue must have resolved winner and goles reflect final state
-                if p.goles_e1 > p.goles_e2:
-                    winners.append(p.id_equipo1)
-                elif p.goles_e2 > p.goles_e1:
-                    winners.append(p.id_equipo2)
-                else:
+                if not p.ganador():
                     # As a safety fallback: if still tied (no debería suceder) preguntar al usuario
                     messagebox.showwarning("Empate detectado", f"Empate detectado en {mid}. Debe resolverse antes de continuar.")
                     return
-            # pair winners sequentially
             next_phase = self.phases_order[idx + 1]
-            pairs = []
-            i = 0
-            while i + 1 < len(winners):
-                pairs.append((winners[i], winners[i + 1])); i += 2
-            # create Partido for next phase
-            for a, b in pairs:
-                pp = Partido(a, b, fecha="", hora="", fase=next_phase)
-                self.torneo.agregar_partido(pp)
+            previous_phase = self.current_phase
             self.current_phase = next_phase
             self.torneo.guardar_datos()
             self.load_phase(self.current_phase)
+            self.torneo.publicar(FaseAvanzada, fase_anterior=previous_phase, fase_nueva=next_phase)
         else:
             messagebox.showinfo("Info", "Ya estás en la última fase.")
\ No newline at end of file
@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
-import pandas as pd
 from PIL import Image, ImageTk
 import os
+from metricas import leer_excel, medir
 
 class EliminationBracketUI:
     def __init__(self, master):
@@ -23,13 +23,17 @@ class EliminationBracketUI:
     def load_data(self):
         """Lee los datos desde el Excel y construye las llaves."""
         try:
-            df = pd.read_excel("partidos.xlsx")
+            df = leer_excel("partidos.xlsx")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo leer 'partidos.xlsx': {e}")
             return
 
         fases = ["Octavos", "Cuartos", "Semifinal", "Final"]
-        x_positions = [150, 450, 750, 1050]
+        # con 32 clasificados la planilla trae además los dieciseisavos
+        if (df["Fase"].str.lower() == "dieciseisavos").any():
+            fases.insert(0, "Dieciseisavos")
+        paso = 900 // max(len(fases) - 1, 1)
+        x_positions = [150 + paso * i for i in range(len(fases))]
         y_start = 120
         y_spacing = 80
 
@@ -92,7 +96,8 @@ class EliminationBracketUI:
         if not os.path.exists(path):
             return None
         try:
-            img = Image.open(path).resize((40, 25))
-            return ImageTk.PhotoImage(img)
+            with medir("banderas"):
+                img = Image.open(path).resize((40, 25))
+                return ImageTk.PhotoImage(img)
         except Exception:
             return None
\ No newline at end of file
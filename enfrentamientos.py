@@ -0,0 +1,165 @@
+# enfrentamientos.py
+"""
+Índice de historial entre selecciones y de cada selección por fase, sobre el archivo
+histórico (archivo_historico.py) más el torneo en curso.
+
+Las claves son nombres de país (lo único estable entre ediciones): el par no ordenado
+para el cara a cara y (país, fase) para el récord por fase. Cada clave guarda totales ya
+sumados, así que una consulta es un lookup. Los resultados del torneo en curso entran y
+salen incrementalmente con ResultadoRegistrado (registro, corrección o anulación); los
+penales cuentan como empate, igual que en el archivo.
+"""
+from typing import Dict, Optional
+from eventos import ResultadoRegistrado
+from archivo_historico import ArchivoHistorico, FASES, origen_torneo
+
+CAMPOS = ('PJ', 'G', 'E', 'P', 'GF', 'GC')
+
+
+class Agregado:
+    """Totales desde el punto de vista de un equipo (en un par, el primero en orden alfabético)."""
+    __slots__ = ('PJ', 'G', 'E', 'P', 'GF', 'GC', '_partidos', '_ultimo')
+
+    def __init__(self):
+        self.PJ = self.G = self.E = self.P = self.GF = self.GC = 0
+        self._partidos = {}      # clave del partido -> (orden, resumen)
+        self._ultimo = None
+
+    def sumar(self, clave, gf, gc, orden, resumen, signo=1):
+        self.PJ += signo
+        self.G += signo * (gf > gc)
+        self.E += signo * (gf == gc)
+        self.P += signo * (gf < gc)
+        self.GF += signo * gf
+        self.GC += signo * gc
+        if signo > 0:
+            entrada = self._partidos[clave] = (orden, resumen)
+            if self._ultimo is None or orden >= self._ultimo[0]:
+                self._ultimo = entrada
+        else:
+            quitado = self._partidos.pop(clave, None)
+            # solo hace falta buscar otro último si se quitó justamente ese
+            if quitado is not None and quitado is self._ultimo:
+                self._ultimo = max(self._partidos.values(), key=lambda x: x[0], default=None)
+
+    def como_dict(self, invertir=False):
+        d = {c: getattr(self, c) for c in CAMPOS}
+        if invertir:
+            d['G'], d['P'] = d['P'], d['G']
+            d['GF'], d['GC'] = d['GC'], d['GF']
+        ultimo = self._ultimo[1] if self._ultimo else None
+        d['ultimo'] = dict(ultimo) if ultimo else None
+        return d
+
+
+class IndiceEnfrentamientos:
+    def __init__(self, torneo, archivo: Optional[ArchivoHistorico] = None):
+        self.torneo = torneo
+        self.archivo = archivo if archivo is not None else ArchivoHistorico()
+        self._pares: Dict[tuple, Agregado] = {}
+        self._fases: Dict[tuple, Agregado] = {}
+        self._aportes: Dict[str, tuple] = {}     # match_id del torneo en curso -> lo que sumó
+        self._token = None
+        self.reconstruir()
+
+    # ============================ CONSTRUCCIÓN ============================
+    def reconstruir(self):
+        self._pares, self._fases, self._aportes = {}, {}, {}
+        a = self.archivo
+        if len(a):
+            equipos = a.meta['equipos']
+            torneos = a.meta['torneos']
+            # el torneo en curso puede estar ya archivado (con cualquier nombre): se toma en vivo, no del archivo
+            origen = origen_torneo(self.torneo)
+            # (los agregados antes de que el archivo guardara 'origen' se reconocen por nombre)
+            propios = {i for i, t in enumerate(torneos)
+                       if t.get('origen') == origen or ('origen' not in t and t['nombre'] == self.torneo.nombre)}
+            col = {c: a.columna(c).tolist() for c in ('torneo', 'anio', 'fecha', 'fase', 'equipo1', 'equipo2', 'goles1', 'goles2')}
+            for i in range(len(a)):
+                if col['torneo'][i] in propios:
+                    continue
+                nombre_torneo = torneos[col['torneo'][i]]['nombre']
+                fecha = col['fecha'][i]
+                self._sumar(('archivo', i), equipos[col['equipo1'][i]], equipos[col['equipo2'][i]],
+                            col['goles1'][i], col['goles2'][i], FASES[col['fase'][i]],
+                            (col['anio'][i], str(fecha) if fecha else "", 0, i), nombre_torneo)
+        for mid, p in self.torneo.calendario.items():
+            self._actualizar_partido(mid, p)
+
+    def conectar(self):
+        if self._token is None:
+            self._token = self.torneo.eventos.suscribir(self._al_registrar, ResultadoRegistrado)
+
+    def desconectar(self):
+        if self._token is not None:
+            self.torneo.eventos.desuscribir(self._token)
+            self._token = None
+
+    def _al_registrar(self, evento):
+        self._actualizar_partido(evento.match_id, evento.partido)
+
+    def _actualizar_partido(self, mid, p):
+        """Quita lo que el partido había sumado y, si tiene resultado, suma el nuevo."""
+        anterior = self._aportes.pop(mid, None)
+        if anterior is not None:
+            self._sumar(*anterior, signo=-1)
+        if p is None or not p.jugado():
+            return
+        e1, e2 = self.torneo.equipos.get(p.id_equipo1), self.torneo.equipos.get(p.id_equipo2)
+        if e1 is None or e2 is None:
+            return
+        anio = int(str(self.torneo.fecha_inicio)[:4])
+        aporte = (('torneo', mid), e1.pais, e2.pais, p.goles_e1, p.goles_e2, p.fase,
+                  (anio, p.fecha or "", 1, mid), self.torneo.nombre)
+        self._aportes[mid] = aporte
+        self._sumar(*aporte)
+
+    def _sumar(self, clave, pais1, pais2, g1, g2, fase, orden, nombre_torneo, signo=1):
+        resumen = (('torneo', nombre_torneo), ('anio', orden[0]), ('fecha', orden[1]), ('fase', fase),
+                   ('equipo1', pais1), ('equipo2', pais2), ('goles1', g1), ('goles2', g2))
+        a, b = sorted((pais1, pais2))
+        gf, gc = (g1, g2) if a == pais1 else (g2, g1)
+        par = self._pares.get((a, b))
+        if par is None:
+            par = self._pares[(a, b)] = Agregado()
+        par.sumar(clave, gf, gc, orden, resumen, signo)
+        for pais, propios, ajenos in ((pais1, g1, g2), (pais2, g2, g1)):
+            agregado = self._fases.get((pais, fase))
+            if agregado is None:
+                agregado = self._fases[(pais, fase)] = Agregado()
+            agregado.sumar(clave, propios, ajenos, orden, resumen, signo)
+
+    # ============================ CONSULTAS ============================
+    def cara_a_cara(self, pais_a, pais_b):
+        """Totales de pais_a contra pais_b (G = victorias de pais_a) y el último partido."""
+        a, b = sorted((pais_a, pais_b))
+        par = self._pares.get((a, b))
+        if par is None or not par.PJ:
+            return None
+        return par.como_dict(invertir=pais_a != a)
+
+    def en_fase(self, pais, fase):
+        agregado = self._fases.get((pais, fase))
+        return agregado.como_dict() if agregado is not None and agregado.PJ else None
+
+    def por_fase(self, pais):
+        """{fase: totales} del país, en el orden de FASES."""
+        return {f: d for f in FASES if (d := self.en_fase(pais, f)) is not None}
+
+    def paises(self):
+        return sorted({p for par in self._pares for p in par})
+
+
+_indice = None
+
+
+def obtener_indice(torneo=None):
+    """Índice único del proceso, conectado a los resultados del Torneo compartido."""
+    global _indice
+    if _indice is None:
+        if torneo is None:
+            from core import obtener_torneo
+            torneo = obtener_torneo()
+        _indice = IndiceEnfrentamientos(torneo)
+        _indice.conectar()
+    return _indice
@@ -0,0 +1,198 @@
+# escenarios.py
+"""
+Calculadora exacta de clasificación para las últimas jornadas de la fase de grupos.
+
+Se enumeran los resultados (G/E/P) de los partidos pendientes de cada grupo. Un empate en
+puntos entre dos equipos que ya jugaron todo se decide como en la tabla (DG, GF y el orden
+de carga, formatos.clave_tabla); si alguno de los dos todavía juega, los goles que faltan
+pueden inclinarlo para cualquier lado y el empate se considera abierto. Para la comparación
+de terceros entre grupos se usa el mínimo y el máximo de puntos con que puede terminar el
+tercero de cada grupo, y el desempate real cuando ese grupo ya terminó; cada grupo se
+resume una vez (memoizado) y el cruce entre grupos es lineal.
+"""
+from functools import lru_cache
+from itertools import product
+from formatos import clave_tabla
+
+CLASIFICADO = "Clasificado"
+ELIMINADO = "Eliminado"
+EN_CARRERA = "En carrera"
+
+# puntos (local, visitante) para victoria local, empate y victoria visitante
+_RESULTADOS = {'G': (3, 0), 'E': (1, 1), 'P': (0, 3)}
+_ORDEN_EXIGENCIA = {'P': 0, 'E': 1, 'G': 2}
+
+
+@lru_cache(maxsize=None)
+def _desenlaces(puntos, pendientes):
+    """
+    Vectores de puntos finales posibles de un grupo, sin repetidos (ramas simétricas que
+    terminan igual se cuentan una sola vez). `puntos` es una tupla por equipo y `pendientes`
+    una tupla de pares de índices. Devuelve {vector_final: [combinaciones de resultados]}.
+    """
+    finales = {}
+    for combo in product('GEP', repeat=len(pendientes)):
+        pts = list(puntos)
+        for (a, b), r in zip(pendientes, combo):
+            pa, pb = _RESULTADOS[r]
+            pts[a] += pa
+            pts[b] += pb
+        finales.setdefault(tuple(pts), []).append(combo)
+    return finales
+
+
+def _tercer_puntaje(pts, posicion=3):
+    return sorted(pts, reverse=True)[posicion - 1] if len(pts) >= posicion else None
+
+
+class ResumenGrupo:
+    def __init__(self, grupo, equipos, puntos, pendientes, posicion_mejores=3, desempates=None, indice=0):
+        self.grupo = grupo
+        self.indice = indice                    # orden del grupo: a igualdad total pasa el primero
+        self.equipos = equipos                  # ids en orden fijo
+        self.pendientes = pendientes            # [(match_id, i, j)]
+        # desempate (DG, GF, -orden de carga) de quien ya no juega; None si todavía tiene partidos
+        ocupados = {k for _, a, b in pendientes for k in (a, b)}
+        desempates = desempates or [None] * len(equipos)
+        self.fijos = [None if k in ocupados else desempates[k] for k in range(len(equipos))]
+        self.desenlaces = _desenlaces(tuple(puntos), tuple((i, j) for _, i, j in pendientes))
+        # "tercero" es el primer puesto que no pasa directo (el que compite entre grupos)
+        terceros = [_tercer_puntaje(v, posicion_mejores) for v in self.desenlaces]
+        self.tercero_min = min(terceros) if terceros else None
+        self.tercero_max = max(terceros) if terceros else None
+        # con el grupo terminado el tercero es un equipo concreto: (Pts, DG, GF) reales
+        self.tercero_clave = None
+        if not pendientes and len(equipos) >= posicion_mejores:
+            orden = sorted(range(len(equipos)), key=lambda k: (puntos[k],) + self.fijos[k], reverse=True)
+            k = orden[posicion_mejores - 1]
+            self.tercero_clave = (puntos[k],) + self.fijos[k][:2]
+
+
+def _resumir_grupos(torneo, posicion_mejores=3):
+    por_grupo = {}
+    desempate = {}
+    for n, e in enumerate(torneo.equipos.values()):
+        if e.grupo:
+            por_grupo.setdefault(e.grupo, []).append(e.identificador)
+            # mismo criterio que Torneo.calcular_tabla_posiciones: a igualdad, el orden de carga
+            desempate[e.identificador] = clave_tabla(e)[1:] + (-n,)
+    resumenes = {}
+    for indice, (g, ids) in enumerate(sorted(por_grupo.items())):
+        ids = sorted(ids)
+        pos = {id: n for n, id in enumerate(ids)}
+        puntos = [0] * len(ids)
+        pendientes = []
+        for mid, p in torneo.calendario.items():
+            if p.fase != "Fase de Grupos" or p.id_equipo1 not in pos or p.id_equipo2 not in pos:
+                continue
+            i, j = pos[p.id_equipo1], pos[p.id_equipo2]
+            if p.jugado():
+                pa, pb = _RESULTADOS['G' if p.goles_e1 > p.goles_e2 else 'E' if p.goles_e1 == p.goles_e2 else 'P']
+                puntos[i] += pa
+                puntos[j] += pb
+            else:
+                pendientes.append((mid, i, j))
+        resumenes[g] = ResumenGrupo(g, ids, puntos, pendientes, posicion_mejores,
+                                    [desempate[id] for id in ids], indice)
+    return resumenes
+
+
+def _mejor_y_peor_puesto(pts, i, fijos):
+    """Mejor y peor puesto posibles de i; los empates entre equipos que ya no juegan están decididos."""
+    mejor = peor = 1
+    for k, p in enumerate(pts):
+        if k == i or p < pts[i]:
+            continue
+        if p > pts[i] or (fijos[i] is not None and fijos[k] is not None and fijos[k] > fijos[i]):
+            mejor += 1
+            peor += 1
+        elif fijos[i] is None or fijos[k] is None:
+            peor += 1
+    return mejor, peor
+
+
+def calcular_escenarios(torneo, mejores_terceros=None, directos=None):
+    """
+    {id_equipo: {'estado', 'puntos_max', 'asegura': [condiciones mínimas], 'grupo'}}.
+    'asegura' lista las combinaciones más débiles de resultados propios que garantizan la
+    clasificación pase lo que pase en el resto de los partidos. Sin argumentos, los directos
+    y los mejores terceros salen del formato del torneo.
+    """
+    formato = torneo.formato
+    if directos is None:
+        directos = formato.directos_por_grupo
+    if mejores_terceros is None:
+        mejores_terceros = formato.mejores_por_posicion.get(directos + 1, 0)
+    resumenes = _resumir_grupos(torneo, directos + 1)
+    grupos_con_tercero = [r for r in resumenes.values() if r.tercero_min is not None]
+    resultado = {}
+
+    for r in resumenes.values():
+        otros = [o for o in grupos_con_tercero if o is not r]
+
+        def _arriba(o, clave):
+            # desempate real entre terceros ya definidos (a igualdad total, el grupo anterior)
+            return o.tercero_clave > clave or (o.tercero_clave == clave and o.indice < r.indice)
+
+        def _seguro_como_tercero(p, clave):
+            # en el peor caso empatan o superan todos los terceros que puedan llegar a p
+            return sum(1 for o in otros
+                       if (_arriba(o, clave) if clave and o.tercero_clave else o.tercero_max >= p)) < mejores_terceros
+
+        def _posible_como_tercero(p, clave):
+            return sum(1 for o in otros
+                       if (_arriba(o, clave) if clave and o.tercero_clave else o.tercero_min > p)) < mejores_terceros
+
+        for i, id_equipo in enumerate(r.equipos):
+            seguro_por_combo = {}
+            posible = False
+            for final, combos in r.desenlaces.items():
+                mejor, peor = _mejor_y_peor_puesto(final, i, r.fijos)
+                clave = (final[i],) + r.fijos[i][:2] if r.fijos[i] is not None else None
+                seguro = peor <= directos or (peor == directos + 1 and _seguro_como_tercero(final[i], clave))
+                posible = posible or mejor <= directos or (mejor <= directos + 1 and _posible_como_tercero(final[i], clave))
+                for combo in combos:
+                    seguro_por_combo[combo] = seguro
+
+            propios = [n for n, (_, a, b) in enumerate(r.pendientes) if i in (a, b)]
+            if seguro_por_combo and all(seguro_por_combo.values()):
+                estado = CLASIFICADO
+            elif not posible:
+                estado = ELIMINADO
+            else:
+                estado = EN_CARRERA
+            resultado[id_equipo] = {
+                'grupo': r.grupo,
+                'estado': estado,
+                'puntos_max': max(final[i] for final in r.desenlaces),
+                'asegura': _condiciones_minimas(torneo, r, i, propios, seguro_por_combo) if estado == EN_CARRERA else [],
+            }
+    return resultado
+
+
+def _condiciones_minimas(torneo, r, i, propios, seguro_por_combo):
+    """Combinaciones de resultados propios (desde el punto de vista del equipo) que aseguran el pase."""
+    def _propio(n, res):
+        # el resultado del partido n traducido al punto de vista del equipo i
+        _, a, _ = r.pendientes[n]
+        return res if a == i else {'G': 'P', 'P': 'G'}.get(res, res)
+
+    garantizan = []
+    for propio in product('GEP', repeat=len(propios)):
+        combos = [c for c in seguro_por_combo if tuple(_propio(n, c[n]) for n in propios) == propio]
+        if combos and all(seguro_por_combo[c] for c in combos):
+            garantizan.append(propio)
+    # se descartan las dominadas: si empatar ya alcanza, no hace falta listar ganar
+    minimas = [g for g in garantizan
+               if not any(h != g and all(_ORDEN_EXIGENCIA[x] <= _ORDEN_EXIGENCIA[y] for x, y in zip(h, g))
+                          for h in garantizan)]
+    textos = []
+    for combo in minimas:
+        partes = []
+        for n, res in zip(propios, combo):
+            mid, a, b = r.pendientes[n]
+            rival = torneo.equipos[r.equipos[b if a == i else a]].pais
+            partes.append({'G': f"ganarle a {rival}", 'E': f"empatar o ganarle a {rival}",
+                           'P': f"cualquier resultado ante {rival}"}[res])
+        textos.append(" y ".join(partes))
+    return textos
@@ -0,0 +1,86 @@
+# eventos.py
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+# ============================ TIPOS DE EVENTO ============================
+@dataclass(frozen=True)
+class Evento:
+    version: int = field(default=0, compare=False)
+
+
+@dataclass(frozen=True)
+class ResultadoRegistrado(Evento):
+    """Se registró, corrigió o anuló el resultado de un partido."""
+    match_id: str = ""
+    accion: str = "registro"        # 'registro' | 'correccion' | 'anulacion'
+    partido: Any = None
+
+
+@dataclass(frozen=True)
+class PartidoAgregado(Evento):
+    match_id: str = ""
+    partido: Any = None
+
+
+@dataclass(frozen=True)
+class CruceActualizado(Evento):
+    """Cambió un equipo de un partido de eliminación todavía sin jugar."""
+    match_id: str = ""
+    partido: Any = None
+
+
+@dataclass(frozen=True)
+class PartidoReprogramado(Evento):
+    """Cambió la fecha u hora de un partido."""
+    match_id: str = ""
+    partido: Any = None
+
+
+@dataclass(frozen=True)
+class FaseAvanzada(Evento):
+    fase_anterior: str = ""
+    fase_nueva: str = ""
+
+
+# ============================ BUS ============================
+class BusEventos:
+    """
+    Publicación/suscripción en proceso. Los callbacks se ejecutan en el hilo que publica,
+    por lo que desde la UI de Tk siempre se publica en el hilo principal.
+    """
+    def __init__(self):
+        self._suscriptores: Dict[int, Tuple[Callable, Optional[Tuple[Type[Evento], ...]]]] = {}
+        self._siguiente = 1
+
+    def suscribir(self, callback, tipos=None):
+        """Registra un callback (opcionalmente solo para ciertos tipos). Devuelve un token."""
+        if tipos is not None and not isinstance(tipos, tuple):
+            tipos = tuple(tipos) if isinstance(tipos, (list, set)) else (tipos,)
+        token = self._siguiente
+        self._siguiente += 1
+        self._suscriptores[token] = (callback, tipos)
+        return token
+
+    def desuscribir(self, token):
+        self._suscriptores.pop(token, None)
+
+    def publicar(self, evento):
+        for token, (callback, tipos) in list(self._suscriptores.items()):
+            if tipos is not None and not isinstance(evento, tipos):
+                continue
+            try:
+                callback(evento)
+            except Exception as e:
+                # un suscriptor roto (p. ej. ventana ya destruida) no debe cortar al resto
+                print(f"Error en suscriptor de eventos {token}: {e}")
+
+    def suscribir_widget(self, widget, callback, tipos=None):
+        """Suscribe y se desuscribe solo cuando se destruye el widget de Tk."""
+        token = self.suscribir(callback, tipos)
+
+        def _al_destruir(event):
+            if event.widget is widget:
+                self.desuscribir(token)
+        widget.bind("<Destroy>", _al_destruir, add="+")
+        return token
@@ -0,0 +1,189 @@
+# formatos.py
+"""
+Formato del torneo como dato: grupos, equipos por grupo, clasificados directos por grupo,
+cuántos mejores ubicados pasan de cada puesto y el cuadro de eliminación.
+
+    sub20-24    6 grupos de 4, pasan 2 por grupo + 4 mejores terceros (16, cuadro en Excel)
+    mundial-32  8 grupos de 4, pasan 2 por grupo (16, cuadro generado)
+    mundial-48  12 grupos de 4, pasan 2 por grupo + 8 mejores terceros (32, cuadro generado)
+
+El formato se elige con MUNDIAL_FORMATO (nombre de los de arriba o ruta a un .json con los
+mismos campos) y queda guardado en torneo_data.json junto con el torneo.
+
+Los clasificados se calculan en una pasada: cada equipo va a la tabla de su grupo y los
+mejores k de cada puesto se eligen con heapq.nlargest, O(n log k), sin ordenar la lista
+completa de candidatos.
+"""
+import os
+import json
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FORMATO_PREDETERMINADO = "sub20-24"
+
+# cantidad de equipos en la primera ronda -> nombre de la fase en el calendario
+NOMBRES_RONDA = {32: 'Dieciseisavos', 16: 'Octavos', 8: 'Cuartos', 4: 'Semifinal'}
+
+
+@dataclass(frozen=True)
+class FormatoTorneo:
+    nombre: str
+    grupos: Tuple[str, ...]
+    equipos_por_grupo: int = 4
+    directos_por_grupo: int = 2
+    mejores_por_posicion: Dict[int, int] = field(default_factory=dict)   # {3: 4} = los 4 mejores terceros
+    llave: Optional[str] = None     # Excel con el cuadro oficial; None = cuadro generado (llaves.py)
+
+    def __post_init__(self):
+        if not self.grupos or len(set(self.grupos)) != len(self.grupos):
+            raise ValueError(f"Formato {self.nombre}: los grupos deben ser distintos y al menos uno.")
+        if not all(len(g) == 1 and 'A' <= g <= 'Z' for g in self.grupos):
+            raise ValueError(f"Formato {self.nombre}: los grupos se nombran con una letra (A-Z).")
+        if not 2 <= self.equipos_por_grupo <= 9:
+            raise ValueError(f"Formato {self.nombre}: cada grupo debe tener entre 2 y 9 equipos.")
+        if not 1 <= self.directos_por_grupo <= self.equipos_por_grupo:
+            raise ValueError(f"Formato {self.nombre}: clasificados directos fuera de rango.")
+        for posicion, cantidad in self.mejores_por_posicion.items():
+            if not self.directos_por_grupo < posicion <= self.equipos_por_grupo or not 0 < cantidad <= len(self.grupos):
+                raise ValueError(f"Formato {self.nombre}: no pueden pasar {cantidad} mejores del puesto {posicion}.")
+        if self.cantidad_clasificados not in NOMBRES_RONDA and self.cantidad_clasificados != 2:
+            raise ValueError(f"Formato {self.nombre}: {self.cantidad_clasificados} clasificados no arman un cuadro "
+                             f"de eliminación (se necesitan 2, 4, 8, 16 o 32).")
+
+    @property
+    def cantidad_equipos(self):
+        return len(self.grupos) * self.equipos_por_grupo
+
+    @property
+    def cantidad_clasificados(self):
+        return len(self.grupos) * self.directos_por_grupo + sum(self.mejores_por_posicion.values())
+
+    @property
+    def jornadas(self):
+        n = self.equipos_por_grupo
+        return n - 1 if n % 2 == 0 else n
+
+    @property
+    def partidos_de_grupos(self):
+        n = self.equipos_por_grupo
+        return len(self.grupos) * n * (n - 1) // 2
+
+    @property
+    def fases_eliminacion(self):
+        """Fases en orden de juego, p. ej. ['Octavos', 'Cuartos', 'Semifinal', 'Tercer puesto', 'Final']."""
+        fases = []
+        n = self.cantidad_clasificados
+        while n > 2:
+            fases.append(NOMBRES_RONDA[n])
+            n //= 2
+        if fases:
+            fases.append('Tercer puesto')
+        return fases + ['Final']
+
+    def a_dict(self):
+        return {'nombre': self.nombre, 'grupos': list(self.grupos), 'equipos_por_grupo': self.equipos_por_grupo,
+                'directos_por_grupo': self.directos_por_grupo,
+                'mejores_por_posicion': {str(p): k for p, k in self.mejores_por_posicion.items()},
+                'llave': self.llave}
+
+    @classmethod
+    def desde_dict(cls, d):
+        return cls(nombre=d['nombre'], grupos=tuple(d['grupos']),
+                   equipos_por_grupo=int(d.get('equipos_por_grupo', 4)),
+                   directos_por_grupo=int(d.get('directos_por_grupo', 2)),
+                   mejores_por_posicion={int(p): int(k) for p, k in (d.get('mejores_por_posicion') or {}).items()},
+                   llave=d.get('llave'))
+
+
+def _letras(n):
+    return tuple(chr(ord('A') + i) for i in range(n))
+
+
+FORMATOS_PREDEFINIDOS = {
+    'sub20-24': FormatoTorneo('sub20-24', _letras(6), mejores_por_posicion={3: 4}, llave="fechas_fase_eliminatoria.xlsx"),
+    'mundial-32': FormatoTorneo('mundial-32', _letras(8)),
+    'mundial-48': FormatoTorneo('mundial-48', _letras(12), mejores_por_posicion={3: 8}),
+}
+
+
+def cargar_formato(valor):
+    """Formato por nombre predefinido o desde un .json con los campos de FormatoTorneo."""
+    if valor in FORMATOS_PREDEFINIDOS:
+        return FORMATOS_PREDEFINIDOS[valor]
+    path = valor if os.path.isabs(valor) else os.path.join(SCRIPT_DIR, valor)
+    if not valor.lower().endswith('.json') or not os.path.exists(path):
+        raise ValueError(f"Formato desconocido: {valor!r} (opciones: {', '.join(FORMATOS_PREDEFINIDOS)} o un .json)")
+    with open(path, encoding='utf-8') as f:
+        return FormatoTorneo.desde_dict(json.load(f))
+
+
+def formato_predeterminado():
+    """Formato de MUNDIAL_FORMATO, o el del Sub-20 si no está definida o no se puede leer."""
+    valor = os.environ.get("MUNDIAL_FORMATO", "").strip()
+    if not valor:
+        return FORMATOS_PREDEFINIDOS[FORMATO_PREDETERMINADO]
+    try:
+        return cargar_formato(valor)
+    except (OSError, ValueError, KeyError) as ex:
+        print(f"MUNDIAL_FORMATO inválido ({ex}); se usa {FORMATO_PREDETERMINADO}.")
+        return FORMATOS_PREDEFINIDOS[FORMATO_PREDETERMINADO]
+
+
+# ============================ CLASIFICACIÓN ============================
+def clave_tabla(e):
+    return (e.stats['Pts'], e.stats['DG'], e.stats['GF'])
+
+
+def tablas_por_grupo(torneo):
+    """{grupo: equipos ordenados como en calcular_tabla_posiciones}, repartiendo los equipos una sola vez."""
+    por_grupo = {}
+    for e in torneo.equipos.values():
+        if e.grupo:
+            por_grupo.setdefault(e.grupo, []).append(e)
+    return {g: sorted(por_grupo[g], key=clave_tabla, reverse=True) for g in sorted(por_grupo)}
+
+
+def calcular_clasificados(torneo, formato, mejores=None):
+    """
+    Ids de los clasificados según las tablas actuales: '1os', '2os', ... para los directos y
+    '3os_best' (o '<n>os_best') con los mejores de cada puesto entre todos los grupos. Los
+    mejores se eligen con heapq.nlargest, que a igualdad conserva el orden de los grupos.
+    `mejores` ({puesto: cantidad}) reemplaza al del formato, p. ej. con los cupos del cuadro.
+    """
+    mejores = formato.mejores_por_posicion if mejores is None else mejores
+    tablas = list(tablas_por_grupo(torneo).values())
+    clasificados = {}
+    for posicion in range(1, formato.directos_por_grupo + 1):
+        clasificados[f'{posicion}os'] = [t[posicion - 1].identificador for t in tablas if len(t) >= posicion]
+    for posicion in range(formato.directos_por_grupo + 1, formato.equipos_por_grupo + 1):
+        cantidad = mejores.get(posicion, 0)
+        if cantidad or posicion == 3:      # '3os_best' siempre está, aunque vacío
+            candidatos = (t[posicion - 1] for t in tablas if len(t) >= posicion)
+            clasificados[f'{posicion}os_best'] = [e.identificador for e in heapq.nlargest(cantidad, candidatos, key=clave_tabla)]
+    return clasificados
+
+
+# ============================ FIXTURE ============================
+# plantilla del Sub-20 para grupos de 4: (jornada, índice local, índice visitante)
+_FIXTURE_4 = ((1, 0, 1), (1, 2, 3), (2, 0, 2), (2, 3, 1), (3, 3, 0), (3, 1, 2))
+
+
+def fixture_grupo(cantidad):
+    """Todos contra todos para un grupo de `cantidad` equipos: [(jornada, i, j)] (método del círculo)."""
+    if cantidad == 4:
+        return list(_FIXTURE_4)
+    indices = list(range(cantidad)) + ([None] if cantidad % 2 else [])
+    m = len(indices)
+    partidos = []
+    for ronda in range(m - 1):
+        for k in range(m // 2):
+            a, b = indices[k], indices[m - 1 - k]
+            if a is None or b is None:
+                continue
+            if k == 0 and ronda % 2:
+                a, b = b, a     # el fijo alterna de lado
+            partidos.append((ronda + 1, a, b))
+        indices = [indices[0], indices[-1]] + indices[1:-1]
+    return partidos
@@ -0,0 +1,155 @@
+# historial_posiciones.py
+"""
+Tablas de posiciones congeladas al cierre de cada jornada de la fase de grupos.
+
+Cada foto es un dict {grupo: tupla de FilaPosicion}. Las tuplas son inmutables y se
+comparten: si la tabla de un grupo (o la fila de un equipo) no cambió respecto de la foto
+anterior, o de la versión previa de la misma foto tras una corrección, se reutiliza el
+mismo objeto. Un resultado nuevo solo recalcula el grupo de ese partido, y recién en la
+próxima consulta.
+"""
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from eventos import ResultadoRegistrado, PartidoAgregado, CruceActualizado
+from formatos import clave_tabla
+
+FASE_GRUPOS = "Fase de Grupos"
+
+
+class FilaPosicion(NamedTuple):
+    id: str
+    PJ: int
+    G: int
+    E: int
+    P: int
+    GF: int
+    GC: int
+    DG: int
+    Pts: int
+
+    @property
+    def stats(self):
+        """Los campos como dict, igual que Equipo.stats, para ordenar con formatos.clave_tabla."""
+        return self._asdict()
+
+
+class PuntoTrayectoria(NamedTuple):
+    jornada: int
+    pos: int
+    Pts: int
+
+
+class HistorialPosiciones:
+    def __init__(self, torneo):
+        self.torneo = torneo
+        self._fotos: Dict[int, Dict[str, Tuple[FilaPosicion, ...]]] = {}
+        self._trayectorias: Dict[str, Tuple[PuntoTrayectoria, ...]] = {}
+        self._cerradas: List[int] = []
+        self._sucios: Optional[set] = None      # None = reconstruir todo
+        torneo.eventos.suscribir(self._al_cambiar, (ResultadoRegistrado, PartidoAgregado, CruceActualizado))
+
+    def _al_cambiar(self, evento):
+        p = evento.partido
+        if p.fase != FASE_GRUPOS or self._sucios is None:
+            return
+        self._sucios.add(self._grupo_de(p))
+
+    def invalidar(self):
+        """Fuerza una reconstrucción completa (p. ej. tras cargar otro archivo)."""
+        self._sucios = None
+
+    # ============================ CONSULTAS ============================
+    def jornadas(self):
+        """Jornadas cerradas (todos sus partidos, en todos los grupos, tienen resultado)."""
+        self._actualizar()
+        return sorted(self._fotos)
+
+    def tabla(self, grupo, jornada) -> Optional[Tuple[FilaPosicion, ...]]:
+        self._actualizar()
+        foto = self._fotos.get(jornada)
+        return foto.get(grupo) if foto else None
+
+    def foto(self, jornada):
+        self._actualizar()
+        foto = self._fotos.get(jornada)
+        return MappingProxyType(foto) if foto is not None else None
+
+    def trayectoria(self, id_equipo) -> Tuple[PuntoTrayectoria, ...]:
+        self._actualizar()
+        return self._trayectorias.get(id_equipo, ())
+
+    # ============================ CÁLCULO ============================
+    def _grupo_de(self, p):
+        if p.grupo:
+            return p.grupo
+        e = self.torneo.equipos.get(p.id_equipo1)
+        return e.grupo if e else ""
+
+    def _actualizar(self):
+        if self._sucios is not None and not self._sucios:
+            return
+        por_grupo, por_jornada = {}, {}
+        for p in self.torneo.calendario.values():
+            if p.fase != FASE_GRUPOS or p.jornada is None:
+                continue
+            por_grupo.setdefault(self._grupo_de(p), []).append(p)
+            completa = por_jornada.get(p.jornada, True)
+            por_jornada[p.jornada] = completa and p.jugado()
+        cerradas = sorted(j for j, completa in por_jornada.items() if completa)
+        # una jornada cuenta como cerrada solo si también lo están todas las anteriores
+        cerradas = [j for n, j in enumerate(cerradas) if j == n + 1]
+
+        # una jornada recién cerrada necesita todos los grupos; si no, solo los que cambiaron
+        if self._sucios is None or any(j not in self._fotos for j in cerradas):
+            grupos = set(self.torneo.grupos)
+        else:
+            grupos = self._sucios
+        # las fotos de jornadas que dejaron de estar cerradas (resultado anulado) se descartan
+        fotos = {j: dict(self._fotos.get(j, {})) for j in cerradas}
+        for g in sorted(grupos):
+            self._recalcular_grupo(g, por_grupo.get(g, []), cerradas, fotos)
+        self._fotos = fotos
+        # si cambiaron las jornadas cerradas, cambian los puntos de todas las trayectorias
+        if cerradas != self._cerradas:
+            grupos = set(self.torneo.grupos)
+        self._cerradas = cerradas
+        for id_equipo, e in self.torneo.equipos.items():
+            if e.grupo not in grupos:
+                continue
+            self._trayectorias[id_equipo] = tuple(
+                PuntoTrayectoria(j, pos, fila.Pts)
+                for j in cerradas
+                for pos, fila in enumerate(fotos[j].get(e.grupo, ()), start=1) if fila.id == id_equipo)
+        self._sucios = set()
+
+    def _recalcular_grupo(self, grupo, partidos, cerradas, fotos):
+        orden = [e.identificador for e in self.torneo.equipos.values() if e.grupo == grupo]
+        acumulado = {id: [0] * 8 for id in orden}       # PJ G E P GF GC DG Pts
+        anterior_fila = {}
+        partidos = sorted(partidos, key=lambda p: p.jornada)
+        i = 0
+        for j in cerradas:
+            while i < len(partidos) and partidos[i].jornada <= j:
+                p = partidos[i]
+                i += 1
+                if not p.jugado() or p.id_equipo1 not in acumulado or p.id_equipo2 not in acumulado:
+                    continue
+                for id, gf, gc in ((p.id_equipo1, p.goles_e1, p.goles_e2), (p.id_equipo2, p.goles_e2, p.goles_e1)):
+                    s = acumulado[id]
+                    s[0] += 1
+                    s[1 if gf > gc else 2 if gf == gc else 3] += 1
+                    s[4] += gf
+                    s[5] += gc
+                    s[6] = s[4] - s[5]
+                    s[7] += 3 if gf > gc else 1 if gf == gc else 0
+            filas = []
+            for id in orden:
+                fila = FilaPosicion(id, *acumulado[id])
+                # la fila de un equipo que no jugó en esta jornada es el mismo objeto que la anterior
+                if anterior_fila.get(id) == fila:
+                    fila = anterior_fila[id]
+                anterior_fila[id] = fila
+                filas.append(fila)
+            tabla = tuple(sorted(filas, key=clave_tabla, reverse=True))
+            previa = self._fotos.get(j, {}).get(grupo)
+            fotos[j][grupo] = previa if previa == tabla else tabla
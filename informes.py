@@ -4,7 +4,13 @@ from tkinter import ttk, messagebox
 import pandas as pd
 import os
 from utils import apply_style, center_fullscreen
-from core import Torneo
+from core import obtener_torneo
+from escenarios import calcular_escenarios
+from enfrentamientos import obtener_indice
+from monitor_ui import medir_accion
+from tareas import obtener_ejecutor
+from instantanea import (obtener_pool, filas_posiciones, filas_resultados_grupos, filas_goleadores,
+                         filas_confederaciones, filas_tarjetas)
 
 class InformesUI:
     def __init__(self, master):
@@ -13,7 +19,7 @@ class InformesUI:
         apply_style(self.master)
         center_fullscreen(self.master)
 
-        self.torneo = Torneo()
+        self.torneo = obtener_torneo()
 
         self._build_ui()
 
@@ -42,85 +48,140 @@ class InformesUI:
                    command=self.informe_confederaciones).pack(pady=6)
         ttk.Button(body, text="5️⃣ Equipos con más tarjetas", width=35,
                    command=self.informe_tarjetas).pack(pady=6)
+        ttk.Button(body, text="6️⃣ Escenarios de clasificación", width=35,
+                   command=self.informe_escenarios).pack(pady=6)
+        ttk.Button(body, text="7️⃣ Evolución de posiciones", width=35,
+                   command=self.informe_evolucion).pack(pady=6)
+        ttk.Button(body, text="8️⃣ Historial entre selecciones", width=35,
+                   command=self.informe_historial).pack(pady=6)
 
     # ============================ INFORMES ============================
     def informe_posiciones(self):
         """Muestra la tabla general de posiciones de todos los grupos."""
-        try:
-            data = []
-            for g in sorted(self.torneo.grupos):
-                tabla = self.torneo.calcular_tabla_posiciones(g)
-                for i, e in enumerate(tabla, start=1):
-                    data.append([
-                        g, i, e.pais, e.stats['PJ'], e.stats['G'], e.stats['E'], e.stats['P'],
-                        e.stats['GF'], e.stats['GC'], e.stats['DG'], e.stats['Pts']
-                    ])
-
-            if not data:
-                messagebox.showinfo("Sin datos", "No hay datos cargados aún.")
-                return
-
-            df = pd.DataFrame(data, columns=["Grupo", "Pos", "Equipo", "PJ", "G", "E", "P", "GF", "GC", "DG", "Pts"])
-            self._mostrar_tabla(df, "Tabla General de Posiciones")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo generar el informe: {e}")
+        self._informe_en_proceso(filas_posiciones, "Tabla General de Posiciones",
+                                 ["Grupo", "Pos", "Equipo", "PJ", "G", "E", "P", "GF", "GC", "DG", "Pts"],
+                                 vacio="No hay datos cargados aún.")
 
     def informe_resultados_grupos(self):
         """Muestra los resultados registrados de la fase de grupos."""
-        data = []
-        for p in self.torneo.calendario.values():
-            if p.fase != "Fase de Grupos":
-                continue
-            e1 = self.torneo.equipos.get(p.id_equipo1)
-            e2 = self.torneo.equipos.get(p.id_equipo2)
-            if not e1 or not e2:
-                continue
-            res = f"{p.goles_e1} - {p.goles_e2}" if p.goles_e1 is not None else "Pendiente"
-            data.append([e1.grupo, e1.pais, e2.pais, res])
-
-        if not data:
-            messagebox.showinfo("Sin datos", "No se registraron resultados aún.")
-            return
-
-        df = pd.DataFrame(data, columns=["Grupo", "Equipo 1", "Equipo 2", "Resultado"])
-        self._mostrar_tabla(df, "Resultados de la Fase de Grupos")
+        self._informe_en_proceso(filas_resultados_grupos, "Resultados de la Fase de Grupos",
+                                 ["Grupo", "Equipo 1", "Equipo 2", "Resultado"],
+                                 vacio="No se registraron resultados aún.")
 
     def informe_goleadores(self):
         """Muestra los equipos con más goles a favor."""
-        data = []
-        for e in self.torneo.equipos.values():
-            data.append([e.pais, e.stats['GF'], e.stats['Pts']])
-        df = pd.DataFrame(data, columns=["Equipo", "Goles a favor", "Puntos"]).sort_values(by="Goles a favor", ascending=False)
-        self._mostrar_tabla(df, "Equipos con más goles")
+        self._informe_en_proceso(filas_goleadores, "Equipos con más goles", ["Equipo", "Goles a favor", "Puntos"])
 
     def informe_confederaciones(self):
         """Ejemplo: rendimiento por confederación (si existe en datos)."""
-        conf_data = {}
-        for e in self.torneo.equipos.values():
-            conf = e.confederacion or "Desconocida"
-            conf_data.setdefault(conf, {"PJ": 0, "G": 0, "E": 0, "P": 0, "Pts": 0})
-            conf_data[conf]["PJ"] += e.stats["PJ"]
-            conf_data[conf]["G"] += e.stats["G"]
-            conf_data[conf]["E"] += e.stats["E"]
-            conf_data[conf]["P"] += e.stats["P"]
-            conf_data[conf]["Pts"] += e.stats["Pts"]
-
-        rows = [[c, v["PJ"], v["G"], v["E"], v["P"], v["Pts"]] for c, v in conf_data.items()]
-        df = pd.DataFrame(rows, columns=["Confederación", "PJ", "G", "E", "P", "Pts"])
-        self._mostrar_tabla(df, "Rendimiento por Confederación")
+        self._informe_en_proceso(filas_confederaciones, "Rendimiento por Confederación",
+                                 ["Confederación", "PJ", "G", "E", "P", "Pts"])
 
     def informe_tarjetas(self):
-        """Ejemplo: equipos con más tarjetas (si se cargan en core.Partido)."""
+        """Equipos con más tarjetas y puntos de fair play (ver core.Torneo.disciplina)."""
+        self._informe_en_proceso(filas_tarjetas, "Equipos con más tarjetas",
+                                 ["Equipo", "Tarj. Amarillas", "Tarj. Rojas", "Fair Play"])
+
+    def informe_escenarios(self):
+        """Quién ya clasificó, quién quedó afuera y qué necesita cada uno (ver escenarios.py)."""
+        escenarios = calcular_escenarios(self.torneo)
+        if not escenarios:
+            messagebox.showinfo("Sin datos", "No hay datos cargados aún.")
+            return
+        data = []
+        for id_, esc in escenarios.items():
+            e = self.torneo.equipos[id_]
+            data.append([esc['grupo'], e.pais, e.stats['Pts'], esc['puntos_max'], esc['estado'],
+                         " / ".join(esc['asegura']) or ("Depende de otros resultados" if esc['estado'] == "En carrera" else "-")])
+        df = pd.DataFrame(data, columns=["Grupo", "Equipo", "Pts", "Pts máx.", "Estado", "Asegura el pase si..."])
+        df = df.sort_values(by=["Grupo", "Pts"], ascending=[True, False])
+        self._mostrar_tabla(df, "Escenarios de clasificación")
+
+    def informe_evolucion(self):
+        """Posición y puntos de cada equipo al cierre de cada jornada (ver historial_posiciones.py)."""
+        historial = self.torneo.historial
+        jornadas = historial.jornadas()
+        if not jornadas:
+            messagebox.showinfo("Sin datos", "Todavía no se cerró ninguna jornada.")
+            return
         data = []
-        for e in self.torneo.equipos.values():
-            ta = e.stats.get("TA", 0)
-            tr = e.stats.get("TR", 0)
-            data.append([e.pais, ta, tr])
-        df = pd.DataFrame(data, columns=["Equipo", "Tarj. Amarillas", "Tarj. Rojas"])
-        self._mostrar_tabla(df, "Equipos con más tarjetas")
+        for g in sorted(self.torneo.grupos):
+            for fila in historial.tabla(g, jornadas[-1]):
+                puntos = {t.jornada: t for t in historial.trayectoria(fila.id)}
+                data.append([g, self.torneo.equipos[fila.id].pais] +
+                            [f"{puntos[j].pos}° ({puntos[j].Pts} pts)" if j in puntos else "-" for j in jornadas])
+        df = pd.DataFrame(data, columns=["Grupo", "Equipo"] + [f"Jornada {j}" for j in jornadas])
+        self._mostrar_tabla(df, "Evolución de posiciones")
+
+    def informe_historial(self):
+        """Cara a cara de todas las ediciones y récord por fase (ver enfrentamientos.py)."""
+        indice = obtener_indice(self.torneo)
+        paises = indice.paises()
+        if not paises:
+            messagebox.showinfo("Sin datos", "No hay partidos jugados ni torneos archivados.")
+            return
+        win = tk.Toplevel(self.master)
+        win.title("Historial entre selecciones")
+        win.geometry("900x500")
+        win.transient(self.master)
+
+        top = ttk.Frame(win, padding=8)
+        top.pack(fill='x')
+        equipo = tk.StringVar(value=paises[0])
+        rival = tk.StringVar(value="")
+        ttk.Label(top, text="Selección:").pack(side='left')
+        ttk.Combobox(top, textvariable=equipo, values=paises, state='readonly', width=22).pack(side='left', padx=6)
+        ttk.Label(top, text="Rival (opcional):").pack(side='left', padx=(12, 0))
+        ttk.Combobox(top, textvariable=rival, values=[""] + paises, state='readonly', width=22).pack(side='left', padx=6)
+
+        cols = ("Fase / Rival", "PJ", "G", "E", "P", "GF", "GC", "Último partido")
+        tree = ttk.Treeview(win, columns=cols, show='headings')
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, anchor='center', width=70 if len(c) <= 2 else 220)
+        tree.pack(fill='both', expand=True, padx=8, pady=8)
+
+        def _ultimo(u):
+            if not u:
+                return "-"
+            return f"{u['anio']} {u['fase']}: {u['equipo1']} {u['goles1']}-{u['goles2']} {u['equipo2']}"
+
+        def _mostrar(*_):
+            tree.delete(*tree.get_children())
+            if rival.get() and rival.get() != equipo.get():
+                filas = [(f"vs {rival.get()}", indice.cara_a_cara(equipo.get(), rival.get()))]
+            else:
+                filas = list(indice.por_fase(equipo.get()).items())
+            for etiqueta, d in filas:
+                if d is None:
+                    tree.insert('', tk.END, values=(etiqueta, 0, 0, 0, 0, 0, 0, "Nunca se enfrentaron"))
+                    continue
+                tree.insert('', tk.END, values=(etiqueta, d['PJ'], d['G'], d['E'], d['P'], d['GF'], d['GC'], _ultimo(d['ultimo'])))
+
+        equipo.trace_add('write', _mostrar)
+        rival.trace_add('write', _mostrar)
+        _mostrar()
 
     # ============================ UTILIDAD ============================
+    def _informe_en_proceso(self, fn, titulo, columnas, vacio=None):
+        """
+        Arma las filas en un proceso del pool de informes (instantanea.py) a partir de la
+        instantánea del torneo; la UI solo publica la instantánea y muestra el resultado.
+        """
+        futuro = obtener_pool(self.torneo).enviar(fn)
+
+        def _mostrar(filas):
+            if not filas and vacio:
+                messagebox.showinfo("Sin datos", vacio)
+                return
+            self._mostrar_tabla(pd.DataFrame(filas, columns=columnas), titulo)
+
+        obtener_ejecutor(self.master).enviar(lambda tarea: futuro.result(), titulo=titulo, master=self.master,
+                                             al_terminar=_mostrar,
+                                             al_fallar=lambda ex: messagebox.showerror(
+                                                 "Error", f"No se pudo generar el informe: {ex}"))
+
+    @medir_accion("abrir informe")
     def _mostrar_tabla(self, df, titulo):
         """Muestra un DataFrame en una ventana."""
         win = tk.Toplevel(self.master)
@@ -150,6 +211,7 @@ class InformesUI:
         """Cierra esta ventana y regresa al menú principal sin perder datos."""
         try:
             self.torneo.guardar_datos()
+            self.torneo.flush()
         except Exception:
             pass
         self.master.destroy()
\ No newline at end of file
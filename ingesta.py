@@ -0,0 +1,551 @@
+# ingesta.py
+"""
+Ingesta en vivo de eventos de partido desde un feed JSON-lines (archivo que se va
+escribiendo, o socket TCP local), aplicados al Torneo en micro-lotes.
+
+    python ingesta.py feed.jsonl --seguir
+    python ingesta.py tcp://127.0.0.1:9100
+
+Un evento por línea, con número de secuencia único dentro del feed. El partido se indica
+por código oficial o id ("partido": "M37") o por equipos ("local"/"visitante"); el equipo,
+por código de posición, país o abreviatura:
+
+    {"seq": 1, "tipo": "inicio", "partido": "M01"}
+    {"seq": 2, "tipo": "gol", "partido": "M01", "equipo": "A1", "jugador": "Pérez", "minuto": 23}
+    {"seq": 3, "tipo": "tarjeta", "partido": "M01", "equipo": "A2", "jugador": "Gómez", "color": "amarilla"}
+    {"seq": 4, "tipo": "final", "partido": "M01", "penales": [4, 3]}
+
+Goles y tarjetas se acumulan por partido; el resultado entra al Torneo (registrar_resultado)
+recién con "final", que puede traer el marcador definitivo en "goles": [a, b]. Un "final"
+repetido para un partido ya cerrado es una corrección.
+
+- Entrega al menos una vez: tras cada lote aplicado y guardado se escribe un checkpoint
+  (secuencias vistas, posición e inodo del archivo y partidos en juego) y se confirma a cada
+  conexión con {"ack": seq}. Al reiniciar se relee desde el checkpoint y las secuencias
+  repetidas se descartan, así que reenviar es inofensivo.
+- Contrapresión: entre la lectura y el Torneo hay una cola acotada. Si el Torneo no da
+  abasto la lectura se frena (el archivo se deja de leer; el socket deja de leerse y TCP
+  frena al emisor).
+- El lote es todo lo que esté en la cola al terminar el anterior, hasta `tamano_lote`:
+  con poco tráfico cada evento entra solo y sin demora; con mucho, un lote hace un único
+  guardado.
+- Junto a la UI corre en un hilo propio con su loop de asyncio y aplica los lotes en el
+  hilo de Tk con api.DespachoTk (MUNDIAL_INGESTA en main.py).
+"""
+import os
+import sys
+import json
+import asyncio
+import threading
+from collections import deque
+from typing import Any, NamedTuple
+from core import ErrorTorneo
+from persistencia import escribir_atomico
+from metricas import medir
+
+FASE_GRUPOS = "Fase de Grupos"
+TIPOS = {
+    'inicio': 'inicio', 'kickoff': 'inicio', 'kick-off': 'inicio',
+    'gol': 'gol', 'goal': 'gol',
+    'tarjeta': 'tarjeta', 'card': 'tarjeta',
+    'final': 'final', 'fulltime': 'final', 'full-time': 'final',
+}
+COLORES = ('amarilla', 'roja')
+BLOQUE_LECTURA = 1 << 20
+ORIGEN_ARCHIVO = 'archivo'
+
+
+class EventoFeed(NamedTuple):
+    seq: int
+    tipo: str
+    datos: dict
+    origen: Any          # conexión del socket, o ORIGEN_ARCHIVO
+    posicion: int        # en el archivo: byte siguiente a la línea; 0 en el socket
+    generacion: int = 0  # en el archivo: cuántas veces se reabrió por rotación o truncado
+
+
+def _par(datos, clave):
+    valor = datos.get(clave)
+    if valor is None:
+        return None
+    if not isinstance(valor, (list, tuple)) or len(valor) != 2:
+        raise ValueError(f"'{clave}' debe ser [local, visitante]")
+    a, b = int(valor[0]), int(valor[1])
+    if a < 0 or b < 0:
+        raise ValueError(f"'{clave}' con valores negativos")
+    return a, b
+
+
+def validar_evento(linea, origen=ORIGEN_ARCHIVO, posicion=0, generacion=0):
+    """EventoFeed desde una línea del feed; ValueError si no tiene la forma esperada."""
+    try:
+        datos = json.loads(linea)
+    except ValueError as ex:
+        raise ValueError(f"JSON inválido: {ex}")
+    if not isinstance(datos, dict):
+        raise ValueError("el evento debe ser un objeto")
+    seq = datos.get('seq')
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+        raise ValueError("'seq' debe ser un entero positivo")
+    tipo = TIPOS.get(str(datos.get('tipo', '')).strip().lower())
+    if tipo is None:
+        raise ValueError(f"seq {seq}: tipo desconocido {datos.get('tipo')!r}")
+    if not datos.get('partido') and not (datos.get('local') and datos.get('visitante')):
+        raise ValueError(f"seq {seq}: falta 'partido' (o 'local' y 'visitante')")
+    if tipo in ('gol', 'tarjeta') and not datos.get('equipo'):
+        raise ValueError(f"seq {seq}: falta 'equipo'")
+    if tipo == 'tarjeta' and str(datos.get('color', '')).lower() not in COLORES:
+        raise ValueError(f"seq {seq}: 'color' debe ser amarilla o roja")
+    if tipo == 'final':
+        try:
+            for clave in ('goles', 'penales'):
+                _par(datos, clave)
+        except (TypeError, ValueError) as ex:
+            raise ValueError(f"seq {seq}: {ex}")
+    return EventoFeed(seq, tipo, datos, origen, posicion, generacion)
+
+
+class _Conexion:
+    def __init__(self, writer):
+        self.writer = writer
+        self.abierta = True
+
+    def enviar(self, mensaje):
+        if self.abierta:
+            self.writer.write((json.dumps(mensaje, ensure_ascii=False) + "\n").encode('utf-8'))
+
+
+class IngestaResultados:
+    def __init__(self, torneo, despachar=None, checkpoint=None, capacidad=10000, tamano_lote=2000,
+                 ventana_duplicados=20000, intervalo_sondeo=0.2):
+        self.torneo = torneo
+        # despachar(fn) -> concurrent.futures.Future que corre fn en el hilo dueño del Torneo
+        self.despachar = despachar
+        self.ruta_checkpoint = checkpoint or os.path.splitext(torneo.FILENAME)[0] + "_ingesta.json"
+        self.capacidad = capacidad
+        self.tamano_lote = tamano_lote
+        self.intervalo_sondeo = intervalo_sondeo
+        self.loop = None
+        self._cola = None
+        self._server = None
+        self._detenido = False
+        self._fuente = None
+        self._posicion = 0
+        self._inodo = None            # del archivo al que corresponde _posicion
+        self._generacion = 0          # sube en cada rotación: la posición de antes ya no vale
+        # deduplicación: las últimas `ventana_duplicados` secuencias, y todo lo que quedó
+        # por debajo de `_piso` se da por visto
+        self._vistos = set()
+        self._orden = deque()
+        self._ventana = ventana_duplicados
+        self._piso = 0
+        self._en_juego = {}           # match_id -> goles, tarjetas y jugadores acumulados
+        self._nombres = None          # alias de equipo -> id
+        self._pares = None            # (id local, id visitante) -> match_id
+        self.rechazos = deque(maxlen=200)
+        self.contadores = dict.fromkeys(('recibidos', 'invalidos', 'duplicados', 'aplicados',
+                                         'rechazados', 'resultados', 'lotes'), 0)
+        self.lote_maximo = 0
+        self._cargar_checkpoint()
+
+    # ============================ CHECKPOINT ============================
+    def _cargar_checkpoint(self):
+        if not os.path.exists(self.ruta_checkpoint):
+            return
+        try:
+            with open(self.ruta_checkpoint, encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError) as ex:
+            print(f"No se pudo leer {os.path.basename(self.ruta_checkpoint)}: {ex}")
+            return
+        self._piso = datos.get('piso', 0)
+        self._orden = deque(datos.get('vistos', []))
+        self._vistos = set(self._orden)
+        self._en_juego = datos.get('en_juego', {})
+        self._fuente = datos.get('fuente')
+        self._posicion = datos.get('posicion', 0)
+        self._inodo = datos.get('inodo')
+
+    def _checkpoint(self):
+        return {'fuente': self._fuente, 'posicion': self._posicion, 'inodo': self._inodo, 'piso': self._piso,
+                'vistos': list(self._orden), 'en_juego': self._en_juego}
+
+    def _hacer_durable(self, checkpoint):
+        """Espera el guardado del Torneo y recién entonces escribe el checkpoint (en un hilo del executor)."""
+        if not self.torneo.esperar_guardado():
+            raise OSError("no se pudo guardar el torneo; la ingesta se retoma desde el último checkpoint")
+        escribir_atomico(self.ruta_checkpoint, json.dumps(checkpoint, ensure_ascii=False).encode('utf-8'))
+
+    # ============================ DEDUPLICACIÓN ============================
+    def _es_nuevo(self, seq):
+        if seq <= self._piso or seq in self._vistos:
+            return False
+        self._vistos.add(seq)
+        self._orden.append(seq)
+        if len(self._orden) > self._ventana:
+            viejo = self._orden.popleft()
+            self._vistos.discard(viejo)
+            self._piso = max(self._piso, viejo)
+        return True
+
+    # ============================ FUENTES ============================
+    async def _recibir(self, linea, origen, posicion=0, generacion=0):
+        linea = linea.strip()
+        if not linea:
+            return
+        self.contadores['recibidos'] += 1
+        try:
+            evento = validar_evento(linea, origen, posicion, generacion)
+        except ValueError as ex:
+            self.contadores['invalidos'] += 1
+            self._rechazar(None, str(ex))
+            if origen is not ORIGEN_ARCHIVO:
+                origen.enviar({'error': str(ex)})
+            return
+        # con la cola llena esto espera: es lo que frena la lectura
+        await self._cola.put(evento)
+
+    async def _leer_archivo(self, ruta, seguir):
+        clave = os.path.abspath(ruta)
+        posicion = self._posicion if self._fuente == clave else 0
+        self._fuente, self._posicion = clave, posicion
+        f = None
+        resto = b''
+        try:
+            while not self._detenido:
+                if f is None:
+                    try:
+                        f = open(ruta, 'rb')
+                    except FileNotFoundError:
+                        if not seguir:
+                            raise
+                        await asyncio.sleep(self.intervalo_sondeo)
+                        continue
+                    inodo = os.fstat(f.fileno()).st_ino
+                    if self._inodo is not None and inodo != self._inodo:
+                        # el checkpoint es de otro archivo (rotado mientras no corría)
+                        posicion = self._posicion = 0
+                    self._inodo = inodo
+                    f.seek(posicion)
+                datos = f.read(BLOQUE_LECTURA)
+                if not datos:
+                    if not seguir:
+                        break
+                    try:
+                        actual = os.stat(ruta)
+                    except FileNotFoundError:
+                        actual = None
+                    propio = os.fstat(f.fileno())
+                    if actual is None or actual.st_ino != propio.st_ino or actual.st_size < posicion:
+                        # archivo rotado o truncado: se relee desde el principio (los repetidos se descartan)
+                        f.close()
+                        f, posicion, resto = None, 0, b''
+                        self._generacion += 1
+                        self._posicion, self._inodo = 0, None
+                    await asyncio.sleep(self.intervalo_sondeo)
+                    continue
+                inicio = posicion - len(resto)
+                *lineas, resto = (resto + datos).split(b'\n')
+                posicion += len(datos)
+                for linea in lineas:
+                    inicio += len(linea) + 1
+                    await self._recibir(linea, ORIGEN_ARCHIVO, inicio, self._generacion)
+                await asyncio.sleep(0)
+            if resto.strip() and not seguir:
+                await self._recibir(resto, ORIGEN_ARCHIVO, posicion, self._generacion)
+        finally:
+            if f is not None:
+                f.close()
+
+    async def _atender(self, reader, writer):
+        conexion = _Conexion(writer)
+        try:
+            while not self._detenido:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                await self._recibir(linea, conexion)
+        except (ConnectionError, ValueError) as ex:
+            print(f"Conexión de ingesta cerrada: {ex}")
+        finally:
+            conexion.abierta = False
+            writer.close()
+
+    # ============================ LOTES ============================
+    async def _consumir(self):
+        while True:
+            evento = await self._cola.get()
+            if evento is None:
+                return
+            lote = [evento]
+            fin = False
+            while len(lote) < self.tamano_lote:
+                try:
+                    evento = self._cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if evento is None:
+                    fin = True
+                    break
+                lote.append(evento)
+            await self._procesar_lote(lote)
+            if fin:
+                return
+
+    async def _procesar_lote(self, lote):
+        nuevos = []
+        for evento in lote:
+            if self._es_nuevo(evento.seq):
+                nuevos.append(evento)
+            else:
+                self.contadores['duplicados'] += 1
+        rechazos = []
+        if nuevos:
+            if self.despachar is None:
+                rechazos = self._aplicar(nuevos)
+            else:
+                rechazos = await asyncio.wrap_future(self.despachar(lambda: self._aplicar(nuevos)))
+        for evento in lote:
+            # los eventos llegan en orden; los leídos antes de una rotación no mueven la posición del archivo nuevo
+            if evento.origen is ORIGEN_ARCHIVO and evento.generacion == self._generacion:
+                self._posicion = evento.posicion
+        await self.loop.run_in_executor(None, self._hacer_durable, self._checkpoint())
+
+        self.contadores['lotes'] += 1
+        self.contadores['aplicados'] += len(nuevos) - len(rechazos)
+        self.lote_maximo = max(self.lote_maximo, len(lote))
+        ultimo = {}
+        for evento in lote:
+            if evento.origen is not ORIGEN_ARCHIVO:
+                ultimo[evento.origen] = evento.seq
+        for evento, motivo in rechazos:
+            self._rechazar(evento.seq, motivo)
+            if evento.origen is not ORIGEN_ARCHIVO:
+                evento.origen.enviar({'rechazado': evento.seq, 'motivo': motivo})
+        for conexion, seq in ultimo.items():
+            conexion.enviar({'ack': seq})
+
+    def _rechazar(self, seq, motivo):
+        self.contadores['rechazados'] += seq is not None
+        self.rechazos.append((seq, motivo))
+        print(f"Evento {seq if seq is not None else '?'} rechazado: {motivo}")
+
+    # ============================ APLICACIÓN (hilo del Torneo) ============================
+    def _aplicar(self, eventos):
+        """Aplica un lote con un solo guardado. Devuelve [(evento, motivo)] de los rechazados."""
+        rechazos = []
+        with medir("ingesta_lote"), self.torneo.en_lote():
+            for evento in eventos:
+                try:
+                    motivo = self._aplicar_evento(evento)
+                except (ErrorTorneo, ValueError, TypeError) as ex:
+                    motivo = str(ex)
+                if motivo:
+                    rechazos.append((evento, motivo))
+        return rechazos
+
+    def _aplicar_evento(self, evento):
+        d = evento.datos
+        match_id = self._partido(d)
+        if match_id is None:
+            return "partido desconocido"
+        partido = self.torneo.calendario[match_id]
+        if evento.tipo == 'final':
+            return self._finalizar(match_id, partido, d)
+        if partido.jugado():
+            return f"{match_id} ya tiene resultado"
+        estado = self._en_juego.setdefault(match_id, {'goles': [0, 0], 'amarillas': [0, 0],
+                                                      'rojas': [0, 0], 'jugadores': {}})
+        if evento.tipo == 'inicio':
+            return None
+        lado = self._lado(partido, d.get('equipo'))
+        if lado is None:
+            return f"{d.get('equipo')} no juega {match_id}"
+        jugador = str(d.get('jugador') or '').strip()
+        js = None
+        if jugador:
+            id_equipo = partido.id_equipo1 if lado == 0 else partido.id_equipo2
+            js = estado['jugadores'].setdefault(f"{id_equipo}|{jugador}", {
+                'jugador': jugador, 'equipo': id_equipo, 'goles': 0, 'amarillas': 0, 'rojas': 0})
+        if evento.tipo == 'gol':
+            estado['goles'][lado] += 1
+            if js is not None and not d.get('en_contra'):
+                js['goles'] += 1
+        else:
+            color = 'amarillas' if str(d['color']).lower() == 'amarilla' else 'rojas'
+            estado[color][lado] += 1
+            if js is not None:
+                js[color] += 1
+        return None
+
+    def _finalizar(self, match_id, partido, d):
+        if not self.torneo.configuracion_cerrada:
+            return "la configuración del torneo no está cerrada"
+        if partido.id_equipo1 not in self.torneo.equipos or partido.id_equipo2 not in self.torneo.equipos:
+            return "equipos del partido no cargados"
+        estado = self._en_juego.get(match_id)
+        if estado is None and partido.jugado() and _par(d, 'goles') is None:
+            return f"{match_id} ya tiene resultado y el evento no trae marcador"
+        estado = estado or {'goles': [0, 0], 'amarillas': [0, 0], 'rojas': [0, 0], 'jugadores': {}}
+        goles = _par(d, 'goles') or tuple(estado['goles'])
+        amarillas = _par(d, 'amarillas') or tuple(estado['amarillas'])
+        rojas = _par(d, 'rojas') or tuple(estado['rojas'])
+        penales = _par(d, 'penales')
+        if partido.fase != FASE_GRUPOS and goles[0] == goles[1] and (not penales or penales[0] == penales[1]):
+            return "empate en eliminación sin definición por penales"
+        jugadores = list(estado['jugadores'].values()) or None
+        self.torneo.registrar_resultado(match_id, goles[0], goles[1], amarillas[0], amarillas[1], rojas[0], rojas[1],
+                                        jugador_stats=jugadores,
+                                        penales={'p1': penales[0], 'p2': penales[1]} if penales else None)
+        self._en_juego.pop(match_id, None)
+        self.contadores['resultados'] += 1
+        return None
+
+    def _partido(self, d):
+        if d.get('partido'):
+            clave = str(d['partido']).strip().upper()
+            encontrado = self.torneo.partido_por_codigo(clave)
+            if encontrado is not None:
+                return encontrado[0]
+            return clave if clave in self.torneo.calendario else None
+        id1, id2 = self._id_equipo(d.get('local')), self._id_equipo(d.get('visitante'))
+        if id1 is None or id2 is None:
+            return None
+        # el índice de pares se rehace solo cuando no encuentra (p. ej. al crearse un cruce nuevo)
+        for reconstruir in (False, True):
+            if reconstruir or self._pares is None:
+                self._pares = {}
+                for mid, p in self.torneo.calendario.items():
+                    self._pares[(p.id_equipo1, p.id_equipo2)] = mid
+            mid = self._pares.get((id1, id2))
+            if mid is not None and mid in self.torneo.calendario:
+                return mid
+        return None
+
+    def _id_equipo(self, alias):
+        if not alias:
+            return None
+        clave = str(alias).strip().lower()
+        for reconstruir in (False, True):
+            if reconstruir or self._nombres is None:
+                self._nombres = {}
+                for e in self.torneo.equipos.values():
+                    for nombre in (e.identificador, e.pais, e.abreviatura):
+                        if nombre:
+                            self._nombres[nombre.strip().lower()] = e.identificador
+            if clave in self._nombres:
+                return self._nombres[clave]
+        return None
+
+    def _lado(self, partido, alias):
+        id_equipo = self._id_equipo(alias)
+        if id_equipo == partido.id_equipo1:
+            return 0
+        if id_equipo == partido.id_equipo2:
+            return 1
+        return None
+
+    # ============================ CONSULTAS ============================
+    def marcador(self, match_id):
+        """Marcador parcial (local, visitante) de un partido en juego, o None."""
+        estado = self._en_juego.get(match_id)
+        return tuple(estado['goles']) if estado else None
+
+    def estadisticas(self):
+        return dict(self.contadores, en_cola=self._cola.qsize() if self._cola else 0,
+                    lote_maximo=self.lote_maximo, en_juego=len(self._en_juego))
+
+    # ============================ CICLO DE VIDA ============================
+    async def ejecutar(self, fuente, seguir=True):
+        """
+        Lee `fuente` (ruta de un .jsonl, o tcp://host:puerto) hasta agotarla (o, con `seguir`
+        o en el socket, hasta detener()), aplicando cada lote antes de leer de más.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=self.capacidad)
+        consumidor = asyncio.ensure_future(self._consumir())
+        lector = asyncio.ensure_future(self._leer(fuente, seguir))
+        await asyncio.wait({consumidor, lector}, return_when=asyncio.FIRST_COMPLETED)
+        if consumidor.done():
+            # el consumidor solo termina antes si falló al aplicar o guardar: no se sigue leyendo
+            lector.cancel()
+            await asyncio.gather(lector, return_exceptions=True)
+            consumidor.result()
+            return
+        await self._cola.put(None)
+        await consumidor
+        lector.result()
+
+    async def _leer(self, fuente, seguir):
+        if not fuente.startswith("tcp://"):
+            await self._leer_archivo(fuente, seguir)
+            return
+        host, _, puerto = fuente[len("tcp://"):].rpartition(':')
+        self._server = await asyncio.start_server(self._atender, host or "127.0.0.1", int(puerto))
+        print(f"Ingesta escuchando en {fuente}")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            if not self._detenido:
+                raise
+
+    def detener(self):
+        """Deja de leer; lo que ya estaba en la cola se aplica igual. Se puede llamar desde cualquier hilo."""
+        def _detener():
+            self._detenido = True
+            if self._server is not None:
+                self._server.close()
+        if self.loop is None:
+            self._detenido = True
+        else:
+            self.loop.call_soon_threadsafe(_detener)
+
+    def iniciar_en_hilo(self, fuente, seguir=True):
+        """Corre la ingesta en un hilo propio (para usarla junto a la UI)."""
+        def _correr():
+            try:
+                asyncio.run(self.ejecutar(fuente, seguir))
+            except Exception as ex:
+                print(f"Ingesta detenida: {ex}")
+        hilo = threading.Thread(target=_correr, name="ingesta-torneo", daemon=True)
+        hilo.start()
+        return hilo
+
+
+# ============================ EJECUCIÓN SIN INTERFAZ ============================
+def main(argv=None):
+    import argparse
+    import core
+    from core import Torneo
+    from llaves import Llaves, cargar_llaves
+
+    ap = argparse.ArgumentParser(description="Aplica al torneo un feed de eventos de partido en vivo")
+    ap.add_argument("fuente", help="archivo .jsonl o tcp://host:puerto")
+    ap.add_argument("--seguir", action="store_true", help="seguir leyendo el archivo a medida que crece")
+    ap.add_argument("--datos", default=os.path.join(core.SCRIPT_DIR, "torneo_data.json"))
+    ap.add_argument("--eliminatoria", default=None, help="cuadro en Excel (por defecto, el del formato del torneo)")
+    ap.add_argument("--checkpoint", default=None)
+    ap.add_argument("--lote", type=int, default=2000, help="eventos por lote como máximo")
+    args = ap.parse_args(argv)
+
+    core.modo_sin_interfaz()
+    torneo = Torneo(archivo=args.datos)
+    (Llaves.desde_excel(args.eliminatoria) if args.eliminatoria else cargar_llaves(torneo.formato)).conectar(torneo)
+    ingesta = IngestaResultados(torneo, checkpoint=args.checkpoint, tamano_lote=args.lote)
+    try:
+        asyncio.run(ingesta.ejecutar(args.fuente, args.seguir))
+    except KeyboardInterrupt:
+        pass
+    except (ErrorTorneo, OSError) as ex:
+        print(f"Error: {ex}", file=sys.stderr)
+        return 1
+    e = ingesta.estadisticas()
+    print(f"{e['recibidos']} eventos: {e['aplicados']} aplicados, {e['duplicados']} duplicados, "
+          f"{e['rechazados'] + e['invalidos']} rechazados; {e['resultados']} resultados registrados "
+          f"en {e['lotes']} lotes (máximo {e['lote_maximo']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,495 @@
+# instantanea.py
+"""
+Instantáneas del Torneo en memoria compartida para armar informes, exportaciones y
+renders en procesos aparte, sin competir por el intérprete de la UI.
+
+El estado se publica en un segmento de multiprocessing.shared_memory en columnas de
+ancho fijo (int32, una columna contigua por campo) más un pool de cadenas UTF-8
+internadas. Los procesos de trabajo lo leen con vistas de numpy sobre el mismo buffer:
+sin copias ni JSON.
+
+- El segmento tiene dos ranuras. Se publica siempre en la que no está vigente y al final
+  se cambia el índice de la vigente, así que una lectura en curso no se pisa con la
+  publicación siguiente, solo con la subsiguiente.
+- Cada ranura tiene un seqlock: el contador es impar mientras se escribe. El lector toma
+  el contador, arma su resultado y lo vuelve a mirar; si cambió, la ranura se reescribió
+  en el medio y la lectura se repite.
+- Si el torneo ya no entra en el segmento se crea otro del doble de capacidad; cada
+  trabajo lleva el nombre del segmento vigente al enviarse. El segmento reemplazado se
+  borra recién cuando terminan los trabajos encolados con su nombre.
+
+    pool = obtener_pool(torneo)
+    futuro = pool.enviar(filas_posiciones)      # concurrent.futures.Future con las filas
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from formatos import FormatoTorneo, clave_tabla
+
+FASE_GRUPOS = "Fase de Grupos"
+MAGIA = 0x4D554E44          # 'MUND'
+NULO = -1
+CABECERA = 64               # bytes: 8 int64
+RANURAS = 2
+
+# columnas de texto guardan el índice de la cadena en el pool
+COLUMNAS_EQUIPO = ('id', 'pais', 'abreviatura', 'confederacion', 'grupo', 'max_avance',
+                   'PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts', 'TA', 'TR', 'FairPlay')
+TEXTO_EQUIPO = COLUMNAS_EQUIPO[:6]
+COLUMNAS_PARTIDO = ('match_id', 'codigo', 'fase', 'grupo', 'fecha', 'hora',
+                    'jornada', 'equipo1', 'equipo2', 'goles1', 'goles2', 'penales1', 'penales2',
+                    'ta1', 'ta2', 'tr1', 'tr2')
+TEXTO_PARTIDO = COLUMNAS_PARTIDO[:6]
+CE = {c: i for i, c in enumerate(COLUMNAS_EQUIPO)}
+CP = {c: i for i, c in enumerate(COLUMNAS_PARTIDO)}
+# índices en las cabeceras
+G_MAGIA, G_VIGENTE, G_CAP_EQUIPOS, G_CAP_PARTIDOS, G_CAP_CADENAS, G_CAP_BYTES = range(6)
+R_SEQ, R_VERSION, R_EQUIPOS, R_PARTIDOS, R_CADENAS, R_BYTES, R_FORMATO = range(7)
+
+
+def _nulo(valor):
+    return NULO if valor is None else int(valor)
+
+
+# ============================ DISPOSICIÓN ============================
+class _Disposicion:
+    """Vistas de numpy sobre el buffer del segmento (las mismas en quien publica y en quien lee)."""
+    def __init__(self, buf, cap_equipos, cap_partidos, cap_cadenas, cap_bytes):
+        self.buf = buf
+        self.cabecera = np.ndarray((8,), dtype=np.int64, buffer=buf, offset=0)
+        self.ranuras = []
+        tam = self.tamano_ranura(cap_equipos, cap_partidos, cap_cadenas, cap_bytes)
+        for r in range(RANURAS):
+            base = CABECERA + r * tam
+            cab = np.ndarray((8,), dtype=np.int64, buffer=buf, offset=base)
+            base += CABECERA
+            equipos = np.ndarray((len(COLUMNAS_EQUIPO), cap_equipos), dtype=np.int32, buffer=buf, offset=base)
+            base += equipos.nbytes
+            partidos = np.ndarray((len(COLUMNAS_PARTIDO), cap_partidos), dtype=np.int32, buffer=buf, offset=base)
+            base += partidos.nbytes
+            offsets = np.ndarray((cap_cadenas + 1,), dtype=np.int32, buffer=buf, offset=base)
+            base += offsets.nbytes
+            texto = np.ndarray((cap_bytes,), dtype=np.uint8, buffer=buf, offset=base)
+            self.ranuras.append((cab, equipos, partidos, offsets, texto))
+
+    @staticmethod
+    def tamano_ranura(cap_equipos, cap_partidos, cap_cadenas, cap_bytes):
+        tam = (CABECERA + 4 * (len(COLUMNAS_EQUIPO) * cap_equipos + len(COLUMNAS_PARTIDO) * cap_partidos
+                               + cap_cadenas + 1) + cap_bytes)
+        return (tam + 7) // 8 * 8
+
+
+def _abrir_segmento(nombre):
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Python < 3.13: los procesos del pool comparten el resource_tracker del proceso de la
+        # UI, así que registrarse de nuevo no hace que el segmento se borre al salir el trabajador
+        return shared_memory.SharedMemory(name=nombre)
+
+
+# ============================ PUBLICACIÓN (proceso de la UI) ============================
+class PublicadorInstantanea:
+    def __init__(self, torneo):
+        self.torneo = torneo
+        self.shm = None
+        self._disp = None
+        self.version = None            # versión del torneo de la última publicación
+        self.publicaciones = 0
+        self._en_uso = {}              # nombre del segmento -> trabajos pendientes que lo leen
+        self._reemplazados = {}        # nombre -> segmento viejo que espera a sus trabajos
+        self._lock = threading.Lock()  # soltar() corre en el hilo de resultados del pool
+        atexit.register(self.cerrar)
+
+    @property
+    def nombre(self):
+        return self.shm.name if self.shm else None
+
+    def publicar(self):
+        """Publica el estado actual si cambió desde la última vez. Devuelve el nombre del segmento."""
+        if self.shm is not None and self.version == self.torneo.version:
+            return self.shm.name
+        equipos, partidos, cadenas, formato = self._columnas()
+        datos = [c.encode('utf-8') for c in cadenas]
+        n_bytes = sum(len(d) for d in datos)
+        if not self._entra(len(equipos[0]), len(partidos[0]), len(cadenas), n_bytes):
+            self._crecer(len(equipos[0]), len(partidos[0]), len(cadenas), n_bytes)
+        vigente = int(self._disp.cabecera[G_VIGENTE])
+        r = 1 - vigente if self.publicaciones else vigente
+        cab, col_e, col_p, offsets, texto = self._disp.ranuras[r]
+        cab[R_SEQ] += 1                 # impar: escribiendo
+        n_e, n_p = len(equipos[0]), len(partidos[0])
+        for i, columna in enumerate(equipos):
+            col_e[i, :n_e] = columna
+        for i, columna in enumerate(partidos):
+            col_p[i, :n_p] = columna
+        offsets[0] = 0
+        offsets[1:len(datos) + 1] = np.cumsum([len(d) for d in datos], dtype=np.int64)
+        texto[:n_bytes] = np.frombuffer(b''.join(datos), dtype=np.uint8)
+        cab[R_VERSION] = self.torneo.version
+        cab[R_EQUIPOS], cab[R_PARTIDOS], cab[R_CADENAS], cab[R_BYTES] = n_e, n_p, len(datos), n_bytes
+        cab[R_FORMATO] = formato
+        cab[R_SEQ] += 1                 # par: estable
+        self._disp.cabecera[G_VIGENTE] = r
+        self.version = self.torneo.version
+        self.publicaciones += 1
+        return self.shm.name
+
+    def _columnas(self):
+        cadenas, indices = [], {}
+
+        def _cadena(valor):
+            valor = "" if valor is None else str(valor)
+            i = indices.get(valor)
+            if i is None:
+                i = indices[valor] = len(cadenas)
+                cadenas.append(valor)
+            return i
+
+        t = self.torneo
+        fila = {id_: i for i, id_ in enumerate(t.equipos)}
+        equipos = [[] for _ in COLUMNAS_EQUIPO]
+        for id_, e in t.equipos.items():
+            disciplina = t.disciplina.resumen_equipo(id_)
+            valores = [_cadena(id_), _cadena(e.pais), _cadena(e.abreviatura), _cadena(e.confederacion),
+                       _cadena(e.grupo), _cadena(e.stats.get('MaxAvance', FASE_GRUPOS))]
+            valores += [e.stats.get(k, 0) for k in ('PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts')]
+            valores += [disciplina['TA'], disciplina['TR'], disciplina['FairPlay']]
+            for columna, v in zip(equipos, valores):
+                columna.append(v)
+        partidos = [[] for _ in COLUMNAS_PARTIDO]
+        for mid, p in t.calendario.items():
+            penales = p.penales or {}
+            valores = [_cadena(mid), _cadena(p.codigo), _cadena(p.fase), _cadena(p.grupo), _cadena(p.fecha),
+                       _cadena(p.hora), _nulo(p.jornada), fila.get(p.id_equipo1, NULO), fila.get(p.id_equipo2, NULO),
+                       _nulo(p.goles_e1), _nulo(p.goles_e2), _nulo(penales.get('p1')), _nulo(penales.get('p2')),
+                       p.tarj_ama_e1 or 0, p.tarj_ama_e2 or 0, p.tarj_roja_e1 or 0, p.tarj_roja_e2 or 0]
+            for columna, v in zip(partidos, valores):
+                columna.append(v)
+        # el formato guardado con el torneo viaja como JSON en el pool; la cabecera lleva su índice
+        formato = _cadena(json.dumps(t.formato.a_dict(), ensure_ascii=False))
+        return equipos, partidos, cadenas, formato
+
+    def _entra(self, n_e, n_p, n_c, n_b):
+        if self._disp is None:
+            return False
+        cab = self._disp.cabecera
+        return (n_e <= cab[G_CAP_EQUIPOS] and n_p <= cab[G_CAP_PARTIDOS]
+                and n_c <= cab[G_CAP_CADENAS] and n_b <= cab[G_CAP_BYTES])
+
+    def _crecer(self, n_e, n_p, n_c, n_b):
+        caps = (max(64, 2 * n_e), max(256, 2 * n_p), max(2048, 2 * n_c), max(65536, 2 * n_b))
+        tam = CABECERA + RANURAS * _Disposicion.tamano_ranura(*caps)
+        anterior = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=tam)
+        self._disp = _Disposicion(self.shm.buf, *caps)
+        self._disp.cabecera[:] = 0
+        self._disp.cabecera[G_MAGIA] = MAGIA
+        self._disp.cabecera[G_CAP_EQUIPOS:G_CAP_BYTES + 1] = caps
+        self.publicaciones = 0
+        if anterior is not None:
+            with self._lock:
+                if self._en_uso.get(anterior.name):
+                    # hay trabajos encolados con su nombre: se borra cuando termine el último
+                    self._reemplazados[anterior.name] = anterior
+                    return
+            self._liberar(anterior)
+
+    def tomar(self, nombre):
+        """Un trabajo más va a leer el segmento `nombre`."""
+        with self._lock:
+            self._en_uso[nombre] = self._en_uso.get(nombre, 0) + 1
+
+    def soltar(self, nombre):
+        """Terminó un trabajo sobre `nombre`; si el segmento ya fue reemplazado y nadie más lo usa, se borra."""
+        with self._lock:
+            restantes = self._en_uso.get(nombre, 0) - 1
+            if restantes > 0:
+                self._en_uso[nombre] = restantes
+                return
+            self._en_uso.pop(nombre, None)
+            viejo = self._reemplazados.pop(nombre, None)
+        if viejo is not None:
+            self._liberar(viejo)
+
+    @staticmethod
+    def _liberar(shm):
+        try:
+            shm.close()
+            shm.unlink()
+        except (OSError, BufferError):
+            pass
+
+    def cerrar(self):
+        with self._lock:
+            viejos = list(self._reemplazados.values())
+            self._reemplazados.clear()
+        for viejo in viejos:
+            self._liberar(viejo)
+        if self.shm is not None:
+            self._disp = None
+            self._liberar(self.shm)
+            self.shm = None
+
+
+# ============================ LECTURA (procesos de trabajo) ============================
+class LecturaInconsistente(Exception):
+    pass
+
+
+class LectorInstantanea:
+    def __init__(self, nombre):
+        self.shm = _abrir_segmento(nombre)
+        cab = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        if cab[G_MAGIA] != MAGIA:
+            self.shm.close()
+            raise ValueError(f"{nombre} no es una instantánea del torneo")
+        self._disp = _Disposicion(self.shm.buf, *(int(c) for c in cab[G_CAP_EQUIPOS:G_CAP_BYTES + 1]))
+
+    def leer(self, fn, *args, reintentos=100):
+        """
+        fn(VistaInstantanea, *args) sobre la instantánea vigente. Si la ranura se reescribió
+        mientras fn corría (o fn falló por leer a mitad de una escritura) se vuelve a intentar.
+        """
+        for intento in range(reintentos):
+            r = int(self._disp.cabecera[G_VIGENTE])
+            cab = self._disp.ranuras[r][0]
+            seq = int(cab[R_SEQ])
+            if seq & 1:
+                time.sleep(0.0005 * intento)
+                continue
+            try:
+                resultado = fn(VistaInstantanea(self._disp.ranuras[r]), *args)
+            except Exception:
+                if int(cab[R_SEQ]) == seq:
+                    raise
+                continue
+            if int(cab[R_SEQ]) == seq:
+                return resultado
+        raise LecturaInconsistente(f"No se pudo leer una instantánea estable en {reintentos} intentos")
+
+    def cerrar(self):
+        self._disp = None
+        self.shm.close()
+
+
+class VistaInstantanea:
+    """Columnas de la ranura (sin copiar) recortadas a las filas válidas."""
+    def __init__(self, ranura):
+        cab, equipos, partidos, offsets, texto = ranura
+        self.version = int(cab[R_VERSION])
+        self.n_equipos = int(cab[R_EQUIPOS])
+        self.n_partidos = int(cab[R_PARTIDOS])
+        self._equipos = equipos[:, :self.n_equipos]
+        self._partidos = partidos[:, :self.n_partidos]
+        self._offsets = offsets[:int(cab[R_CADENAS]) + 1]
+        self._texto = texto[:int(cab[R_BYTES])]
+        self._formato = int(cab[R_FORMATO])
+        self._cadenas = None
+
+    def equipo(self, columna):
+        return self._equipos[CE[columna]]
+
+    def partido(self, columna):
+        return self._partidos[CP[columna]]
+
+    def cadenas(self):
+        """Pool de cadenas decodificado (una vez por vista)."""
+        if self._cadenas is None:
+            crudo = self._texto.tobytes()
+            o = self._offsets.tolist()
+            self._cadenas = [crudo[o[i]:o[i + 1]].decode('utf-8') for i in range(len(o) - 1)]
+        return self._cadenas
+
+    def texto_equipo(self, columna):
+        cadenas = self.cadenas()
+        return [cadenas[i] for i in self.equipo(columna).tolist()]
+
+    def texto_partido(self, columna):
+        cadenas = self.cadenas()
+        return [cadenas[i] for i in self.partido(columna).tolist()]
+
+    def grupos(self):
+        return sorted({g for g in self.texto_equipo('grupo') if g})
+
+    def formato(self):
+        """FormatoTorneo con que se publicó el torneo."""
+        return FormatoTorneo.desde_dict(json.loads(self.cadenas()[self._formato]))
+
+    def tabla(self, grupo):
+        """Filas de equipo del grupo ordenadas como Torneo.calcular_tabla_posiciones."""
+        cadenas = self.cadenas()
+        try:
+            codigo = cadenas.index(grupo)
+        except ValueError:
+            return np.empty(0, dtype=np.int64)
+        filas = np.flatnonzero(self.equipo('grupo') == codigo)
+        # lexsort es estable, como sorted(..., reverse=True): los empates conservan el orden de carga
+        orden = np.lexsort((-self.equipo('GF')[filas], -self.equipo('DG')[filas], -self.equipo('Pts')[filas]))
+        return filas[orden]
+
+    def a_torneo(self):
+        """Copia en objetos Equipo/Partido, para reutilizar código que espera un Torneo (render, exportación)."""
+        from core import Equipo, Partido
+        ids = self.texto_equipo('id')
+        texto = {c: self.texto_equipo(c) for c in TEXTO_EQUIPO}
+        numeros = {c: self.equipo(c).tolist() for c in COLUMNAS_EQUIPO[len(TEXTO_EQUIPO):]}
+        equipos = {}
+        for i, id_ in enumerate(ids):
+            e = Equipo(id_, texto['pais'][i], texto['abreviatura'][i], texto['confederacion'][i], texto['grupo'][i])
+            e.stats = {k: v[i] for k, v in numeros.items()}
+            e.stats['MaxAvance'] = texto['max_avance'][i]
+            equipos[id_] = e
+        texto = {c: self.texto_partido(c) for c in TEXTO_PARTIDO}
+        numeros = {c: self.partido(c).tolist() for c in COLUMNAS_PARTIDO[len(TEXTO_PARTIDO):]}
+
+        def _valor(c, i):
+            v = numeros[c][i]
+            return None if v == NULO else v
+
+        calendario = {}
+        for i, mid in enumerate(texto['match_id']):
+            p = Partido(ids[numeros['equipo1'][i]], ids[numeros['equipo2'][i]], texto['fecha'][i], texto['hora'][i],
+                        texto['fase'][i], grupo=texto['grupo'][i], jornada=_valor('jornada', i), codigo=texto['codigo'][i])
+            p.goles_e1, p.goles_e2 = _valor('goles1', i), _valor('goles2', i)
+            p.tarj_ama_e1, p.tarj_ama_e2 = numeros['ta1'][i], numeros['ta2'][i]
+            p.tarj_roja_e1, p.tarj_roja_e2 = numeros['tr1'][i], numeros['tr2'][i]
+            if _valor('penales1', i) is not None:
+                p.penales = {'p1': numeros['penales1'][i], 'p2': numeros['penales2'][i]}
+            calendario[mid] = p
+        return TorneoLectura(self.version, equipos, calendario, self.formato())
+
+
+class TorneoLectura:
+    """Lo que render.py y cli.exportar leen de un Torneo, sin eventos ni persistencia."""
+    def __init__(self, version, equipos, calendario, formato):
+        self.version = version
+        self.equipos = equipos
+        self.calendario = calendario
+        self.grupos = {e.grupo for e in equipos.values() if e.grupo}
+        self.formato = formato
+
+    def calcular_tabla_posiciones(self, grupo_id):
+        equipos_grupo = [e for e in self.equipos.values() if e.grupo == grupo_id]
+        return sorted(equipos_grupo, key=clave_tabla, reverse=True)
+
+
+# ============================ INFORMES (en los procesos de trabajo) ============================
+def filas_posiciones(vista):
+    paises = vista.texto_equipo('pais')
+    stats = [vista.equipo(c) for c in ('PJ', 'G', 'E', 'P', 'GF', 'GC', 'DG', 'Pts')]
+    filas = []
+    for g in vista.grupos():
+        for pos, i in enumerate(vista.tabla(g).tolist(), start=1):
+            filas.append([g, pos, paises[i]] + [int(s[i]) for s in stats])
+    return filas
+
+
+def filas_resultados_grupos(vista):
+    paises = vista.texto_equipo('pais')
+    grupos = vista.texto_equipo('grupo')
+    fases = vista.texto_partido('fase')
+    e1, e2 = vista.partido('equipo1').tolist(), vista.partido('equipo2').tolist()
+    g1, g2 = vista.partido('goles1').tolist(), vista.partido('goles2').tolist()
+    filas = []
+    for i, fase in enumerate(fases):
+        if fase != FASE_GRUPOS or e1[i] == NULO or e2[i] == NULO:
+            continue
+        res = f"{g1[i]} - {g2[i]}" if g1[i] != NULO else "Pendiente"
+        filas.append([grupos[e1[i]], paises[e1[i]], paises[e2[i]], res])
+    return filas
+
+
+def filas_goleadores(vista):
+    paises = vista.texto_equipo('pais')
+    gf, pts = vista.equipo('GF'), vista.equipo('Pts')
+    orden = np.argsort(-gf, kind='stable')
+    return [[paises[i], int(gf[i]), int(pts[i])] for i in orden.tolist()]
+
+
+def filas_confederaciones(vista):
+    confederaciones = [c or "Desconocida" for c in vista.texto_equipo('confederacion')]
+    nombres = list(dict.fromkeys(confederaciones))
+    codigo = np.array([nombres.index(c) for c in confederaciones], dtype=np.int64)
+    columnas = [np.bincount(codigo, weights=vista.equipo(c), minlength=len(nombres)).astype(int)
+                for c in ('PJ', 'G', 'E', 'P', 'Pts')]
+    return [[n] + [int(col[i]) for col in columnas] for i, n in enumerate(nombres)]
+
+
+def filas_tarjetas(vista):
+    paises = vista.texto_equipo('pais')
+    ta, tr, fp = vista.equipo('TA'), vista.equipo('TR'), vista.equipo('FairPlay')
+    orden = np.lexsort((-ta, -tr))
+    return [[paises[i], int(ta[i]), int(tr[i]), int(fp[i])] for i in orden.tolist()]
+
+
+def renderizar(vista, nombre_vista, formato='svg', directorio=None):
+    from render import RenderizadorTorneo, DIRECTORIO
+    return RenderizadorTorneo(vista.a_torneo(), directorio or DIRECTORIO).obtener(nombre_vista, formato)
+
+
+def exportar(vista, salida, formato='xlsx'):
+    from cli import exportar as exportar_torneo
+    os.makedirs(salida, exist_ok=True)
+    return exportar_torneo(vista.a_torneo(), salida, formato)
+
+
+_lectores = {}
+
+
+def _trabajo(nombre, fn, args):
+    lector = _lectores.get(nombre)
+    if lector is None:
+        # el segmento anterior ya no recibe publicaciones
+        for viejo in _lectores.values():
+            viejo.cerrar()
+        _lectores.clear()
+        lector = _lectores[nombre] = LectorInstantanea(nombre)
+    return lector.leer(fn, *args)
+
+
+# ============================ POOL ============================
+class PoolInformes:
+    """
+    Procesos de trabajo que leen las instantáneas. `enviar` se llama desde el hilo dueño
+    del Torneo: publica si hubo cambios y encola fn(vista, *args) con el segmento vigente.
+    """
+    def __init__(self, torneo, procesos=None):
+        self.publicador = PublicadorInstantanea(torneo)
+        # spawn: no se hereda el estado de Tk del proceso de la UI
+        self._pool = ProcessPoolExecutor(max_workers=procesos or max(1, min(2, (os.cpu_count() or 2) - 1)),
+                                         mp_context=multiprocessing.get_context("spawn"))
+
+    def enviar(self, fn, *args):
+        nombre = self.publicador.publicar()
+        self.publicador.tomar(nombre)
+        try:
+            futuro = self._pool.submit(_trabajo, nombre, fn, args)
+        except BaseException:
+            self.publicador.soltar(nombre)
+            raise
+        futuro.add_done_callback(lambda _: self.publicador.soltar(nombre))
+        return futuro
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.publicador.cerrar()
+
+
+_pool = None
+
+
+def obtener_pool(torneo=None):
+    """Pool único del proceso, sobre el Torneo compartido."""
+    global _pool
+    if _pool is None:
+        from core import obtener_torneo
+        _pool = PoolInformes(torneo or obtener_torneo())
+        atexit.register(_pool.cerrar)
+    return _pool
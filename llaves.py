@@ -0,0 +1,377 @@
+# llaves.py
+"""
+Cuadro de eliminación como grafo de dependencias, leído de fechas_fase_eliminatoria.xlsx o
+generado a partir del formato del torneo (formatos.py) cuando este no trae planilla.
+
+Cada partido (M37 ... M52) tiene dos cupos: una posición de grupo ('1A', '3 A/C/D') o el
+ganador/perdedor de otro partido. Al registrarse un resultado solo se recorren las aristas
+salientes de ese partido (a lo sumo dos), sin regenerar rondas enteras.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import pandas as pd
+from core import Partido, SCRIPT_DIR, fecha_iso, hora_hhmm, obtener_torneo
+from eventos import ResultadoRegistrado
+from metricas import leer_excel
+
+ARCHIVO_LLAVES = "fechas_fase_eliminatoria.xlsx"
+
+# Etapas del libro fechas_fase_eliminatoria.xlsx -> nombres de fase usados en el calendario
+ETAPAS = {
+    'DIECISEISAVOS DE FINAL': 'Dieciseisavos',
+    'OCTAVOS DE FINAL': 'Octavos',
+    'CUARTOS DE FINAL': 'Cuartos',
+    'SEMIFINALES': 'Semifinal',
+    'SEMIFINAL': 'Semifinal',
+    'TERCER PUESTO': 'Tercer puesto',
+    'FINAL': 'Final',
+}
+ORDEN_AVANCE = ['Fase de Grupos', 'Dieciseisavos', 'Octavos', 'Cuartos', 'Semifinal', 'Final', 'Campeón']
+
+
+@dataclass(frozen=True)
+class Cupo:
+    """Un lado de un partido de eliminación: '2A', '3 A/C/D', 'Ganador M37' o 'Perdedor M49'."""
+    tipo: str                 # 'posicion' | 'ganador' | 'perdedor'
+    posicion: int = 0
+    grupos: Tuple[str, ...] = ()
+    partido: str = ""
+
+    def texto(self):
+        if self.tipo == 'posicion':
+            if len(self.grupos) == 1:
+                return f"{self.posicion}{self.grupos[0]}"
+            return f"{self.posicion} {'/'.join(self.grupos)}"
+        return f"{self.tipo.capitalize()} {self.partido}"
+
+
+_RE_POSICION = re.compile(r'^\s*(\d)\s*°?\s*([A-Z](?:\s*/\s*[A-Z])*)\s*$')
+_RE_REFERENCIA = re.compile(r'^\s*(Ganador|Perdedor)\s+(M\d+)\s*$', re.IGNORECASE)
+
+
+def parsear_cupo(texto):
+    m = _RE_REFERENCIA.match(texto)
+    if m:
+        return Cupo(m.group(1).lower(), partido=m.group(2).upper())
+    m = _RE_POSICION.match(texto.upper())
+    if m:
+        grupos = tuple(g.strip() for g in m.group(2).split('/'))
+        return Cupo('posicion', posicion=int(m.group(1)), grupos=grupos)
+    raise ValueError(f"Código de posición no reconocido: {texto!r}")
+
+
+@dataclass
+class NodoLlave:
+    codigo: str
+    fase: str
+    fecha: str
+    hora: str
+    cupos: Tuple[Cupo, Cupo]
+
+
+class Llaves:
+    """Cuadro de eliminación descripto por códigos oficiales (M37 ... M52)."""
+    def __init__(self, nodos: List[NodoLlave]):
+        self.nodos: Dict[str, NodoLlave] = {n.codigo: n for n in nodos}
+        # aristas salientes: código de origen -> [(código destino, lado, 'ganador' | 'perdedor')]
+        self.salidas: Dict[str, List[Tuple[str, int, str]]] = {}
+        for n in nodos:
+            for lado, c in enumerate(n.cupos):
+                if c.tipo != 'posicion':
+                    if c.partido not in self.nodos:
+                        raise ValueError(f"{n.codigo} depende de {c.partido}, que no está en el cuadro.")
+                    self.salidas.setdefault(c.partido, []).append((n.codigo, lado, c.tipo))
+        self._token = None
+
+    @classmethod
+    def desde_excel(cls, path):
+        df = leer_excel(path)
+        col_etapa, col_codigo, col_fecha, col_hora, col_cruce = df.columns[:5]
+        nodos = []
+        for _, row in df.iterrows():
+            if pd.isna(row[col_codigo]):
+                continue
+            etapa = str(row[col_etapa]).strip().upper()
+            lado1, lado2 = re.split(r'\s+vs\.?\s+', str(row[col_cruce]).strip(), maxsplit=1, flags=re.IGNORECASE)
+            nodos.append(NodoLlave(str(row[col_codigo]).strip().upper(), ETAPAS.get(etapa, etapa.title()),
+                                   fecha_iso(row[col_fecha]), hora_hhmm(row[col_hora]),
+                                   (parsear_cupo(lado1), parsear_cupo(lado2))))
+        return cls(nodos)
+
+    @classmethod
+    def desde_formato(cls, formato):
+        """
+        Cuadro genérico para formatos sin planilla (2 por grupo y, opcionalmente, mejores terceros):
+        los primeros de los primeros grupos enfrentan a un tercero de otro grupo, el resto de los
+        primeros a un segundo de otro grupo y los segundos que sobran se cruzan entre sí. Desde ahí
+        cada partido enfrenta a los ganadores de dos partidos consecutivos; los perdedores de las
+        semifinales juegan el tercer puesto. Los códigos siguen a los de la fase de grupos.
+        """
+        terceros = formato.mejores_por_posicion.get(3, 0)
+        grupos = list(formato.grupos)
+        if formato.directos_por_grupo != 2 or set(formato.mejores_por_posicion) - {3} or terceros > len(grupos):
+            raise ValueError(f"El formato {formato.nombre} necesita un cuadro en Excel (campo 'llave').")
+        n = len(grupos)
+        primero = lambda g: Cupo('posicion', posicion=1, grupos=(g,))
+        segundo = lambda g: Cupo('posicion', posicion=2, grupos=(g,))
+        cruces = [(primero(g), Cupo('posicion', posicion=3, grupos=tuple(o for o in grupos if o != g)))
+                  for g in grupos[:terceros]]
+        # el segundo rival de cada primero es el del grupo siguiente, así nunca se repite grupo
+        cruces += [(primero(grupos[i]), segundo(grupos[(i + 1) % n])) for i in range(terceros, n)]
+        usados = {(i + 1) % n for i in range(terceros, n)}
+        sobrantes = [g for i, g in enumerate(grupos) if i not in usados]
+        cruces += [(segundo(a), segundo(b)) for a, b in zip(sobrantes[::2], sobrantes[1::2])]
+
+        numero = formato.partidos_de_grupos
+        nodos, ronda = [], []
+        fases = [f for f in formato.fases_eliminacion if f != 'Tercer puesto']
+        for fase in fases:
+            if ronda:
+                cruces = [(Cupo('ganador', partido=a), Cupo('ganador', partido=b)) for a, b in zip(ronda[::2], ronda[1::2])]
+            if fase == 'Final' and len(ronda) == 2:
+                numero += 1
+                nodos.append(NodoLlave(f"M{numero}", 'Tercer puesto', "", "",
+                                       (Cupo('perdedor', partido=ronda[0]), Cupo('perdedor', partido=ronda[1]))))
+            ronda = []
+            for cupos in cruces:
+                numero += 1
+                nodos.append(NodoLlave(f"M{numero}", fase, "", "", cupos))
+                ronda.append(f"M{numero}")
+        return cls(nodos)
+
+    def orden_topologico(self):
+        """Códigos en un orden en que cada partido aparece después de los que lo alimentan."""
+        entradas = {c: sum(1 for cupo in n.cupos if cupo.tipo != 'posicion') for c, n in self.nodos.items()}
+        listos = [c for c in self.nodos if entradas[c] == 0]
+        orden = []
+        while listos:
+            codigo = listos.pop(0)
+            orden.append(codigo)
+            for destino, _, _ in self.salidas.get(codigo, ()):
+                entradas[destino] -= 1
+                if entradas[destino] == 0:
+                    listos.append(destino)
+        if len(orden) != len(self.nodos):
+            raise ValueError("El cuadro de eliminación tiene dependencias circulares.")
+        return orden
+
+    def por_fase(self):
+        fases = {}
+        for codigo in self.orden_topologico():
+            n = self.nodos[codigo]
+            fases.setdefault(n.fase, []).append(n)
+        return fases
+
+    # ============================ TERCEROS ============================
+    def asignar_terceros(self, grupos_terceros):
+        """
+        Reparte los grupos de los mejores terceros entre los cupos '3 X/Y/Z' respetando los
+        grupos permitidos de cada cupo (emparejamiento por backtracking, determinista).
+        Devuelve {(codigo, lado): grupo}.
+        """
+        cupos = [(n.codigo, i, c.grupos) for n in self.nodos.values()
+                 for i, c in enumerate(n.cupos) if c.tipo == 'posicion' and c.posicion == 3]
+        cupos.sort(key=lambda x: (len(x[2]), x[0]))
+        disponibles = sorted(grupos_terceros)
+        asignacion = {}
+
+        def _buscar(k):
+            if k == len(cupos):
+                return True
+            codigo, lado, permitidos = cupos[k]
+            for g in disponibles:
+                if g in permitidos and g not in asignacion.values():
+                    asignacion[(codigo, lado)] = g
+                    if _buscar(k + 1):
+                        return True
+                    del asignacion[(codigo, lado)]
+            return False
+
+        if not _buscar(0):
+            raise ValueError(f"No hay forma de ubicar a los terceros de los grupos {disponibles} en el cuadro.")
+        return asignacion
+
+    def terceros_de(self, torneo):
+        """Asignación de terceros según las tablas actuales, o None si la fase de grupos no terminó."""
+        if not fase_grupos_completa(torneo):
+            return None
+        clasificados = torneo.calcular_clasificados(mejores_terceros=self.cantidad_terceros())
+        return self.asignar_terceros([torneo.equipos[i].grupo for i in clasificados.get('3os_best', [])])
+
+    def cantidad_terceros(self):
+        return sum(1 for n in self.nodos.values() for c in n.cupos if c.tipo == 'posicion' and c.posicion == 3)
+
+    # ============================ RESOLUCIÓN ============================
+    def resolver_cupo(self, torneo, codigo, lado, terceros):
+        """Id del equipo que ocupa el cupo, o None si todavía no está definido."""
+        cupo = self.nodos[codigo].cupos[lado]
+        if cupo.tipo == 'posicion':
+            if terceros is None:
+                return None
+            grupo = terceros.get((codigo, lado)) if cupo.posicion == 3 else cupo.grupos[0]
+            if grupo is None:
+                return None
+            tabla = torneo.calcular_tabla_posiciones(grupo)
+            return tabla[cupo.posicion - 1].identificador if len(tabla) >= cupo.posicion else None
+        origen = torneo.partido_por_codigo(cupo.partido)
+        if origen is None:
+            return None
+        _, p = origen
+        return p.ganador() if cupo.tipo == 'ganador' else p.perdedor()
+
+    def sincronizar(self, torneo, terceros=None):
+        """
+        Pone al día todo el cuadro contra el calendario: crea (upsert por código oficial) los
+        partidos cuyos dos equipos ya se conocen y corrige los cupos de los que aún no se jugaron.
+        Se usa al abrir la pantalla o al cerrar la fase de grupos; después alcanza con propagar().
+        Devuelve la lista de match_ids nuevos.
+        """
+        if terceros is None:
+            terceros = self.terceros_de(torneo)
+        nuevos = []
+        for codigo in self.orden_topologico():
+            mid = self._ubicar(torneo, codigo, [self.resolver_cupo(torneo, codigo, lado, terceros) for lado in (0, 1)])
+            if mid:
+                nuevos.append(mid)
+        return nuevos
+
+    def propagar(self, torneo, codigo):
+        """Lleva ganador y perdedor de `codigo` solo por sus aristas salientes. Devuelve los match_ids nuevos."""
+        origen = torneo.partido_por_codigo(codigo)
+        if origen is None:
+            return []
+        _, p = origen
+        if self.nodos[codigo].fase == 'Final' and p.ganador():
+            actualizar_avance(torneo, p.ganador(), 'Campeón')
+        nuevos = []
+        for destino, lado, _ in self.salidas.get(codigo, ()):
+            ids = [None, None]
+            ids[lado] = self.resolver_cupo(torneo, destino, lado, None)
+            # el otro cupo también es ganador/perdedor de un partido: se resuelve por código en O(1)
+            ids[1 - lado] = self.resolver_cupo(torneo, destino, 1 - lado, None)
+            mid = self._ubicar(torneo, destino, ids)
+            if mid:
+                nuevos.append(mid)
+        return nuevos
+
+    def _ubicar(self, torneo, codigo, ids):
+        """Crea el partido `codigo` o actualiza sus cupos conocidos. Devuelve el match_id si es nuevo."""
+        n = self.nodos[codigo]
+        existente = torneo.partido_por_codigo(codigo)
+        if existente is None:
+            if None in ids:
+                return None
+            mid, creado = torneo.upsert_partido(Partido(ids[0], ids[1], fecha=n.fecha, hora=n.hora,
+                                                        fase=n.fase, codigo=codigo))
+            for id_equipo in ids:
+                actualizar_avance(torneo, id_equipo, n.fase)
+            return mid if creado else None
+        mid, p = existente
+        for lado, id_equipo in enumerate(ids):
+            actual = p.id_equipo1 if lado == 0 else p.id_equipo2
+            if id_equipo is None or id_equipo == actual or p.jugado():
+                continue
+            torneo.reasignar_equipo(mid, lado, id_equipo)
+            actualizar_avance(torneo, id_equipo, n.fase)
+        return None
+
+    # ============================ SUSCRIPCIÓN ============================
+    def conectar(self, torneo):
+        """Propaga automáticamente cada resultado del torneo por el cuadro."""
+        def _al_registrar(evento):
+            p = evento.partido
+            if p.codigo in self.nodos and evento.accion == 'registro':
+                self.propagar(torneo, p.codigo)
+            elif p.codigo in self.nodos:
+                # una corrección puede sacar de la ronda siguiente a quien había avanzado
+                afectados = {p.id_equipo1, p.id_equipo2} | self._equipos_destino(torneo, p.codigo)
+                self.propagar(torneo, p.codigo)
+                for id_equipo in afectados:
+                    recalcular_avance(torneo, id_equipo)
+                torneo.guardar_datos()
+            elif p.fase == "Fase de Grupos" and fase_grupos_completa(torneo):
+                self.sincronizar(torneo)
+
+        self.desconectar(torneo)
+        self._token = torneo.eventos.suscribir(_al_registrar, ResultadoRegistrado)
+        torneo.cuadro = self
+        return self._token
+
+    def desconectar(self, torneo):
+        if self._token is not None:
+            torneo.eventos.desuscribir(self._token)
+            self._token = None
+        if getattr(torneo, 'cuadro', None) is self:
+            torneo.cuadro = None
+
+    def _equipos_destino(self, torneo, codigo):
+        equipos = set()
+        for destino, _, _ in self.salidas.get(codigo, ()):
+            encontrado = torneo.partido_por_codigo(destino)
+            if encontrado:
+                equipos.update((encontrado[1].id_equipo1, encontrado[1].id_equipo2))
+        return equipos
+
+    def destinos(self, torneo, codigo):
+        """Cupos que alimenta el partido `codigo`: [{'codigo', 'lado', 'equipo', 'match_id'}]."""
+        origen = torneo.partido_por_codigo(codigo)
+        if origen is None:
+            return []
+        _, p = origen
+        destinos = []
+        for destino, lado, tipo in self.salidas.get(codigo, ()):
+            encontrado = torneo.partido_por_codigo(destino)
+            destinos.append({'codigo': destino, 'lado': lado,
+                             'equipo': p.ganador() if tipo == 'ganador' else p.perdedor(),
+                             'match_id': encontrado[0] if encontrado else None})
+        return destinos
+
+
+def fase_grupos_completa(torneo):
+    grupos = [p for p in torneo.calendario.values() if p.fase == "Fase de Grupos"]
+    return bool(grupos) and all(p.jugado() for p in grupos)
+
+
+def cargar_llaves(formato):
+    """Cuadro del formato: su planilla si la tiene, si no el generado por desde_formato."""
+    if formato.llave:
+        return Llaves.desde_excel(os.path.join(SCRIPT_DIR, formato.llave))
+    return Llaves.desde_formato(formato)
+
+
+_llaves_compartidas = None
+
+def obtener_llaves(torneo=None):
+    """Cuadro oficial del proceso, leído una sola vez y conectado al Torneo compartido."""
+    global _llaves_compartidas
+    if _llaves_compartidas is None:
+        torneo = torneo or obtener_torneo()
+        _llaves_compartidas = cargar_llaves(torneo.formato)
+        _llaves_compartidas.conectar(torneo)
+    return _llaves_compartidas
+
+
+def recalcular_avance(torneo, id_equipo):
+    """MaxAvance desde el calendario: la fase más profunda que el equipo juega (o Campeón)."""
+    e = torneo.equipos.get(id_equipo)
+    if e is None:
+        return
+    avance = 0
+    for p in torneo.calendario.values():
+        if id_equipo not in (p.id_equipo1, p.id_equipo2) or p.fase not in ORDEN_AVANCE:
+            continue
+        fase = 'Campeón' if p.fase == 'Final' and p.ganador() == id_equipo else p.fase
+        avance = max(avance, ORDEN_AVANCE.index(fase))
+    e.stats['MaxAvance'] = ORDEN_AVANCE[avance]
+
+
+def actualizar_avance(torneo, id_equipo, fase):
+    """Sube stats['MaxAvance'] si la fase alcanzada es más profunda que la registrada."""
+    e = torneo.equipos.get(id_equipo)
+    if e is None or fase not in ORDEN_AVANCE:
+        return
+    actual = e.stats.get('MaxAvance', ORDEN_AVANCE[0])
+    if ORDEN_AVANCE.index(fase) > (ORDEN_AVANCE.index(actual) if actual in ORDEN_AVANCE else 0):
+        e.stats['MaxAvance'] = fase
@@ -6,8 +6,12 @@ from utils import apply_style, center_fullscreen
 from datetime import datetime
 from informes.informes import InformesUI
 from elimination_bracket import EliminationBracketUI
-import pandas as pd
 import os
+from metricas import leer_excel
+from monitor_ui import iniciar_monitor
+from tareas import obtener_ejecutor
+from agenda import fechas_oficiales_grupos
+from planificador import obtener_planificador
 
 # ====================================================
 # 🟦 Encabezado institucional
@@ -31,8 +35,9 @@ def crear_encabezado(ventana):
 
     def actualizar_hora():
         lbl_hora.config(text=datetime.now().strftime("%d/%m/%Y  %H:%M:%S"))
-        lbl_hora.after(1000, actualizar_hora)
-    actualizar_hora()
+    # 🔹 Todos los relojes comparten el temporizador de la raíz y se dan de baja al cerrar su ventana
+    obtener_planificador(ventana).cada(f"reloj:{lbl_hora}", 1000, actualizar_hora, widget=lbl_hora,
+                                       inmediato=True, alineado=True)
 
 # ====================================================
 # 🟩 Ventana principal con menú
@@ -43,6 +48,8 @@ def run_assigner_and_flow():
     center_fullscreen(root)
     root.configure(bg="#f0f0f0")
     crear_encabezado(root)
+    # 🔹 Vigilancia opcional del bucle de Tk (MUNDIAL_MONITOR_UI=1, overlay con F12)
+    iniciar_monitor(root)
 
     menu = tk.Frame(root, bg="#003366", padx=10, pady=10)
     menu.pack(side="left", fill="y")
@@ -73,6 +80,20 @@ def run_assigner_and_flow():
         tk.Button(menu, text="Eliminatoria", width=20,
                   command=lambda: abrir_eliminatoria(root)).pack(pady=5)
 
+    # 🔹 API JSON local (MUNDIAL_API_PUERTO) e ingesta del feed en vivo (MUNDIAL_INGESTA: archivo
+    #    .jsonl o tcp://host:puerto), opcionales, sobre el mismo Torneo que las ventanas
+    if os.environ.get("MUNDIAL_API_PUERTO") or os.environ.get("MUNDIAL_INGESTA"):
+        from api import DespachoTk
+        from core import obtener_torneo
+        despacho = DespachoTk(root)
+        if os.environ.get("MUNDIAL_API_PUERTO"):
+            from api import ServidorAPI
+            ServidorAPI(obtener_torneo(), despachar=despacho).iniciar_en_hilo(
+                puerto=int(os.environ["MUNDIAL_API_PUERTO"]))
+        if os.environ.get("MUNDIAL_INGESTA"):
+            from ingesta import IngestaResultados
+            IngestaResultados(obtener_torneo(), despachar=despacho).iniciar_en_hilo(os.environ["MUNDIAL_INGESTA"])
+
     root.mainloop()
 
 
@@ -127,13 +148,26 @@ def abrir_fase_grupos(root):
         )
         return
 
-    try:
-        df_g = pd.read_excel(grupos_path)
-        df_p = pd.read_excel(partidos_path)
-    except Exception as e:
-        tk.messagebox.showerror("Error", f"No se pudieron leer los archivos: {e}")
-        return
-
+    def _leer(tarea):
+        tarea.avance(0.0, "Leyendo grupos asignados...")
+        df_g = leer_excel(grupos_path)
+        tarea.comprobar()
+        tarea.avance(0.4, "Leyendo partidos...")
+        df_p = leer_excel(partidos_path)
+        tarea.comprobar()
+        tarea.avance(0.7, "Leyendo fechas oficiales...")
+        oficiales = fechas_oficiales_grupos()
+        tarea.avance(1.0)
+        return df_g, df_p, oficiales
+
+    # 🔹 Las planillas se leen en segundo plano; la ventana se abre cuando están listas
+    obtener_ejecutor(root).enviar(
+        _leer, titulo="Abriendo Fase de Grupos",
+        al_terminar=lambda dfs: _mostrar_fase_grupos(root, *dfs),
+        al_fallar=lambda e: tk.messagebox.showerror("Error", f"No se pudieron leer los archivos: {e}"))
+
+
+def _mostrar_fase_grupos(root, df_g, df_p, fechas_oficiales):
     # Crear estructuras a partir de los Excel
     assigned_groups = {}
     for _, row in df_g.iterrows():
@@ -153,16 +187,15 @@ def abrir_fase_grupos(root):
     # Crear la ventana de fase de grupos
     win = tk.Toplevel(root)
     crear_encabezado(win)
-    PhaseGroupsUI(win, assigned_groups, generated_matches)
+    PhaseGroupsUI(win, assigned_groups, generated_matches, fechas_oficiales)
     win.focus_force()
     
 def abrir_eliminatoria(root):
     """Abre la ventana de fases eliminatorias (octavos → final)."""
-    from core import Torneo
+    from core import obtener_torneo
     win = tk.Toplevel(root)
     crear_encabezado(win)
-    torneo = Torneo()
-    EliminationUI(win, torneo)
+    EliminationUI(win, obtener_torneo())
     win.focus_force()
 
 
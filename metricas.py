@@ -0,0 +1,193 @@
+# metricas.py
+"""
+Instrumentación opcional de las operaciones calientes (guardado, carga, tablas, Excel).
+
+Se activa definiendo MUNDIAL_METRICAS antes de abrir la aplicación:
+
+    MUNDIAL_METRICAS=1                  exporta metricas.prom y metricas.json al salir
+    MUNDIAL_METRICAS=/ruta/salida.prom  idem, en esa ruta (el JSON va al lado)
+
+Con la variable sin definir `instrumentar` devuelve la función original y `medir` un
+contexto vacío compartido, así que el costo desactivado es nulo.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import nullcontext
+from functools import wraps
+import pandas as pd
+
+_CONFIG = os.environ.get("MUNDIAL_METRICAS", "").strip()
+ACTIVO = _CONFIG not in ("", "0")
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUTA_PROMETHEUS = _CONFIG if _CONFIG.endswith(".prom") else os.path.join(SCRIPT_DIR, "metricas.prom")
+
+# límites de los buckets del histograma de latencia, en segundos
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_NULO = nullcontext()
+
+
+class _Serie:
+    __slots__ = ('llamadas', 'suma', 'maximo', 'buckets')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)   # el último es +Inf
+
+    def observar(self, segundos):
+        self.llamadas += 1
+        self.suma += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentil(self, q):
+        """Estimación por buckets (cota superior del bucket que contiene el percentil, acotada al máximo)."""
+        if not self.llamadas:
+            return 0.0
+        objetivo = q * self.llamadas
+        acumulado = 0
+        for i, n in enumerate(self.buckets):
+            acumulado += n
+            if acumulado >= objetivo:
+                return min(BUCKETS[i], self.maximo) if i < len(BUCKETS) else self.maximo
+        return self.maximo
+
+
+class Registro:
+    """Contadores, histogramas y bytes por operación. Seguro entre hilos (el guardado corre aparte)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series = {}
+        self.bytes = {}        # (operacion, 'lectura' | 'escritura') -> total
+
+    def observar(self, operacion, segundos):
+        with self._lock:
+            serie = self.series.get(operacion)
+            if serie is None:
+                serie = self.series[operacion] = _Serie()
+            serie.observar(segundos)
+
+    def sumar_bytes(self, operacion, direccion, cantidad):
+        with self._lock:
+            clave = (operacion, direccion)
+            self.bytes[clave] = self.bytes.get(clave, 0) + cantidad
+
+    # ============================ EXPORTACIÓN ============================
+    def texto_prometheus(self):
+        lineas = [
+            "# HELP mundial_operacion_segundos Latencia de las operaciones del torneo.",
+            "# TYPE mundial_operacion_segundos histogram",
+        ]
+        with self._lock:
+            for op, s in sorted(self.series.items()):
+                acumulado = 0
+                for limite, n in zip(BUCKETS + ('+Inf',), s.buckets):
+                    acumulado += n
+                    lineas.append(f'mundial_operacion_segundos_bucket{{op="{op}",le="{limite}"}} {acumulado}')
+                lineas.append(f'mundial_operacion_segundos_sum{{op="{op}"}} {s.suma:.6f}')
+                lineas.append(f'mundial_operacion_segundos_count{{op="{op}"}} {s.llamadas}')
+            lineas.append("# HELP mundial_bytes_total Bytes leídos o escritos por operación.")
+            lineas.append("# TYPE mundial_bytes_total counter")
+            for (op, direccion), n in sorted(self.bytes.items()):
+                lineas.append(f'mundial_bytes_total{{op="{op}",direccion="{direccion}"}} {n}')
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self):
+        with self._lock:
+            ops = {op: {'llamadas': s.llamadas,
+                        'total_ms': round(s.suma * 1000, 3),
+                        'media_ms': round(s.suma / s.llamadas * 1000, 3) if s.llamadas else 0.0,
+                        'p50_ms': round(s.percentil(0.5) * 1000, 3),
+                        'p95_ms': round(s.percentil(0.95) * 1000, 3),
+                        'max_ms': round(s.maximo * 1000, 3)}
+                   for op, s in sorted(self.series.items())}
+            for (op, direccion), n in self.bytes.items():
+                ops.setdefault(op, {})[f'bytes_{direccion}'] = n
+        return ops
+
+    def exportar(self, ruta=None):
+        ruta = ruta or RUTA_PROMETHEUS
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(self.texto_prometheus())
+        with open(os.path.splitext(ruta)[0] + ".json", 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, indent=4, ensure_ascii=False)
+
+
+REGISTRO = Registro()
+
+
+def instrumentar(operacion, bytes_leidos=None, bytes_escritos=None):
+    """
+    Decorador: cuenta llamadas y latencia. `bytes_leidos`/`bytes_escritos` reciben
+    (args, kwargs, resultado) y devuelven cuántos bytes movió la llamada.
+    """
+    def decorador(fn):
+        if not ACTIVO:
+            return fn
+
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = fn(*args, **kwargs)
+            finally:
+                REGISTRO.observar(operacion, time.perf_counter() - inicio)
+            if bytes_leidos:
+                REGISTRO.sumar_bytes(operacion, 'lectura', bytes_leidos(args, kwargs, resultado))
+            if bytes_escritos:
+                REGISTRO.sumar_bytes(operacion, 'escritura', bytes_escritos(args, kwargs, resultado))
+            return resultado
+        return envoltura
+    return decorador
+
+
+class _Medicion:
+    __slots__ = ('operacion', 'inicio')
+
+    def __init__(self, operacion):
+        self.operacion = operacion
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRO.observar(self.operacion, time.perf_counter() - self.inicio)
+        return False
+
+
+def medir(operacion):
+    """`with medir('banderas'):` para bloques que no son una función aparte."""
+    return _Medicion(operacion) if ACTIVO else _NULO
+
+
+def tamano_archivo(ruta):
+    try:
+        return os.path.getsize(ruta)
+    except OSError:
+        return 0
+
+
+# ============================ EXCEL ============================
+@instrumentar("read_excel", bytes_leidos=lambda a, k, r: tamano_archivo(a[0]))
+def leer_excel(path, **kwargs):
+    return pd.read_excel(path, **kwargs)
+
+
+@instrumentar("to_excel", bytes_escritos=lambda a, k, r: tamano_archivo(a[1]))
+def escribir_excel(df, path, **kwargs):
+    kwargs.setdefault('index', False)
+    df.to_excel(path, **kwargs)
+
+
+if ACTIVO:
+    atexit.register(REGISTRO.exportar)
@@ -0,0 +1,189 @@
+# monitor_ui.py
+"""
+Vigilancia del bucle de eventos de Tk (se activa con MUNDIAL_MONITOR_UI=1).
+
+- Un latido con `after`, como el reloj de main.crear_encabezado, mide el retraso con que
+  Tk ejecuta los callbacks programados.
+- Un hilo vigía detecta cuando el latido no llega a tiempo y toma muestras de la pila del
+  hilo principal (sys._current_frames) mientras dure el bloqueo.
+- `accion(nombre)` cronometra acciones de la interfaz hasta que la ventana terminó de
+  redibujarse (doble clic → diálogo, guardar → tabla actualizada, abrir posiciones).
+
+Todo queda en monitor_ui.log y en una ventana flotante que se muestra/oculta con F12.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import traceback
+from collections import Counter, deque
+from contextlib import nullcontext
+from functools import wraps
+import tkinter as tk
+from planificador import obtener_planificador
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIVO = os.environ.get("MUNDIAL_MONITOR_UI", "").strip() not in ("", "0")
+
+
+class MonitorUI:
+    def __init__(self, root, intervalo_ms=100, umbral_ms=250, archivo_log=None):
+        self.root = root
+        self.intervalo = intervalo_ms / 1000
+        self.umbral = umbral_ms / 1000
+        self.log = logging.getLogger("mundial.monitor_ui")
+        if not self.log.handlers:
+            handler = logging.FileHandler(archivo_log or os.path.join(SCRIPT_DIR, "monitor_ui.log"), encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            self.log.addHandler(handler)
+            self.log.setLevel(logging.INFO)
+
+        self._hilo_principal = threading.main_thread().ident
+        self._lock = threading.Lock()
+        self._ultimo_latido = time.monotonic()
+        self._esperado = self._ultimo_latido + self.intervalo
+        self.retrasos = deque(maxlen=600)            # últimos ~60 s de retrasos, en segundos
+        self.retraso_max = 0.0
+        self.acciones = deque(maxlen=8)              # (nombre, ms)
+        self.bloqueos = 0
+        self._muestras = []
+        self._activo = True
+        self._overlay = None
+        self._texto = None
+
+        self.root.after(int(self.intervalo * 1000), self._latido)
+        self.root.bind_all("<F12>", lambda e: self.alternar_overlay(), add="+")
+        self._vigia = threading.Thread(target=self._vigilar, name="monitor-ui", daemon=True)
+        self._vigia.start()
+        self.log.info("Monitor de UI iniciado (intervalo %d ms, umbral %d ms)", intervalo_ms, umbral_ms)
+
+    # ============================ LATIDO (hilo de Tk) ============================
+    def _latido(self):
+        if not self._activo:
+            return
+        ahora = time.monotonic()
+        retraso = max(0.0, ahora - self._esperado)
+        with self._lock:
+            self._ultimo_latido = ahora
+            muestras, self._muestras = self._muestras, []
+        self.retrasos.append(retraso)
+        self.retraso_max = max(self.retraso_max, retraso)
+        if muestras or retraso > self.umbral:
+            self._registrar_bloqueo(retraso, muestras)
+        self._esperado = ahora + self.intervalo
+        self.root.after(int(self.intervalo * 1000), self._latido)
+
+    def _registrar_bloqueo(self, retraso, muestras):
+        self.bloqueos += 1
+        frecuentes = Counter(muestras).most_common(2)
+        # sin muestras el bloqueo fue más corto que el período del vigía
+        detalle = "\n".join(f"--- {n} de {len(muestras)} muestras ---\n{pila}" for pila, n in frecuentes)
+        self.log.warning("Bloqueo del hilo principal de %.0f ms\n%s", retraso * 1000, detalle)
+
+    # ============================ VIGÍA (hilo propio) ============================
+    def _vigilar(self):
+        while self._activo:
+            time.sleep(self.umbral / 2)
+            with self._lock:
+                atrasado = time.monotonic() - self._ultimo_latido > self.intervalo + self.umbral
+            if not atrasado:
+                continue
+            frame = sys._current_frames().get(self._hilo_principal)
+            if frame is None:
+                continue
+            pila = "".join(traceback.format_stack(frame, limit=12))
+            with self._lock:
+                if len(self._muestras) < 50:
+                    self._muestras.append(pila)
+
+    # ============================ ACCIONES ============================
+    def accion(self, nombre):
+        return _Accion(self, nombre)
+
+    def _fin_accion(self, nombre, inicio):
+        ms = (time.perf_counter() - inicio) * 1000
+        self.acciones.append((nombre, ms))
+        nivel = logging.WARNING if ms > self.umbral * 1000 else logging.INFO
+        self.log.log(nivel, "Acción '%s': %.1f ms hasta redibujar", nombre, ms)
+
+    # ============================ OVERLAY ============================
+    def alternar_overlay(self):
+        if self._overlay is not None and self._overlay.winfo_exists():
+            self._overlay.destroy()
+            self._overlay = None
+            return
+        self._overlay = tk.Toplevel(self.root)
+        self._overlay.overrideredirect(True)
+        self._overlay.attributes('-topmost', True)
+        self._overlay.geometry(f"+{self.root.winfo_screenwidth() - 340}+40")
+        self._texto = tk.Label(self._overlay, justify='left', anchor='w', bg="#111111", fg="#7CFC00",
+                               font=("Consolas", 9), padx=8, pady=6)
+        self._texto.pack(fill='both')
+        obtener_planificador(self.root).cada("monitor:overlay", 500, self._refrescar_overlay,
+                                             widget=self._overlay, inmediato=True)
+
+    def _refrescar_overlay(self):
+        if self._overlay is None or not self._overlay.winfo_exists():
+            return
+        ordenados = sorted(self.retrasos)
+        p95 = ordenados[int(len(ordenados) * 0.95) - 1] if ordenados else 0.0
+        lineas = [f"Retraso after: {self.retrasos[-1] * 1000 if self.retrasos else 0:.0f} ms"
+                  f"  p95 {p95 * 1000:.0f}  máx {self.retraso_max * 1000:.0f}",
+                  f"Bloqueos > {self.umbral * 1000:.0f} ms: {self.bloqueos}",
+                  "Últimas acciones:"]
+        lineas += [f"  {nombre[:28]:<28} {ms:7.1f} ms" for nombre, ms in reversed(self.acciones)]
+        tareas = sorted(obtener_planificador(self.root).estadisticas().items(), key=lambda kv: -kv[1]['total_ms'])
+        lineas.append(f"Tareas programadas ({len(tareas)}), por tiempo total:")
+        lineas += [f"  {nombre[:22]:<22} {e['ejecuciones']:6d}x {e['maximo_ms']:6.1f} ms máx"
+                   for nombre, e in tareas[:5]]
+        self._texto.config(text="\n".join(lineas))
+
+    def detener(self):
+        self._activo = False
+
+
+class _Accion:
+    __slots__ = ('monitor', 'nombre', 'inicio')
+
+    def __init__(self, monitor, nombre):
+        self.monitor = monitor
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # after_idle corre después de los redibujos que la acción dejó pendientes
+        inicio, nombre = self.inicio, self.nombre
+        self.monitor.root.after_idle(lambda: self.monitor._fin_accion(nombre, inicio))
+        return False
+
+
+_monitor = None
+_NULO = nullcontext()
+
+
+def iniciar_monitor(root, **opciones):
+    """Arranca el monitor sobre la ventana raíz si MUNDIAL_MONITOR_UI está definida."""
+    global _monitor
+    if ACTIVO and _monitor is None:
+        _monitor = MonitorUI(root, **opciones)
+    return _monitor
+
+
+def accion(nombre):
+    """`with accion('guardar resultado'):`; no hace nada si el monitor no está activo."""
+    return _monitor.accion(nombre) if _monitor is not None else _NULO
+
+
+def medir_accion(nombre):
+    """Decorador para handlers de la UI (botones, doble clic)."""
+    def decorador(fn):
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            with accion(nombre):
+                return fn(*args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,133 @@
+# persistencia.py
+import os
+import json
+import atexit
+import tempfile
+import threading
+import time
+from metricas import instrumentar
+
+# umask del proceso, leída una vez al importar (os.umask no se puede consultar sin cambiarla)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def modo_destino(ruta):
+    """Permisos del archivo que se reemplaza, o los que le daría un open() común si no existe."""
+    try:
+        return os.stat(ruta).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+@instrumentar("escribir_atomico", bytes_escritos=lambda a, k, r: len(a[1]))
+def escribir_atomico(ruta, contenido: bytes):
+    """Escribe en un temporal del mismo directorio, hace fsync y lo renombra sobre el destino."""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea el temporal con 0600 y os.replace lo conservaría
+        os.chmod(tmp, modo_destino(ruta))
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    # el rename solo es durable cuando se sincroniza el directorio (no aplica en Windows)
+    if os.name != 'nt':
+        try:
+            dfd = os.open(directorio, os.O_RDONLY)
+            try:
+                os.fsync(dfd)
+            finally:
+                os.close(dfd)
+        except OSError:
+            pass
+
+
+@instrumentar("serializar")
+def serializar(data) -> bytes:
+    return json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+
+
+class GuardadoDiferido:
+    """
+    Hilo de persistencia: recibe snapshots ya copiados desde la UI y los escribe fuera
+    del hilo de Tk. Las ráfagas de cambios dentro de `ventana` segundos se agrupan
+    en una sola escritura (siempre se escribe el snapshot más reciente).
+    """
+    def __init__(self, ruta, ventana=0.5):
+        self.ruta = ruta
+        self.ventana = ventana
+        self.ultimo_error = None
+        self._cond = threading.Condition()
+        self._pendiente = None
+        self._solicitados = 0
+        self._escritos = 0
+        self._cerrado = False
+        self._flush_pedido = False
+        self._hilo = threading.Thread(target=self._ejecutar, name="guardado-torneo", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def solicitar(self, snapshot):
+        with self._cond:
+            self._pendiente = snapshot
+            self._solicitados += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Bloquea hasta que el último snapshot solicitado esté en disco. Devuelve False si falló."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            objetivo = self._solicitados
+            # se despierta al hilo para que no espere el resto de la ventana
+            self._flush_pedido = True
+            self._cond.notify_all()
+            while self._escritos < objetivo and self._hilo.is_alive():
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cond.wait(restante)
+            return self._escritos >= objetivo and self.ultimo_error is None
+
+    def cerrar(self):
+        self.flush(timeout=10)
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+
+    # ============================ HILO ============================
+    def _ejecutar(self):
+        while True:
+            with self._cond:
+                while self._pendiente is None and not self._cerrado:
+                    self._cond.wait()
+                if self._pendiente is None and self._cerrado:
+                    return
+                # ventana de agrupamiento: los cambios que lleguen mientras tanto reemplazan al snapshot
+                fin = time.monotonic() + self.ventana
+                while not self._flush_pedido and not self._cerrado:
+                    restante = fin - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                snapshot, self._pendiente = self._pendiente, None
+                objetivo = self._solicitados
+                self._flush_pedido = False
+            try:
+                escribir_atomico(self.ruta, serializar(snapshot))
+                error = None
+            except Exception as ex:
+                error = ex
+                print(f"Error guardando {os.path.basename(self.ruta)}: {ex}")
+            with self._cond:
+                self.ultimo_error = error
+                self._escritos = max(self._escritos, objetivo)
+                self._cond.notify_all()
@@ -1,29 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from utils import apply_style, center_fullscreen
-from core import Torneo, Partido, Equipo
+from core import Partido, Equipo, obtener_torneo
+from eventos import ResultadoRegistrado, FaseAvanzada
+from llaves import obtener_llaves
+from agenda import fechas_oficiales_grupos
+from monitor_ui import medir_accion
+from ventana_posiciones import mostrar_posiciones
 import os
-from PIL import Image, ImageTk
-import unicodedata
 
 
 class PhaseGroupsUI:
-    def __init__(self, master, assigned_groups, generated_matches):
+    def __init__(self, master, assigned_groups, generated_matches, fechas_oficiales=None):
         self.master = master
         self.master.title("Fase de Grupos - Jornadas")
         apply_style(self.master)
         center_fullscreen(self.master)
 
-        self.torneo = Torneo()
+        self.torneo = obtener_torneo()
         self.assigned_groups = assigned_groups
         self.generated_matches = generated_matches
+        self._fechas_oficiales = fechas_oficiales
         self.current_jornada = 1
-        self.max_jornada = 3
-        self._flag_cache = {}
+        self.max_jornada = self.torneo.formato.jornadas
+        self._match_ids = {}  # (grupo, equipo1, equipo2) -> match_id
 
         self._load_into_torneo()
         self._build_ui()
         self._load_jornada(self.current_jornada)
+        # Resultados cargados desde cualquier ventana actualizan solo su fila
+        self.torneo.eventos.suscribir_widget(self.master, self._on_resultado, ResultadoRegistrado)
 
     # ============================ CONFIGURACIÓN DE UI ============================
     def _build_ui(self):
@@ -87,6 +93,7 @@ class PhaseGroupsUI:
     def volver_menu(self):
         """Cierra esta ventana y regresa al menú principal sin perder datos."""
         self.torneo.guardar_datos()  # Asegura que se guarde todo lo cargado
+        self.torneo.flush()           # y espera a que el hilo de guardado lo escriba
         self.master.destroy()         # Cierra solo esta ventana
 
 
@@ -96,8 +103,10 @@ class PhaseGroupsUI:
             for pos, pais in enumerate(lista, start=1):
                 ident = f"{g}{pos}"
                 eq = Equipo(ident, pais, abreviatura=pais[:3].upper(), grupo=g)
-                self.torneo.agregar_equipo(eq)
+                self.torneo.upsert_equipo(eq)  # reabrir la pantalla no reinicia las estadísticas
 
+        # los ids dependen del sorteo, así que el fixture oficial se cruza por nombre de país
+        oficiales = self._fechas_oficiales if self._fechas_oficiales is not None else fechas_oficiales_grupos()
         for m in self.generated_matches:
             g = m['Grupo']
             e1 = m['Equipo1']
@@ -106,8 +115,9 @@ class PhaseGroupsUI:
             pos2 = self.assigned_groups[g].index(e2) + 1
             id1 = f"{g}{pos1}"
             id2 = f"{g}{pos2}"
-            p = Partido(id1, id2, fecha="", hora="", fase="Fase de Grupos")
-            self.torneo.agregar_partido(p)
+            fecha, hora = oficiales.get(frozenset((e1, e2)), ("", ""))
+            p = Partido(id1, id2, fecha=fecha, hora=hora, fase="Fase de Grupos", grupo=g, jornada=m['Jornada'])
+            self._match_ids[(g, e1, e2)], _ = self.torneo.upsert_partido(p)
 
         self.torneo.configuracion_cerrada = True
         self.torneo.guardar_datos()
@@ -127,21 +137,36 @@ class PhaseGroupsUI:
             g = m['Grupo']
             e1 = m['Equipo1']
             e2 = m['Equipo2']
+            mid = self._match_ids.get((g, e1, e2))
             tag = 'evenrow' if (len(self.tree.get_children()) % 2 == 0) else 'oddrow'
-            self.tree.insert("", tk.END, values=("", g, e1, "", "vs", "", e2, "PENDIENTE"), tags=(tag,))
+            self.tree.insert("", tk.END, iid=mid, values=self._row_values(mid, g, e1, e2), tags=(tag,))
+
+    def _row_values(self, mid, g, e1, e2):
+        p = self.torneo.calendario.get(mid) if mid else None
+        if p is None or p.goles_e1 is None:
+            return (mid or "", g, e1, "", "vs", "", e2, "PENDIENTE")
+        return (mid, g, e1, p.goles_e1, "vs", p.goles_e2, e2, f"{p.goles_e1} : {p.goles_e2}")
+
+    def _on_resultado(self, evento):
+        """Actualiza únicamente la fila del partido afectado (si está visible)."""
+        if not self.tree.exists(evento.match_id):
+            return
+        _, g, e1, _, _, _, e2, _ = self.tree.item(evento.match_id, "values")
+        self.tree.item(evento.match_id, values=self._row_values(evento.match_id, g, e1, e2))
 
     def advance_jornada(self):
         """
-        Avanza de jornada en jornada hasta la 3. 
-        Solo al finalizar la tercera jornada se cierra la fase de grupos.
+        Avanza de jornada en jornada hasta la última del formato (3 en grupos de 4).
+        Solo al finalizar la última jornada se cierra la fase de grupos.
         """
         if self.current_jornada < self.max_jornada:
         # Avanzar a la siguiente jornada normalmente
             self.current_jornada += 1
             self._load_jornada(self.current_jornada)
             messagebox.showinfo("Avance", f"Has avanzado a la Jornada {self.current_jornada}.")
+            return
         
-            # ✅ Solo cuando se completa la tercera jornada, se finaliza la fase
+            # ✅ Solo cuando se completa la última jornada, se finaliza la fase
         messagebox.showinfo("Fase de grupos finalizada", "Todas las jornadas completadas.")
 
         # Crear archivo marcador para bloquear reingreso a fase de grupos
@@ -151,6 +176,7 @@ class PhaseGroupsUI:
 
         # Guardar los datos del torneo
         self.torneo.guardar_datos()
+        self.torneo.publicar(FaseAvanzada, fase_anterior="Fase de Grupos", fase_nueva=self.torneo.formato.fases_eliminacion[0])
 
         # Mostrar las tablas finales
         self.show_standings_window(all_groups=True)
@@ -164,64 +190,11 @@ class PhaseGroupsUI:
         self.show_standings_window()
 
     # ============================ TABLA DE POSICIONES ============================
+    @medir_accion("abrir posiciones")
     def show_standings_window(self, all_groups=False):
-        from PIL import Image, ImageTk
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        bandera_path = os.path.join(os.path.dirname(BASE_DIR), "banderas")
-
-
-        win = tk.Toplevel(self.master)
-        win.title("Tablas de Posiciones")
-        win.geometry("950x550")
-        win.transient(self.master)
-        win.focus_force()
-
-        frm = ttk.Frame(win, padding=8)
-        frm.pack(fill='both', expand=True)
+        """Muestra la ventana de posiciones (única y siempre al día, ver ventana_posiciones.py)."""
+        mostrar_posiciones(self.master, self.torneo)
 
-        groups = sorted(set(e.grupo for e in self.torneo.equipos.values()))
-        nb = ttk.Notebook(frm)
-        nb.pack(fill='both', expand=True)
-
-        style = ttk.Style()
-        style.theme_use("clam")
-        style.configure("Treeview.Heading", anchor="center", font=('Segoe UI', 10, 'bold'),
-                        background="#003366", foreground="white")
-        style.configure("Treeview", font=('Segoe UI', 10), rowheight=30,
-                        background="#FFFFFF", fieldbackground="#FFFFFF")
-
-        for g in groups:
-            tab = ttk.Frame(nb)
-            nb.add(tab, text=f"Grupo {g}")
-
-            tree = ttk.Treeview(tab, columns=("Pos", "Equipo", "PJ", "G", "E", "P", "GF", "GC", "DG", "Pts"), show="headings")
-            for c in ("Pos", "Equipo", "PJ", "G", "E", "P", "GF", "GC", "DG", "Pts"):
-                tree.heading(c, text=c)
-                tree.column(c, anchor="center", width=80)
-            tree.column("Equipo", width=200, anchor='w')
-
-            tabla = self.torneo.calcular_tabla_posiciones(g)
-            for i, t in enumerate(tabla, start=1):
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                pais = t.pais
-                img_path = os.path.join(bandera_path, self._normalize_name(pais) + ".png")
-                bandera_img = None
-                if os.path.exists(img_path):
-                    bandera = Image.open(img_path).resize((26, 18))
-                    bandera_img = ImageTk.PhotoImage(bandera)
-                    self._flag_cache[pais] = bandera_img
-                iid = tree.insert("", tk.END, values=(i, t.pais, t.stats['PJ'], t.stats['G'], t.stats['E'],
-                                                      t.stats['P'], t.stats['GF'], t.stats['GC'],
-                                                      t.stats['DG'], t.stats['Pts']), tags=(tag,))
-                if bandera_img:
-                    tree.item(iid, image=bandera_img)
-                    tree.image = bandera_img
-
-            tree.pack(fill='both', expand=True)
-
-    def _normalize_name(self, pais):
-        pais = ''.join(c for c in unicodedata.normalize('NFD', pais) if unicodedata.category(c) != 'Mn')
-        return pais.lower().replace(' ', '').replace('’', '').replace("'", "")
         # ============================ INFORMES ============================
     def show_reports_window(self):
         """Abre la ventana de informes generales (1 a 5)"""
@@ -230,6 +203,7 @@ class PhaseGroupsUI:
         InformesUI(win)
     
         # ============================ EVENTO: DOBLE CLIC ============================
+    @medir_accion("doble clic → diálogo (grupos)")
     def _on_double_click_row(self, event):
         """Permite ingresar y guardar el resultado del partido seleccionado sin reiniciar el torneo."""
         item = self.tree.selection()
@@ -247,7 +221,7 @@ class PhaseGroupsUI:
         # Crear ventana de edición de resultado
         win = tk.Toplevel(self.master)
         win.title(f"Registrar resultado - Grupo {grupo}")
-        win.geometry("350x220")
+        win.geometry("350x260")
         win.transient(self.master)
         win.focus_force()
         win.config(bg="#eaf0fb")
@@ -269,7 +243,16 @@ class PhaseGroupsUI:
         entry_g2 = ttk.Entry(fila, width=5)
         entry_g2.pack(side='left', padx=5)
 
+        # Buscar partido correspondiente
+        match_id = self._match_ids.get((grupo, equipo1, equipo2))
+
+        # Si ya tiene resultado se precarga: guardar de nuevo lo corrige (no lo suma dos veces)
+        if match_id and self.torneo.calendario[match_id].goles_e1 is not None:
+            entry_g1.insert(0, str(self.torneo.calendario[match_id].goles_e1))
+            entry_g2.insert(0, str(self.torneo.calendario[match_id].goles_e2))
+
         # --- GUARDAR RESULTADO ---
+        @medir_accion("guardar → tabla (grupos)")
         def guardar_resultado():
             try:
                 g1 = int(entry_g1.get())
@@ -278,62 +261,29 @@ class PhaseGroupsUI:
                 messagebox.showerror("Error", "Los goles deben ser números enteros.")
                 return
 
-            # Buscar partido correspondiente
-            partido_encontrado = None
-            for p in self.torneo.calendario.values():
-                e1 = self.torneo.equipos.get(p.id_equipo1)
-                e2 = self.torneo.equipos.get(p.id_equipo2)
-                if e1 and e2 and e1.pais == equipo1 and e2.pais == equipo2 and p.fase == "Fase de Grupos":
-                    partido_encontrado = p
-                    break
-
-            if not partido_encontrado:
+            if not match_id:
                 messagebox.showerror("Error", "No se encontró el partido en el registro interno.")
                 win.destroy()
                 return
 
-            # Actualizar datos en memoria
-            p = partido_encontrado
-            p.goles_e1 = g1
-            p.goles_e2 = g2
-
-            e1 = self.torneo.equipos[p.id_equipo1]
-            e2 = self.torneo.equipos[p.id_equipo2]
-
-            # Actualizar estadísticas
-            e1.stats['PJ'] += 1
-            e2.stats['PJ'] += 1
-            e1.stats['GF'] += g1
-            e2.stats['GF'] += g2
-            e1.stats['GC'] += g2
-            e2.stats['GC'] += g1
-
-            if g1 > g2:
-                e1.stats['G'] += 1
-                e2.stats['P'] += 1
-                e1.stats['Pts'] += 3
-            elif g2 > g1:
-                e2.stats['G'] += 1
-                e1.stats['P'] += 1
-                e2.stats['Pts'] += 3
-            else:
-                e1.stats['E'] += 1
-                e2.stats['E'] += 1
-                e1.stats['Pts'] += 1
-                e2.stats['Pts'] += 1
-
-            e1.stats['DG'] = e1.stats['GF'] - e1.stats['GC']
-            e2.stats['DG'] = e2.stats['GF'] - e2.stats['GC']
-
-            # Actualizar tabla visual
-            self.tree.set(item[0], column="G1", value=str(g1))
-            self.tree.set(item[0], column="G2", value=str(g2))
-            self.tree.set(item[0], column="Resultado", value=f"{g1} : {g2}")
+            # El diálogo solo edita goles: las tarjetas ya cargadas se conservan al corregir
+            p = self.torneo.calendario[match_id]
+            # La fila se actualiza sola a través del evento ResultadoRegistrado
+            if not self.torneo.registrar_resultado(match_id, g1, g2, p.tarj_ama_e1, p.tarj_ama_e2,
+                                                   p.tarj_roja_e1, p.tarj_roja_e2, jugador_stats=p.jugador_stats):
+                return
 
             # Cerrar ventana (sin mostrar messagebox)
             win.destroy()
 
+        @medir_accion("anular → tabla (grupos)")
+        def anular_resultado():
+            if match_id:
+                self.torneo.anular_resultado(match_id, motivo="Anulado desde Fase de Grupos")
+            win.destroy()
+
         ttk.Button(frm, text="Guardar", command=guardar_resultado).pack(pady=10)
+        ttk.Button(frm, text="Anular resultado", command=anular_resultado).pack()
         ttk.Button(frm, text="Cerrar", command=win.destroy).pack()
 
 
@@ -341,13 +291,16 @@ class PhaseGroupsUI:
 
     # ============================ LLAVES DE ELIMINACIÓN ============================
     def mostrar_llaves(self):
-        """Muestra las llaves de eliminación (Octavos → Cuartos → Semis → Final)."""
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        bandera_path = os.path.join(os.path.dirname(BASE_DIR), "banderas")
+        """Muestra el cuadro del formato (fechas_fase_eliminatoria.xlsx en el Sub-20): Octavos → Cuartos → Semis → Final."""
+        try:
+            llaves = obtener_llaves(self.torneo)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"No se pudo leer el cuadro de eliminación: {e}")
+            return
 
         win = tk.Toplevel(self.master)
         win.title("Llaves de Eliminación")
-        win.geometry("1000x600")
+        win.geometry("1100x650")
         win.config(bg="#e8eef7")
         win.transient(self.master)
         win.focus_force()
@@ -358,46 +311,33 @@ class PhaseGroupsUI:
         ttk.Label(frm, text="COPA DEL MUNDO SUB-20 - LLAVES DE ELIMINACIÓN",
                   font=('Segoe UI', 13, 'bold')).pack(pady=(0, 10))
 
-        rondas = ["Octavos", "Cuartos", "Semifinal", "Final"]
         contenedor = ttk.Frame(frm)
         contenedor.pack(fill='both', expand=True)
 
-        columnas = []
-        for ronda in rondas:
+        # con la fase de grupos terminada los códigos de posición ya tienen nombre
+        terceros = llaves.terceros_de(self.torneo)
+        for ronda, nodos in llaves.por_fase().items():
             col = ttk.Frame(contenedor, padding=10)
             col.pack(side='left', expand=True, fill='both')
             ttk.Label(col, text=ronda, font=('Segoe UI', 11, 'bold')).pack(pady=(0, 5))
-            columnas.append(col)
-
-        octavos_pairs = [
-            ("1°A", "2°C"), ("1°B", "3°A/C/D"), ("1°C", "3°A/B/F"), ("2°A", "2°B"),
-            ("1°D", "3°B/E/F"), ("2°E", "1°F"), ("1°E", "2°D"), ("1°F", "2°E")
-        ]
-
-        grupos_completos = all(p.goles_e1 is not None and p.goles_e2 is not None
-                               for p in self.torneo.calendario.values()
-                               if p.fase == "Fase de Grupos")
-
-        for pair in octavos_pairs:
-            f = ttk.Frame(columnas[0], relief='ridge', borderwidth=2, padding=5)
-            f.pack(pady=8, fill='x')
-
-            if not grupos_completos:
-                ttk.Label(f, text=f"{pair[0]}  vs  {pair[1]}",
-                          font=('Segoe UI', 10, 'bold')).pack()
-            else:
-                pais1, pais2 = pair
-                for pais in (pais1, pais2):
-                    img_path = os.path.join(bandera_path, self._normalize_name(pais) + ".png")
-                    bandera_img = None
-                    if os.path.exists(img_path):
-                        bandera = Image.open(img_path).resize((26, 18))
-                        bandera_img = ImageTk.PhotoImage(bandera)
-                        self._flag_cache[pais] = bandera_img
-
-                fila = ttk.Frame(f)
-                fila.pack(pady=2)
-                ttk.Label(fila, text=f"{pais1}  vs  {pais2}", font=('Segoe UI', 10)).pack()
-
-        ttk.Label(frm, text="* Las llaves se completarán automáticamente al finalizar la Fase de Grupos.",
+            for n in nodos:
+                f = ttk.Frame(col, relief='ridge', borderwidth=2, padding=5)
+                f.pack(pady=8, fill='x')
+                ttk.Label(f, text=f"{n.codigo} · {n.fecha} {n.hora}", font=('Segoe UI', 8)).pack()
+                encontrado = self.torneo.partido_por_codigo(n.codigo)
+                if encontrado:
+                    p = encontrado[1]
+                    nombres = [self.torneo.equipos[i].pais if i in self.torneo.equipos else i
+                               for i in (p.id_equipo1, p.id_equipo2)]
+                    marcador = f"  {p.goles_e1} - {p.goles_e2}  " if p.jugado() else "  vs  "
+                    ttk.Label(f, text=nombres[0] + marcador + nombres[1], font=('Segoe UI', 10)).pack()
+                    continue
+                lados = []
+                for lado, cupo in enumerate(n.cupos):
+                    id_equipo = llaves.resolver_cupo(self.torneo, n.codigo, lado, terceros)
+                    lados.append(self.torneo.equipos[id_equipo].pais if id_equipo in self.torneo.equipos
+                                 else cupo.texto())
+                ttk.Label(f, text=f"{lados[0]}  vs  {lados[1]}", font=('Segoe UI', 10, 'bold')).pack()
+
+        ttk.Label(frm, text="* Las llaves se completan solas a medida que se cargan los resultados.",
                   font=('Segoe UI', 9, 'italic')).pack(pady=(10, 0))
\ No newline at end of file
@@ -0,0 +1,237 @@
+# planificador.py
+"""
+Planificador único de tareas periódicas y diferidas sobre la ventana raíz de Tk.
+
+En lugar de que cada ventana mantenga su propio bucle de `after` (el reloj del encabezado,
+el sondeo de tareas en segundo plano, el despacho de la API, las animaciones), todas las
+tareas con nombre viven en un heap y hay un solo `after` pendiente en la raíz, programado
+para el vencimiento más próximo.
+
+- Registrar de nuevo un nombre reemplaza la tarea anterior: no se acumulan callbacks.
+- Una tarea de una vez que se pide otra vez antes de correr se fusiona en una sola
+  ejecución (con la última función); `reiniciar=True` además posterga el vencimiento.
+- Una tarea periódica atrasada corre una sola vez y sigue desde ahí: no hay ráfagas para
+  recuperar los períodos perdidos (se cuentan como omitidos).
+- Con `widget=...` la tarea se da de baja sola cuando se destruye ese widget.
+- `estadisticas()` da, por tarea, ejecuciones y tiempos de corrida y de retraso.
+"""
+import time
+import itertools
+from heapq import heappush, heappop
+
+
+class _TareaProgramada:
+    __slots__ = ('nombre', 'fn', 'intervalo', 'alineado', 'widget', 'vencimiento', 'seq',
+                 'ejecuciones', 'total', 'maximo', 'ultimo', 'retraso_max', 'omitidas', 'errores')
+
+    def __init__(self, nombre, fn, intervalo, alineado, widget):
+        self.nombre = nombre
+        self.fn = fn
+        self.intervalo = intervalo          # segundos; None para las de una vez
+        self.alineado = alineado
+        self.widget = widget
+        self.vencimiento = 0.0
+        self.seq = 0
+        self.ejecuciones = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.ultimo = 0.0
+        self.retraso_max = 0.0
+        self.omitidas = 0
+        self.errores = 0
+
+
+class Planificador:
+    def __init__(self, root):
+        self.root = root
+        self._tareas = {}                    # nombre -> _TareaProgramada
+        self._heap = []                      # (vencimiento, seq, nombre); entradas viejas se descartan al salir
+        self._seq = itertools.count()
+        self._after = None
+        self._proximo = None                 # vencimiento para el que está programado el after
+        self._widgets = {}                   # ruta del widget -> nombres de tareas atadas a él
+        self.ticks = 0
+
+    # ============================ REGISTRO ============================
+    def cada(self, nombre, intervalo_ms, fn, widget=None, inmediato=False, alineado=False):
+        """
+        Corre fn() cada `intervalo_ms`. `inmediato` la corre ya una vez; `alineado` hace
+        coincidir los vencimientos con múltiplos del intervalo del reloj de pared (todos
+        los relojes de los encabezados cambian de segundo en la misma pasada).
+        """
+        tarea = _TareaProgramada(nombre, fn, intervalo_ms / 1000, alineado, widget)
+        previa = self._tareas.get(nombre)
+        if previa is not None:
+            self._copiar_estadisticas(previa, tarea)
+        ahora = time.monotonic()
+        self._registrar(tarea, self._siguiente(tarea, ahora))
+        if inmediato:
+            self._correr(tarea, ahora)
+        return nombre
+
+    def una_vez(self, nombre, demora_ms, fn, widget=None, reiniciar=False):
+        """Corre fn() una vez dentro de `demora_ms`, fusionándose con una pendiente del mismo nombre."""
+        ahora = time.monotonic()
+        previa = self._tareas.get(nombre)
+        if previa is not None and previa.intervalo is None and not reiniciar:
+            previa.fn = fn
+            if previa.widget is not widget:
+                previa.widget = widget
+                self._atar(previa)
+            return nombre
+        tarea = _TareaProgramada(nombre, fn, None, False, widget)
+        if previa is not None:
+            self._copiar_estadisticas(previa, tarea)
+        self._registrar(tarea, ahora + demora_ms / 1000)
+        return nombre
+
+    def cancelar(self, nombre):
+        tarea = self._tareas.pop(nombre, None)
+        if tarea is not None and tarea.widget is not None:
+            atadas = self._widgets.get(str(tarea.widget))
+            if atadas is not None:
+                atadas.discard(nombre)
+        return tarea is not None
+
+    def __contains__(self, nombre):
+        return nombre in self._tareas
+
+    def _registrar(self, tarea, vencimiento):
+        self.cancelar(tarea.nombre)
+        self._tareas[tarea.nombre] = tarea
+        self._encolar(tarea, vencimiento)
+        if tarea.widget is not None:
+            self._atar(tarea)
+        self._reprogramar()
+
+    def _encolar(self, tarea, vencimiento):
+        tarea.vencimiento = vencimiento
+        tarea.seq = next(self._seq)
+        heappush(self._heap, (vencimiento, tarea.seq, tarea.nombre))
+
+    def _atar(self, tarea):
+        """Un solo bind de <Destroy> por widget, para todas las tareas que dependen de él."""
+        ruta = str(tarea.widget)
+        atadas = self._widgets.get(ruta)
+        if atadas is None:
+            atadas = self._widgets[ruta] = set()
+            widget = tarea.widget
+
+            def _al_destruir(event):
+                if event.widget is widget:
+                    for nombre in list(self._widgets.pop(ruta, ())):
+                        t = self._tareas.get(nombre)
+                        if t is not None and t.widget is widget:
+                            self.cancelar(nombre)
+            widget.bind("<Destroy>", _al_destruir, add="+")
+        atadas.add(tarea.nombre)
+
+    @staticmethod
+    def _copiar_estadisticas(origen, destino):
+        for campo in ('ejecuciones', 'total', 'maximo', 'ultimo', 'retraso_max', 'omitidas', 'errores'):
+            setattr(destino, campo, getattr(origen, campo))
+
+    def _siguiente(self, tarea, ahora):
+        if tarea.alineado:
+            return ahora + tarea.intervalo - (time.time() % tarea.intervalo)
+        return ahora + tarea.intervalo
+
+    # ============================ EJECUCIÓN ============================
+    def _vigente(self, entrada):
+        tarea = self._tareas.get(entrada[2])
+        return tarea if tarea is not None and tarea.seq == entrada[1] else None
+
+    def _reprogramar(self):
+        while self._heap and self._vigente(self._heap[0]) is None:
+            heappop(self._heap)
+        if not self._heap:
+            if self._after is not None:
+                self.root.after_cancel(self._after)
+                self._after = self._proximo = None
+            return
+        vencimiento = self._heap[0][0]
+        if self._after is not None and self._proximo <= vencimiento:
+            return      # el after pendiente llega antes (o justo): él reprograma al correr
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+        ms = max(0, int((vencimiento - time.monotonic()) * 1000 + 0.999))
+        self._proximo = vencimiento
+        self._after = self.root.after(ms, self._tick)
+
+    def _tick(self):
+        self._after = self._proximo = None
+        self.ticks += 1
+        ahora = time.monotonic()
+        # lo que vence en el próximo milisegundo corre en esta misma pasada
+        while self._heap and self._heap[0][0] <= ahora + 0.001:
+            entrada = heappop(self._heap)
+            tarea = self._vigente(entrada)
+            if tarea is None:
+                continue
+            if tarea.widget is not None and not self._existe(tarea.widget):
+                self.cancelar(tarea.nombre)
+                continue
+            if tarea.intervalo is None:
+                self.cancelar(tarea.nombre)
+            self._correr(tarea, ahora)
+            if tarea.intervalo is not None and self._tareas.get(tarea.nombre) is tarea:
+                fin = time.monotonic()
+                siguiente = self._siguiente(tarea, fin) if tarea.alineado else entrada[0] + tarea.intervalo
+                if siguiente <= fin:
+                    tarea.omitidas += int((fin - siguiente) / tarea.intervalo) + 1
+                    siguiente = fin + tarea.intervalo
+                self._encolar(tarea, siguiente)
+        self._reprogramar()
+
+    def _correr(self, tarea, ahora):
+        tarea.retraso_max = max(tarea.retraso_max, ahora - tarea.vencimiento)
+        inicio = time.perf_counter()
+        try:
+            tarea.fn()
+        except Exception as ex:
+            # una tarea rota no debe cortar al resto
+            tarea.errores += 1
+            print(f"Error en la tarea programada '{tarea.nombre}': {ex}")
+        duracion = time.perf_counter() - inicio
+        tarea.ejecuciones += 1
+        tarea.total += duracion
+        tarea.ultimo = duracion
+        tarea.maximo = max(tarea.maximo, duracion)
+
+    @staticmethod
+    def _existe(widget):
+        try:
+            return bool(widget.winfo_exists())
+        except Exception:
+            return False
+
+    # ============================ ESTADÍSTICAS ============================
+    def estadisticas(self):
+        """{nombre: {...}} de las tareas registradas, con tiempos en milisegundos."""
+        salida = {}
+        for nombre, t in self._tareas.items():
+            salida[nombre] = {
+                'tipo': 'periodica' if t.intervalo is not None else 'una_vez',
+                'intervalo_ms': round(t.intervalo * 1000) if t.intervalo is not None else None,
+                'ejecuciones': t.ejecuciones,
+                'total_ms': t.total * 1000,
+                'promedio_ms': t.total * 1000 / t.ejecuciones if t.ejecuciones else 0.0,
+                'maximo_ms': t.maximo * 1000,
+                'ultimo_ms': t.ultimo * 1000,
+                'retraso_max_ms': t.retraso_max * 1000,
+                'omitidas': t.omitidas,
+                'errores': t.errores,
+            }
+        return salida
+
+
+_planificador = None
+
+
+def obtener_planificador(widget):
+    """Planificador único del proceso, sobre la ventana raíz de `widget`."""
+    global _planificador
+    root = widget._root()
+    if _planificador is None or _planificador.root is not root:
+        _planificador = Planificador(root)
+    return _planificador
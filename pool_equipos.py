@@ -0,0 +1,112 @@
+# pool_equipos.py
+"""
+Bolillero de equipos para la asignación de grupos: conjunto ordenado (se conserva el orden
+de la planilla) con búsqueda por prefijo de palabra y por trigramas, y filtro por
+confederación.
+
+- Prefijo: lista ordenada de (palabra normalizada, país) y bisect; "nue" encuentra
+  "Nueva Zelanda" y "Nueva Caledonia", "cal" encuentra "Nueva Caledonia".
+- Subcadena: con 3 o más letras se intersectan los conjuntos de países de cada trigrama
+  de la consulta y solo se verifica el puñado de candidatos que queda.
+La búsqueda ignora mayúsculas y tildes ("japon" → "Japón").
+"""
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional
+
+
+def normalizar(texto):
+    texto = ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn')
+    return texto.casefold().strip()
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class PoolEquipos:
+    def __init__(self, equipos=()):
+        """`equipos`: nombres o pares (país, confederación); los repetidos se ignoran."""
+        self._orden: Dict[str, int] = {}             # país -> posición original (todos, disponibles o no)
+        self._confederacion: Dict[str, str] = {}
+        self._disponibles = set()
+        self._normalizado: Dict[str, str] = {}
+        self._palabras: List[tuple] = []             # [(palabra normalizada, país)] ordenada
+        self._trigramas: Dict[str, set] = {}
+        for e in equipos:
+            pais, conf = (e, "") if isinstance(e, str) else (e[0], e[1] or "")
+            self.agregar(pais, conf)
+
+    # ============================ CONJUNTO ============================
+    def agregar(self, pais, confederacion=""):
+        pais = str(pais).strip()
+        if not pais or pais in self._orden:
+            return False
+        self._orden[pais] = len(self._orden)
+        self._confederacion[pais] = confederacion
+        self._disponibles.add(pais)
+        norm = self._normalizado[pais] = normalizar(pais)
+        for palabra in norm.split():
+            insort(self._palabras, (palabra, pais))
+        for t in trigramas(norm):
+            self._trigramas.setdefault(t, set()).add(pais)
+        return True
+
+    def quitar(self, pais):
+        """Lo saca del bolillero (queda indexado para poder devolverlo). Devuelve si estaba."""
+        if pais not in self._disponibles:
+            return False
+        self._disponibles.discard(pais)
+        return True
+
+    def devolver(self, pais):
+        if pais in self._orden:
+            self._disponibles.add(pais)
+
+    def __contains__(self, pais):
+        return pais in self._disponibles
+
+    def __len__(self):
+        return len(self._disponibles)
+
+    def __iter__(self):
+        return iter(self.ordenados(self._disponibles))
+
+    def posicion(self, pais):
+        """Posición en el orden original (para ubicarlo en una lista visible con bisect)."""
+        return self._orden[pais]
+
+    def confederacion(self, pais):
+        return self._confederacion.get(pais, "")
+
+    def confederaciones(self):
+        return sorted({c for c in self._confederacion.values() if c})
+
+    def ordenados(self, paises):
+        return sorted(paises, key=self._orden.__getitem__)
+
+    # ============================ BÚSQUEDA ============================
+    def candidatos(self, texto):
+        """Países (disponibles o no) cuyo nombre contiene `texto` o tiene una palabra que empieza así."""
+        consulta = normalizar(texto)
+        if not consulta:
+            return set(self._orden)
+        # prefijo de alguna palabra
+        encontrados = set()
+        i = bisect_left(self._palabras, (consulta, ""))
+        while i < len(self._palabras) and self._palabras[i][0].startswith(consulta):
+            encontrados.add(self._palabras[i][1])
+            i += 1
+        # subcadena en cualquier posición, vía trigramas
+        if len(consulta) >= 3:
+            conjuntos = sorted((self._trigramas.get(t, set()) for t in trigramas(consulta)), key=len)
+            posibles = set(conjuntos[0]).intersection(*conjuntos[1:]) if conjuntos else set()
+            encontrados |= {p for p in posibles if consulta in self._normalizado[p]}
+        return encontrados
+
+    def buscar(self, texto="", confederacion: Optional[str] = None):
+        """Disponibles que coinciden con el texto y la confederación, en el orden original."""
+        coincidencias = self.candidatos(texto) & self._disponibles
+        if confederacion:
+            coincidencias = {p for p in coincidencias if self._confederacion.get(p) == confederacion}
+        return self.ordenados(coincidencias)
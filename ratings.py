@@ -0,0 +1,207 @@
+# ratings.py
+"""
+Ratings de fuerza de los equipos (Elo y variante por diferencia de goles).
+
+El historial se procesa en orden cronológico (fecha, hora). Como un partido solo depende de
+los ratings de sus dos equipos, los partidos se agrupan en "niveles": cada nivel contiene
+partidos cuyos equipos ya jugaron todos sus partidos anteriores en niveles previos. Cada
+nivel se actualiza de una vez con numpy y el resultado es idéntico al Elo partido a partido.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from eventos import ResultadoRegistrado
+
+METODOS = ('elo', 'goles')
+
+
+@dataclass(frozen=True)
+class PartidoRating:
+    fecha: str
+    hora: str
+    equipo1: str
+    equipo2: str
+    goles1: int
+    goles2: int
+
+
+def partidos_de_torneo(torneo, clave=None):
+    """
+    Partidos jugados de un Torneo como PartidoRating. `clave(equipo)` define cómo se identifica
+    a cada selección (por defecto el país, para poder encadenar varios torneos).
+    Una definición por penales cuenta como empate, igual que en el Elo de selecciones.
+    """
+    clave = clave or (lambda e: e.pais)
+    partidos = []
+    for p in torneo.calendario.values():
+        if not p.jugado():
+            continue
+        e1, e2 = torneo.equipos.get(p.id_equipo1), torneo.equipos.get(p.id_equipo2)
+        if e1 is None or e2 is None:
+            continue
+        partidos.append(PartidoRating(p.fecha, p.hora, clave(e1), clave(e2), p.goles_e1, p.goles_e2))
+    return partidos
+
+
+def _orden_cronologico(partidos):
+    # los partidos sin fecha (cargados a mano en la UI) quedan al final, en su orden de carga
+    return sorted(partidos, key=lambda p: (p.fecha or '9999-12-31', p.hora or '99:99'))
+
+
+class MotorRatings:
+    """
+    metodo='elo'   K fijo.
+    metodo='goles' K multiplicado por la diferencia de gol (1, 1.5, (11+N)/8), como el World Football Elo.
+    `empate` es el parámetro del modelo de Davidson para las probabilidades de empate.
+    """
+    def __init__(self, metodo='elo', k=40.0, inicial=1500.0, escala=400.0, empate=0.75, base=None):
+        if metodo not in METODOS:
+            raise ValueError(f"Método de rating desconocido: {metodo}")
+        self.metodo = metodo
+        self.k = k
+        self.inicial = inicial
+        self.escala = escala
+        self.empate = empate
+        self.base: Dict[str, float] = dict(base or {})
+        self._indice: Dict[str, int] = {}
+        self._valores = np.empty(0)
+        self._jugados: List[PartidoRating] = []
+        self._token = None
+
+    # ============================ CÁLCULO ============================
+    def _indices(self, equipos):
+        for e in equipos:
+            if e not in self._indice:
+                self._indice[e] = len(self._indice)
+        faltan = len(self._indice) - len(self._valores)
+        if faltan > 0:
+            nuevos = [self.base.get(e, self.inicial) for e in list(self._indice)[len(self._valores):]]
+            self._valores = np.concatenate([self._valores, np.asarray(nuevos, dtype=float)])
+        return np.fromiter((self._indice[e] for e in equipos), dtype=np.intp, count=len(equipos))
+
+    def _multiplicador(self, dif):
+        if self.metodo == 'elo':
+            return np.ones_like(dif, dtype=float)
+        n = np.abs(dif).astype(float)
+        return np.where(n <= 1, 1.0, np.where(n == 2, 1.5, (11.0 + n) / 8.0))
+
+    def _actualizar(self, i, j, g1, g2):
+        r = self._valores
+        esperado = 1.0 / (1.0 + 10.0 ** ((r[j] - r[i]) / self.escala))
+        real = np.where(g1 > g2, 1.0, np.where(g1 == g2, 0.5, 0.0))
+        delta = self.k * self._multiplicador(g1 - g2) * (real - esperado)
+        # dentro de un nivel ningún equipo se repite, pero add.at es seguro igual
+        np.add.at(r, i, delta)
+        np.add.at(r, j, -delta)
+
+    def calcular(self, partidos: Iterable[PartidoRating]):
+        """Recalcula todo desde los ratings base sobre el historial completo (uno o varios torneos)."""
+        partidos = _orden_cronologico(partidos)
+        self._indice = {}
+        self._valores = np.empty(0)
+        self._jugados = partidos
+        if not partidos:
+            return self.ratings()
+        i = self._indices([p.equipo1 for p in partidos])
+        j = self._indices([p.equipo2 for p in partidos])
+        g1 = np.fromiter((p.goles1 for p in partidos), dtype=float, count=len(partidos))
+        g2 = np.fromiter((p.goles2 for p in partidos), dtype=float, count=len(partidos))
+
+        # nivel de cada partido = 1 + último nivel jugado por cualquiera de sus dos equipos
+        ultimo = np.zeros(len(self._indice), dtype=np.intp)
+        nivel = np.empty(len(partidos), dtype=np.intp)
+        for m, (a, b) in enumerate(zip(i.tolist(), j.tolist())):
+            n = max(ultimo[a], ultimo[b]) + 1
+            nivel[m] = ultimo[a] = ultimo[b] = n
+        orden = np.argsort(nivel, kind='stable')
+        cortes = np.flatnonzero(np.diff(nivel[orden])) + 1
+        for grupo in np.split(orden, cortes):
+            self._actualizar(i[grupo], j[grupo], g1[grupo], g2[grupo])
+        return self.ratings()
+
+    def aplicar(self, partido: PartidoRating):
+        """Actualización incremental con un resultado nuevo (posterior a todo lo ya procesado)."""
+        i = self._indices([partido.equipo1])
+        j = self._indices([partido.equipo2])
+        self._actualizar(i, j, np.array([partido.goles1], dtype=float), np.array([partido.goles2], dtype=float))
+        self._jugados.append(partido)
+
+    # ============================ CONSULTAS ============================
+    def rating(self, equipo):
+        idx = self._indice.get(equipo)
+        return float(self._valores[idx]) if idx is not None else self.base.get(equipo, self.inicial)
+
+    def ratings(self):
+        return {e: float(self._valores[idx]) for e, idx in self._indice.items()}
+
+    def ranking(self):
+        return sorted(self.ratings().items(), key=lambda x: x[1], reverse=True)
+
+    def _vector(self, equipos):
+        return np.fromiter((self.rating(e) for e in equipos), dtype=float, count=len(equipos))
+
+    def esperado(self, equipo1, equipo2):
+        """Puntaje esperado de equipo1 (1 = victoria, 0.5 = empate)."""
+        return float(1.0 / (1.0 + 10.0 ** ((self.rating(equipo2) - self.rating(equipo1)) / self.escala)))
+
+    def probabilidades_vector(self, equipos1, equipos2):
+        """Arrays (victoria, empate, derrota) del equipo1 para muchos cruces a la vez (modelo de Davidson)."""
+        pa = 10.0 ** (self._vector(equipos1) / self.escala)
+        pb = 10.0 ** (self._vector(equipos2) / self.escala)
+        d = self.empate * np.sqrt(pa * pb)
+        total = pa + pb + d
+        return pa / total, d / total, pb / total
+
+    def probabilidades(self, equipo1, equipo2):
+        v, e, d = self.probabilidades_vector([equipo1], [equipo2])
+        return float(v[0]), float(e[0]), float(d[0])
+
+    def pronosticos(self, torneo, clave=None, solo_pendientes=True):
+        """{match_id: {'esperado', 'victoria', 'empate', 'derrota'}} para los partidos del calendario."""
+        clave = clave or (lambda e: e.pais)
+        mids, a, b = [], [], []
+        for mid, p in torneo.calendario.items():
+            if solo_pendientes and p.jugado():
+                continue
+            e1, e2 = torneo.equipos.get(p.id_equipo1), torneo.equipos.get(p.id_equipo2)
+            if e1 is None or e2 is None:
+                continue
+            mids.append(mid)
+            a.append(clave(e1))
+            b.append(clave(e2))
+        if not mids:
+            return {}
+        v, e, d = self.probabilidades_vector(a, b)
+        esp = 1.0 / (1.0 + 10.0 ** ((self._vector(b) - self._vector(a)) / self.escala))
+        return {mid: {'esperado': float(esp[n]), 'victoria': float(v[n]), 'empate': float(e[n]), 'derrota': float(d[n])}
+                for n, mid in enumerate(mids)}
+
+    # ============================ INCREMENTAL ============================
+    def conectar(self, torneo, clave=None, historial: Optional[Iterable[PartidoRating]] = None):
+        """
+        Calcula sobre `historial` + los partidos del torneo y se mantiene al día con los eventos.
+        Un resultado nuevo posterior a lo ya procesado se aplica incrementalmente; una corrección,
+        anulación o resultado cargado fuera de orden recalcula todo (es una pasada vectorizada).
+        """
+        clave = clave or (lambda e: e.pais)
+        previos = list(historial or [])
+        self.calcular(previos + partidos_de_torneo(torneo, clave))
+
+        def _al_cambiar(evento):
+            p = evento.partido
+            ultimo = self._jugados[-1] if self._jugados else None
+            if evento.accion == 'registro' and p.fecha and (
+                    ultimo is None or (ultimo.fecha and (p.fecha, p.hora) >= (ultimo.fecha, ultimo.hora))):
+                e1, e2 = torneo.equipos[p.id_equipo1], torneo.equipos[p.id_equipo2]
+                self.aplicar(PartidoRating(p.fecha, p.hora, clave(e1), clave(e2), p.goles_e1, p.goles_e2))
+            else:
+                self.calcular(previos + partidos_de_torneo(torneo, clave))
+
+        self.desconectar(torneo)
+        self._token = torneo.eventos.suscribir(_al_cambiar, ResultadoRegistrado)
+        return self._token
+
+    def desconectar(self, torneo):
+        if self._token is not None:
+            torneo.eventos.desuscribir(self._token)
+            self._token = None
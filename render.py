@@ -0,0 +1,429 @@
+# render.py
+"""
+Render sin pantalla (sin Tk) de la llave de eliminación y de las tablas de posiciones, en
+SVG y en PNG (PIL), con caché en disco.
+
+- Cada vista ('llave', 'posiciones', 'grupo-A', ...) se arma primero como una Escena de
+  primitivas (rectángulos, textos, líneas, banderas) y recién después se escribe como SVG
+  o se dibuja con ImageDraw: el mismo layout sirve para los dos formatos.
+- Cada vista guarda la versión del torneo en que cambió por última vez: un resultado de
+  grupo toca su grupo y 'posiciones'; uno de eliminación (o un cruce actualizado) toca la
+  'llave'. Entre resultados, pedir una vista es leer su archivo.
+- El nombre del archivo lleva además una huella del contenido de la escena, porque
+  Torneo.version vuelve a 0 en cada proceso: después de reiniciar se reutilizan los
+  archivos que ya están en disco si la vista no cambió.
+
+    python render.py --datos torneo_data.json --salida render/ --formato png llave grupo-A
+"""
+import os
+import io
+import sys
+import base64
+import hashlib
+import argparse
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from eventos import ResultadoRegistrado, PartidoAgregado, CruceActualizado
+from persistencia import escribir_atomico
+from metricas import medir
+from utils import ruta_bandera
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO = os.path.join(SCRIPT_DIR, "render")
+FORMATOS = {'svg': 'image/svg+xml', 'png': 'image/png'}
+VERSION_RENDER = 1          # subirla al cambiar el diseño: invalida los archivos ya generados
+FASE_GRUPOS = "Fase de Grupos"
+FASES_LLAVE = ('Dieciseisavos', 'Octavos', 'Cuartos', 'Semifinal', 'Final')
+TERCER_PUESTO = 'Tercer puesto'
+
+# colores de las ventanas de Tk (elimination_bracket.py y ventana_posiciones.py)
+FONDO_LLAVE = "#0e1621"
+FILA_LLAVE = "#1b2836"
+MARCADOR = "#007bff"
+PERDEDOR = "#8a99a8"
+ENCABEZADO = "#003366"
+FILA_PAR = "#F2F6FB"
+SEPARADOR = "#D0D7E2"
+
+# tabla de posiciones: (columna, ancho)
+COLUMNAS_TABLA = (('Pos', 40), ('Equipo', 230), ('PJ', 40), ('G', 40), ('E', 40), ('P', 40),
+                  ('GF', 40), ('GC', 40), ('DG', 40), ('Pts', 44))
+ALTO_FILA = 30
+ALTO_TITULO = 36
+
+# llave
+ANCHO_PARTIDO = 230
+ALTO_LADO = 28
+SEPARACION_COLUMNAS = 50
+ALTO_CUPO = 80              # alto por partido en la primera ronda
+
+
+# ============================ ESCENA ============================
+class Escena:
+    """Lista de primitivas en coordenadas de píxel; el texto se ubica por su centro vertical."""
+    def __init__(self, ancho, alto, fondo="#FFFFFF"):
+        self.ancho = ancho
+        self.alto = alto
+        self.fondo = fondo
+        self.elementos = []
+
+    def rect(self, x, y, ancho, alto, relleno, borde=None):
+        self.elementos.append(('rect', x, y, ancho, alto, relleno, borde))
+
+    def texto(self, x, y, texto, color="#000000", tam=12, negrita=False, ancla='start'):
+        """ancla: 'start' | 'middle' | 'end' (como text-anchor de SVG)."""
+        self.elementos.append(('texto', x, y, str(texto), color, tam, negrita, ancla))
+
+    def linea(self, x1, y1, x2, y2, color, grosor=1):
+        self.elementos.append(('linea', x1, y1, x2, y2, color, grosor))
+
+    def bandera(self, x, y, ancho, alto, pais):
+        if ruta_bandera(pais):
+            self.elementos.append(('bandera', x, y, ancho, alto, pais))
+
+    def incluir(self, otra, dx, dy):
+        """Copia los elementos de otra escena desplazados (dx, dy)."""
+        for e in otra.elementos:
+            if e[0] == 'linea':
+                self.elementos.append((e[0], e[1] + dx, e[2] + dy, e[3] + dx, e[4] + dy) + e[5:])
+            else:
+                self.elementos.append((e[0], e[1] + dx, e[2] + dy) + e[3:])
+
+    def huella(self):
+        contenido = repr((VERSION_RENDER, self.ancho, self.alto, self.fondo, self.elementos))
+        return hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:16]
+
+
+# ============================ SVG ============================
+@lru_cache(maxsize=None)
+def _bandera_base64(pais):
+    with open(ruta_bandera(pais), 'rb') as f:
+        return base64.b64encode(f.read()).decode('ascii')
+
+
+def a_svg(escena):
+    partes = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{escena.ancho}" height="{escena.alto}" '
+              f'viewBox="0 0 {escena.ancho} {escena.alto}" font-family="Arial, Helvetica, sans-serif">',
+              f'<rect width="100%" height="100%" fill="{escena.fondo}"/>']
+    for e in escena.elementos:
+        tipo = e[0]
+        if tipo == 'rect':
+            _, x, y, w, h, relleno, borde = e
+            trazo = f' stroke="{borde}"' if borde else ''
+            partes.append(f'<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{relleno}"{trazo}/>')
+        elif tipo == 'texto':
+            _, x, y, texto, color, tam, negrita, ancla = e
+            peso = ' font-weight="bold"' if negrita else ''
+            partes.append(f'<text x="{x}" y="{y}" fill="{color}" font-size="{tam}"{peso} text-anchor="{ancla}" '
+                          f'dominant-baseline="central">{escape(texto)}</text>')
+        elif tipo == 'linea':
+            _, x1, y1, x2, y2, color, grosor = e
+            partes.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}" stroke-width="{grosor}"/>')
+        elif tipo == 'bandera':
+            _, x, y, w, h, pais = e
+            partes.append(f'<image x="{x}" y="{y}" width="{w}" height="{h}" preserveAspectRatio="none" '
+                          f'href="data:image/png;base64,{_bandera_base64(pais)}"><title>{escape(pais)}</title></image>')
+    partes.append('</svg>')
+    return "\n".join(partes).encode('utf-8')
+
+
+# ============================ PNG ============================
+@lru_cache(maxsize=None)
+def _fuente(tam, negrita):
+    from PIL import ImageFont
+    nombres = ('DejaVuSans-Bold.ttf', 'arialbd.ttf') if negrita else ('DejaVuSans.ttf', 'arial.ttf')
+    for nombre in nombres:
+        try:
+            return ImageFont.truetype(nombre, tam)
+        except OSError:
+            pass
+    try:
+        return ImageFont.load_default(tam)
+    except TypeError:       # Pillow < 10.1: fuente de mapa de bits de tamaño fijo
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=256)
+def _bandera_png(pais, ancho, alto):
+    from PIL import Image
+    with medir("banderas"):
+        return Image.open(ruta_bandera(pais)).convert('RGBA').resize((ancho, alto))
+
+
+ANCLAS_PIL = {'start': 'lm', 'middle': 'mm', 'end': 'rm'}
+
+
+def a_png(escena):
+    from PIL import Image, ImageDraw
+    imagen = Image.new('RGB', (escena.ancho, escena.alto), escena.fondo)
+    draw = ImageDraw.Draw(imagen)
+    for e in escena.elementos:
+        tipo = e[0]
+        if tipo == 'rect':
+            _, x, y, w, h, relleno, borde = e
+            draw.rectangle([x, y, x + w - 1, y + h - 1], fill=relleno, outline=borde)
+        elif tipo == 'texto':
+            _, x, y, texto, color, tam, negrita, ancla = e
+            draw.text((x, y), texto, fill=color, font=_fuente(tam, negrita), anchor=ANCLAS_PIL[ancla])
+        elif tipo == 'linea':
+            _, x1, y1, x2, y2, color, grosor = e
+            draw.line([(x1, y1), (x2, y2)], fill=color, width=grosor)
+        elif tipo == 'bandera':
+            _, x, y, w, h, pais = e
+            bandera = _bandera_png(pais, w, h)
+            imagen.paste(bandera, (x, y), bandera)
+    salida = io.BytesIO()
+    imagen.save(salida, format='PNG', optimize=True)
+    return salida.getvalue()
+
+
+# ============================ VISTAS ============================
+def escena_grupo(torneo, grupo):
+    ancho = sum(w for _, w in COLUMNAS_TABLA)
+    tabla = torneo.calcular_tabla_posiciones(grupo)
+    escena = Escena(ancho, ALTO_TITULO + ALTO_FILA * (len(tabla) + 1))
+    escena.texto(8, ALTO_TITULO // 2, f"Grupo {grupo}", ENCABEZADO, tam=15, negrita=True)
+    y = ALTO_TITULO
+    escena.rect(0, y, ancho, ALTO_FILA, ENCABEZADO)
+    x = 0
+    for columna, w in COLUMNAS_TABLA:
+        escena.texto(x + w // 2, y + ALTO_FILA // 2, columna, "#FFFFFF", negrita=True, ancla='middle')
+        x += w
+    for pos, e in enumerate(tabla, start=1):
+        y += ALTO_FILA
+        if pos % 2 == 0:
+            escena.rect(0, y, ancho, ALTO_FILA, FILA_PAR)
+        escena.linea(0, y + ALTO_FILA - 1, ancho, y + ALTO_FILA - 1, SEPARADOR)
+        valores = [pos, e.pais] + [e.stats.get(c, 0) for c, _ in COLUMNAS_TABLA[2:]]
+        x = 0
+        for (columna, w), valor in zip(COLUMNAS_TABLA, valores):
+            centro = y + ALTO_FILA // 2
+            if columna == 'Equipo':
+                escena.bandera(x + 4, centro - 9, 26, 18, e.pais)
+                escena.texto(x + 38, centro, valor)
+            else:
+                escena.texto(x + w // 2, centro, valor, negrita=columna == 'Pts', ancla='middle')
+            x += w
+    return escena
+
+
+def escena_posiciones(torneo, por_fila=2, margen=20):
+    grupos = [escena_grupo(torneo, g) for g in sorted(torneo.grupos)]
+    if not grupos:
+        return Escena(400, 60)
+    ancho_g = max(g.ancho for g in grupos)
+    alto_g = max(g.alto for g in grupos)
+    filas = (len(grupos) + por_fila - 1) // por_fila
+    escena = Escena(margen + min(por_fila, len(grupos)) * (ancho_g + margen), margen + filas * (alto_g + margen))
+    for i, g in enumerate(grupos):
+        escena.incluir(g, margen + (i % por_fila) * (ancho_g + margen), margen + (i // por_fila) * (alto_g + margen))
+    return escena
+
+
+def _columnas_llave(torneo, llaves):
+    """
+    ([(fase, [(nodo, partido)])] de la primera ronda a la final, [(nodo, partido)] del tercer
+    puesto). Con el cuadro oficial cada partido queda junto al que comparte su cruce
+    siguiente; sin cuadro se ordena por código.
+    """
+    por_codigo = {p.codigo: p for p in torneo.calendario.values() if p.codigo and p.fase != FASE_GRUPOS}
+    if llaves:
+        nodos = llaves.nodos
+        columna = [c for c, n in nodos.items() if n.fase == 'Final']
+        codigos = []
+        while columna:
+            codigos.insert(0, columna)
+            columna = [c.partido for codigo in columna for c in nodos[codigo].cupos if c.tipo == 'ganador']
+        columnas = [(nodos[col[0]].fase, [(nodos[c], por_codigo.get(c)) for c in col]) for col in codigos]
+        tercero = [(n, por_codigo.get(c)) for c, n in nodos.items() if n.fase == TERCER_PUESTO]
+        return columnas, tercero
+
+    def _orden(item):
+        mid, p = item
+        numero = ''.join(ch for ch in p.codigo if ch.isdigit())
+        return (int(numero) if numero else 10 ** 6, mid)
+    por_fase = {}
+    for mid, p in sorted(torneo.calendario.items(), key=_orden):
+        if p.fase != FASE_GRUPOS:
+            por_fase.setdefault(p.fase, []).append((None, p))
+    columnas = [(f, por_fase[f]) for f in FASES_LLAVE if f in por_fase]
+    return columnas, por_fase.get(TERCER_PUESTO, [])
+
+
+def _dibujar_partido(escena, torneo, x, y, nodo, partido):
+    """Caja de dos filas con (x, y) en la esquina superior izquierda."""
+    ganador = partido.ganador() if partido is not None else None
+    for lado in (0, 1):
+        fila_y = y + lado * ALTO_LADO
+        centro = fila_y + ALTO_LADO // 2
+        escena.rect(x, fila_y, ANCHO_PARTIDO, ALTO_LADO - 2, FILA_LLAVE)
+        id_equipo = (partido.id_equipo1, partido.id_equipo2)[lado] if partido is not None else ""
+        e = torneo.equipos.get(id_equipo)
+        if e is not None:
+            nombre = e.pais
+            escena.bandera(x + 6, centro - 9, 26, 16, e.pais)
+        else:
+            nombre = nodo.cupos[lado].texto() if nodo is not None else (id_equipo or "Por definir")
+        color = PERDEDOR if ganador and ganador != id_equipo else "#FFFFFF"
+        escena.texto(x + 38, centro - 1, nombre, color, negrita=ganador == id_equipo)
+        if partido is not None and partido.jugado():
+            goles = (partido.goles_e1, partido.goles_e2)[lado]
+            if partido.penales:
+                goles = f"{goles} ({partido.penales.get(('p1', 'p2')[lado], 0)})"
+            escena.rect(x + ANCHO_PARTIDO - 56, fila_y + 3, 52, ALTO_LADO - 8, MARCADOR)
+            escena.texto(x + ANCHO_PARTIDO - 30, centro - 1, goles, "#FFFFFF", negrita=True, ancla='middle')
+
+
+def escena_llave(torneo, llaves=None, margen=20, alto_titulo=50):
+    columnas, tercero = _columnas_llave(torneo, llaves)
+    if not columnas:
+        escena = Escena(400, 60, FONDO_LLAVE)
+        escena.texto(200, 30, "Sin partidos de eliminación", "#FFFFFF", ancla='middle')
+        return escena
+    alto_partido = 2 * ALTO_LADO
+    primera = max(len(partidos) for _, partidos in columnas)
+    alto_cuadro = primera * ALTO_CUPO
+    extra = (alto_titulo + alto_partido + margen) if tercero else 0
+    escena = Escena(margen * 2 + len(columnas) * ANCHO_PARTIDO + (len(columnas) - 1) * SEPARACION_COLUMNAS,
+                    alto_titulo + alto_cuadro + extra + margen, FONDO_LLAVE)
+    centros_previos = []
+    for i, (fase, partidos) in enumerate(columnas):
+        x = margen + i * (ANCHO_PARTIDO + SEPARACION_COLUMNAS)
+        escena.texto(x + ANCHO_PARTIDO // 2, alto_titulo // 2, fase, "#FFFFFF", tam=14, negrita=True, ancla='middle')
+        cupo = alto_cuadro / len(partidos)
+        centros = []
+        for j, (nodo, partido) in enumerate(partidos):
+            centro = alto_titulo + int((j + 0.5) * cupo)
+            _dibujar_partido(escena, torneo, x, centro - ALTO_LADO, nodo, partido)
+            centros.append(centro)
+            # conectores desde los dos partidos que alimentan a este
+            medio = x - SEPARACION_COLUMNAS // 2
+            for previo in centros_previos[2 * j:2 * j + 2]:
+                escena.linea(x - SEPARACION_COLUMNAS, previo, medio, previo, "#FFFFFF")
+                escena.linea(medio, previo, medio, centro, "#FFFFFF")
+            if centros_previos:
+                escena.linea(medio, centro, x, centro, "#FFFFFF")
+        centros_previos = centros
+    if tercero:
+        x = margen + (len(columnas) - 1) * (ANCHO_PARTIDO + SEPARACION_COLUMNAS)
+        y = alto_titulo + alto_cuadro
+        escena.texto(x + ANCHO_PARTIDO // 2, y + alto_titulo // 2, TERCER_PUESTO, "#FFFFFF", tam=14, negrita=True, ancla='middle')
+        for nodo, partido in tercero[:1]:
+            _dibujar_partido(escena, torneo, x, y + alto_titulo, nodo, partido)
+    return escena
+
+
+# ============================ CACHÉ ============================
+class RenderizadorTorneo:
+    def __init__(self, torneo, directorio=DIRECTORIO, llaves=None):
+        self.torneo = torneo
+        self.directorio = directorio
+        self._llaves = llaves
+        self._versiones = {}     # vista -> versión del torneo en que cambió por última vez
+        self._archivos = {}      # (vista, formato) -> (versión, ruta)
+        self._token = None
+
+    def conectar(self):
+        if self._token is None:
+            self._archivos = {}
+            self._token = self.torneo.eventos.suscribir(
+                self._al_evento, (ResultadoRegistrado, PartidoAgregado, CruceActualizado))
+
+    def desconectar(self):
+        if self._token is not None:
+            self.torneo.eventos.desuscribir(self._token)
+            self._token = None
+
+    def invalidar(self):
+        """Para después de recargar el torneo entero (no publica eventos por partido)."""
+        self._archivos = {}
+
+    def _al_evento(self, evento):
+        for vista in self.vistas_afectadas(evento.partido):
+            self._versiones[vista] = evento.version
+
+    def vistas_afectadas(self, p):
+        if p is None:
+            return self.vistas()
+        if p.fase != FASE_GRUPOS:
+            return ['llave']
+        e = self.torneo.equipos.get(p.id_equipo1)
+        grupo = p.grupo or (e.grupo if e else "")
+        return ['posiciones', f"grupo-{grupo}"] if grupo else ['posiciones']
+
+    def vistas(self):
+        return ['llave', 'posiciones'] + [f"grupo-{g}" for g in sorted(self.torneo.grupos)]
+
+    def version(self, vista):
+        if self._token is None:
+            return self.torneo.version      # sin eventos no se sabe qué vista cambió
+        return self._versiones.get(vista, 0)
+
+    def _cuadro(self):
+        if self._llaves is None:
+            from llaves import cargar_llaves
+            try:
+                self._llaves = cargar_llaves(self.torneo.formato)
+            except Exception as ex:
+                print(f"Render de la llave sin cuadro oficial: {ex}")
+                self._llaves = False
+        return self._llaves
+
+    def escena(self, vista):
+        if vista == 'llave':
+            return escena_llave(self.torneo, self._cuadro())
+        if vista == 'posiciones':
+            return escena_posiciones(self.torneo)
+        if vista.startswith('grupo-') and vista[6:] in self.torneo.grupos:
+            return escena_grupo(self.torneo, vista[6:])
+        raise ValueError(f"Vista desconocida: {vista}")
+
+    def obtener(self, vista, formato='svg'):
+        """Ruta del archivo de la vista; solo se vuelve a dibujar si la vista cambió."""
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato}")
+        version = self.version(vista)
+        cacheado = self._archivos.get((vista, formato))
+        if cacheado and cacheado[0] == version and os.path.exists(cacheado[1]):
+            return cacheado[1]
+        escena = self.escena(vista)
+        ruta = os.path.join(self.directorio, f"{vista}-{escena.huella()}.{formato}")
+        if not os.path.exists(ruta):
+            with medir("render"):
+                datos = a_svg(escena) if formato == 'svg' else a_png(escena)
+            os.makedirs(self.directorio, exist_ok=True)
+            escribir_atomico(ruta, datos)
+        if cacheado and cacheado[1] != ruta:
+            try:
+                os.remove(cacheado[1])
+            except OSError:
+                pass
+        self._archivos[(vista, formato)] = (version, ruta)
+        return ruta
+
+    def leer(self, vista, formato='svg'):
+        with open(self.obtener(vista, formato), 'rb') as f:
+            return f.read()
+
+
+# ============================ LÍNEA DE COMANDOS ============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta la llave y las tablas del torneo como SVG/PNG.")
+    parser.add_argument('--datos', default=os.path.join(SCRIPT_DIR, 'torneo_data.json'), help="torneo_data.json")
+    parser.add_argument('--salida', default=DIRECTORIO)
+    parser.add_argument('--formato', choices=sorted(FORMATOS), action='append',
+                        help="svg o png; se puede repetir (por defecto, los dos)")
+    parser.add_argument('vistas', nargs='*', help="llave, posiciones o grupo-X (por defecto, todas)")
+    args = parser.parse_args(argv)
+
+    from core import Torneo, modo_sin_interfaz
+    modo_sin_interfaz()
+    renderizador = RenderizadorTorneo(Torneo(archivo=args.datos), args.salida)
+    for vista in args.vistas or renderizador.vistas():
+        for formato in args.formato or sorted(FORMATOS):
+            print(renderizador.obtener(vista, formato))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
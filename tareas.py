@@ -0,0 +1,224 @@
+# tareas.py
+"""
+Tareas en segundo plano para las pantallas de Tk (lectura y exportación de Excel).
+
+- Las funciones corren en un ThreadPoolExecutor y reciben la Tarea como primer argumento
+  para informar avance (`tarea.avance(0.5, "Leyendo partidos...")`) y para cortar entre
+  pasos si el usuario canceló (`tarea.comprobar()`).
+- Avance, resultado y errores vuelven al hilo de Tk por una queue.Queue que se vacía con
+  una tarea periódica del planificador, igual que api.DespachoTk; los callbacks siempre
+  corren en el hilo de Tk.
+- Dos tareas que escriben el mismo archivo no se pisan: cada ruta tiene su lock y la
+  segunda espera a que termine la primera.
+- Si la tarea tarda más de `demora_dialogo_ms` aparece una ventanita con barra de avance
+  y botón Cancelar. Una lectura de openpyxl no se puede interrumpir a la mitad: cancelar
+  descarta su resultado, y en una exportación evita reemplazar el archivo destino.
+"""
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from tkinter import ttk
+from metricas import escribir_excel
+from persistencia import modo_destino
+from planificador import obtener_planificador
+
+
+class TareaCancelada(Exception):
+    pass
+
+
+class Tarea:
+    def __init__(self, ejecutor, titulo, archivos=()):
+        self.ejecutor = ejecutor
+        self.titulo = titulo
+        self.archivos = sorted({os.path.abspath(a) for a in archivos})
+        self._cancelada = threading.Event()
+        self.terminada = False
+        self.dialogo = None
+        self._estado = (None, None)      # último (fraccion, texto), para el diálogo que abra tarde
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    def comprobar(self):
+        """Llamar entre pasos del trabajo: corta la tarea si se pidió cancelar."""
+        if self._cancelada.is_set():
+            raise TareaCancelada()
+
+    def avance(self, fraccion=None, texto=None):
+        """fraccion en [0, 1] o None (barra indeterminada). Se puede llamar desde el hilo de trabajo."""
+        self.ejecutor._cola.put((self._mostrar_avance, (fraccion, texto)))
+
+    def _mostrar_avance(self, fraccion, texto):
+        self._estado = (fraccion if fraccion is not None else self._estado[0], texto or self._estado[1])
+        if self.dialogo is not None:
+            self.dialogo.actualizar(fraccion, texto)
+
+
+class DialogoProgreso:
+    def __init__(self, master, tarea):
+        self.tarea = tarea
+        self.win = tk.Toplevel(master)
+        self.win.title(tarea.titulo)
+        self.win.transient(master)
+        self.win.resizable(False, False)
+        self.win.protocol("WM_DELETE_WINDOW", self._cancelar)
+        frm = ttk.Frame(self.win, padding=12)
+        frm.pack(fill='both', expand=True)
+        self.etiqueta = ttk.Label(frm, text=tarea.titulo, width=45)
+        self.etiqueta.pack(anchor='w')
+        self.barra = ttk.Progressbar(frm, mode='indeterminate', length=320, maximum=100)
+        self.barra.pack(fill='x', pady=8)
+        self.barra.start(15)
+        self.boton = ttk.Button(frm, text="Cancelar", command=self._cancelar)
+        self.boton.pack(anchor='e')
+
+    def actualizar(self, fraccion, texto):
+        if texto:
+            self.etiqueta.config(text=texto)
+        if fraccion is None:
+            return
+        if str(self.barra.cget('mode')) != 'determinate':
+            self.barra.stop()
+            self.barra.config(mode='determinate')
+        self.barra['value'] = max(0.0, min(1.0, fraccion)) * 100
+
+    def _cancelar(self):
+        self.tarea.cancelar()
+        self.etiqueta.config(text="Cancelando...")
+        self.boton.config(state='disabled')
+
+    def cerrar(self):
+        if self.win.winfo_exists():
+            self.win.destroy()
+
+
+class EjecutorTareas:
+    def __init__(self, root, hilos=2, intervalo_ms=50, demora_dialogo_ms=300):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self.demora_dialogo_ms = demora_dialogo_ms
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tarea")
+        self._cola = queue.Queue()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.planificador = obtener_planificador(root)
+        self.planificador.cada("tareas", self.intervalo_ms, self._procesar)
+
+    def _lock_de(self, ruta):
+        with self._locks_guard:
+            lock = self._locks.get(ruta)
+            if lock is None:
+                lock = self._locks[ruta] = threading.Lock()
+            return lock
+
+    def enviar(self, fn, *args, titulo="Procesando...", archivos=(), al_terminar=None, al_fallar=None,
+               master=None):
+        """
+        Ejecuta fn(tarea, *args) en un hilo de trabajo. `archivos` son las rutas que la tarea
+        escribe. `al_terminar(resultado)` y `al_fallar(excepcion)` corren en el hilo de Tk;
+        si el usuario canceló no se llama a ninguno de los dos.
+        """
+        tarea = Tarea(self, titulo, archivos)
+        self._pool.submit(self._correr, tarea, fn, args, al_terminar, al_fallar)
+        self.planificador.una_vez(f"tareas:dialogo:{id(tarea)}", self.demora_dialogo_ms,
+                                  lambda: self._abrir_dialogo(tarea, master or self.root))
+        return tarea
+
+    def _correr(self, tarea, fn, args, al_terminar, al_fallar):
+        locks = [self._lock_de(r) for r in tarea.archivos]    # orden fijo: no hay abrazo mortal
+        for ruta, lock in zip(tarea.archivos, locks):
+            if not lock.acquire(blocking=False):
+                tarea.avance(None, f"Esperando que termine otra escritura de {os.path.basename(ruta)}...")
+                lock.acquire()
+        try:
+            tarea.comprobar()
+            resultado = fn(tarea, *args)
+        except TareaCancelada:
+            self._cola.put((self._finalizar, (tarea, None, None)))
+        except Exception as ex:
+            self._cola.put((self._finalizar, (tarea, al_fallar, (ex,))))
+        else:
+            self._cola.put((self._finalizar, (tarea, al_terminar, (resultado,))))
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _abrir_dialogo(self, tarea, master):
+        if tarea.terminada or tarea.dialogo is not None:
+            return
+        try:
+            tarea.dialogo = DialogoProgreso(master, tarea)
+            tarea.dialogo.actualizar(*tarea._estado)
+        except tk.TclError:
+            tarea.dialogo = None       # la ventana que lanzó la tarea ya se cerró
+
+    def _finalizar(self, tarea, callback, args):
+        tarea.terminada = True
+        if tarea.dialogo is not None:
+            tarea.dialogo.cerrar()
+        if callback is not None and not tarea.cancelada:
+            callback(*args)
+
+    def _procesar(self):
+        while True:
+            try:
+                fn, args = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as ex:
+                print(f"Error en el callback de una tarea: {ex}")
+
+    def cerrar(self):
+        self.planificador.cancelar("tareas")
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ============================ TRABAJOS COMUNES ============================
+def exportar_excel(tarea, df, ruta, **kwargs):
+    """Escribe en un temporal y lo renombra al final: cancelar a mitad deja el archivo anterior intacto."""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=os.path.splitext(ruta)[1], dir=directorio)
+    os.close(fd)
+    try:
+        escribir_excel(df, tmp, **kwargs)
+        tarea.comprobar()
+        # mkstemp deja el temporal en 0600: se le dan los permisos del archivo que reemplaza
+        os.chmod(tmp, modo_destino(ruta))
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return ruta
+
+
+def exportar_varios(tarea, trabajos):
+    """trabajos: [(df, ruta)] escritos en orden, con el avance por archivo."""
+    for n, (df, ruta) in enumerate(trabajos):
+        tarea.avance(n / len(trabajos), f"Guardando {os.path.basename(ruta)}...")
+        exportar_excel(tarea, df, ruta)
+    tarea.avance(1.0)
+    return [ruta for _, ruta in trabajos]
+
+
+_ejecutor = None
+
+
+def obtener_ejecutor(widget):
+    """Ejecutor único del proceso, atado a la ventana raíz de `widget`."""
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = EjecutorTareas(widget._root())
+    return _ejecutor
@@ -2,6 +2,9 @@
 import tkinter as tk
 from tkinter import ttk
 import os
+import unicodedata
+
+CARPETA_BANDERAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "banderas")
 
 def apply_style(root):
     style = ttk.Style(root)
@@ -19,6 +22,13 @@ def apply_style(root):
     style.map("TButton", foreground=[('active','white')], background=[('active',primary),('!disabled',primary)])
     return style
 
+def ruta_bandera(pais):
+    """Ruta del PNG de la bandera del país (sin tildes ni espacios), o None si no existe."""
+    nombre = ''.join(c for c in unicodedata.normalize('NFD', pais) if unicodedata.category(c) != 'Mn')
+    nombre = nombre.lower().replace(' ', '').replace('’', '').replace("'", "")
+    ruta = os.path.join(CARPETA_BANDERAS, nombre + ".png")
+    return ruta if os.path.exists(ruta) else None
+
 def center_fullscreen(root):
     root.update_idletasks()
     if os.name == 'nt':
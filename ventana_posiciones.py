@@ -0,0 +1,209 @@
+# ventana_posiciones.py
+"""
+Ventana única y persistente de tablas de posiciones de la fase de grupos.
+
+Se construye una sola vez (Notebook con un Treeview por grupo, estilo y banderas) y queda
+suscripta a los resultados: cada cambio marca su grupo y, en el próximo after_idle, se
+reordenan solo las filas de ese grupo. Las filas se identifican por id de equipo, así que
+actualizar es cambiar valores y mover filas, nunca reconstruir. Los cambios de posición se
+animan con intercambios de filas vecinas (un lugar por cuadro) y un resaltado breve.
+Cerrar la ventana solo la oculta; volver a abrirla es inmediato.
+"""
+import tkinter as tk
+from tkinter import ttk
+from eventos import ResultadoRegistrado, PartidoAgregado, CruceActualizado
+from formatos import clave_tabla
+from metricas import medir
+from utils import ruta_bandera
+from planificador import obtener_planificador
+
+FASE_GRUPOS = "Fase de Grupos"
+COLUMNAS = ("Pos", "Equipo", "PJ", "G", "E", "P", "GF", "GC", "DG", "Pts")
+PASO_MS = 90            # duración de cada cuadro de la animación
+RESALTADO_MS = 1500
+
+_banderas = {}
+_estilo_listo = False
+
+
+def _bandera(pais):
+    """PhotoImage de la bandera (cacheada por país para todo el proceso), o None."""
+    if pais in _banderas:
+        return _banderas[pais]
+    ruta = ruta_bandera(pais)
+    imagen = None
+    if ruta:
+        from PIL import Image, ImageTk
+        with medir("banderas"):
+            imagen = ImageTk.PhotoImage(Image.open(ruta).resize((26, 18)))
+    _banderas[pais] = imagen
+    return imagen
+
+
+def _configurar_estilo():
+    global _estilo_listo
+    if _estilo_listo:
+        return
+    style = ttk.Style()
+    style.theme_use("clam")
+    style.configure("Treeview.Heading", anchor="center", font=('Segoe UI', 10, 'bold'),
+                    background="#003366", foreground="white")
+    style.configure("Treeview", font=('Segoe UI', 10), rowheight=30,
+                    background="#FFFFFF", fieldbackground="#FFFFFF")
+    _estilo_listo = True
+
+
+class VentanaPosiciones:
+    def __init__(self, master, torneo):
+        self.torneo = torneo
+        self.win = tk.Toplevel(master)
+        self.win.title("Tablas de Posiciones")
+        self.win.geometry("950x550")
+        self.win.transient(master)
+        self.win.protocol("WM_DELETE_WINDOW", self.win.withdraw)
+        self.planificador = obtener_planificador(master)
+        _configurar_estilo()
+
+        frm = ttk.Frame(self.win, padding=8)
+        frm.pack(fill='both', expand=True)
+        self.nb = ttk.Notebook(frm)
+        self.nb.pack(fill='both', expand=True)
+
+        self._arboles = {}           # grupo -> Treeview
+        self._pestanas = {}          # grupo -> Frame de la pestaña
+        self._equipos = {}           # grupo -> [ids]
+        self._sucios = set()
+        self._flush_pendiente = False
+        self._construir()
+        torneo.eventos.suscribir_widget(self.win, self._al_cambiar, (ResultadoRegistrado, PartidoAgregado, CruceActualizado))
+
+    # ============================ CONSTRUCCIÓN (una vez) ============================
+    def _construir(self):
+        for tab in self._pestanas.values():
+            tab.destroy()
+        self._arboles, self._pestanas, self._equipos = {}, {}, {}
+        for e in self.torneo.equipos.values():
+            if e.grupo:
+                self._equipos.setdefault(e.grupo, []).append(e.identificador)
+        for g in sorted(self._equipos):
+            tab = ttk.Frame(self.nb)
+            self.nb.add(tab, text=f"Grupo {g}")
+            tree = ttk.Treeview(tab, columns=COLUMNAS, show="headings")
+            for c in COLUMNAS:
+                tree.heading(c, text=c)
+                tree.column(c, anchor="center", width=80)
+            tree.column("Equipo", width=200, anchor='w')
+            tree.tag_configure('sube', background="#D8F5D0")
+            tree.tag_configure('baja', background="#F8D7D7")
+            tree.pack(fill='both', expand=True)
+            for pos, fila in enumerate(self._tabla(g), start=1):
+                id_equipo, valores = fila
+                tree.insert("", tk.END, iid=id_equipo, values=(pos,) + valores)
+                imagen = _bandera(valores[0])
+                if imagen:
+                    tree.item(id_equipo, image=imagen)
+            self._arboles[g] = tree
+            self._pestanas[g] = tab
+
+    def _tabla(self, g):
+        """[(id, (país, PJ, G, E, P, GF, GC, DG, Pts))] ordenada, solo con los equipos del grupo."""
+        filas = []
+        for id_equipo in self._equipos[g]:
+            e = self.torneo.equipos[id_equipo]
+            s = e.stats
+            filas.append((id_equipo, (e.pais, s['PJ'], s['G'], s['E'], s['P'], s['GF'], s['GC'], s['DG'], s['Pts'])))
+        # formatos.clave_tabla, la misma clave de Torneo.calcular_tabla_posiciones (sort estable: empates en orden de carga)
+        filas.sort(key=lambda f: clave_tabla(self.torneo.equipos[f[0]]), reverse=True)
+        return filas
+
+    # ============================ ACTUALIZACIÓN INCREMENTAL ============================
+    def _al_cambiar(self, evento):
+        p = evento.partido
+        if p is None or p.fase != FASE_GRUPOS:
+            return
+        e = self.torneo.equipos.get(p.id_equipo1)
+        g = p.grupo or (e.grupo if e else "")
+        if g not in self._equipos or p.id_equipo1 not in self._equipos[g] or p.id_equipo2 not in self._equipos[g]:
+            self._sucios.add(None)        # equipos que la ventana no conoce: se reconstruye
+        else:
+            self._sucios.add(g)
+        # varios resultados seguidos (p. ej. un lote) se aplican juntos
+        if not self._flush_pendiente:
+            self._flush_pendiente = True
+            self.win.after_idle(self._aplicar)
+
+    def _aplicar(self):
+        self._flush_pendiente = False
+        sucios, self._sucios = self._sucios, set()
+        if None in sucios:
+            self._construir()
+            return
+        for g in sorted(sucios):
+            self.refrescar_grupo(g)
+
+    def refrescar_grupo(self, g):
+        tree = self._arboles[g]
+        tabla = self._tabla(g)
+        anterior = {iid: i for i, iid in enumerate(tree.get_children())}
+        for id_equipo, valores in tabla:
+            actuales = tree.item(id_equipo, 'values')
+            if tuple(str(v) for v in actuales[1:]) != tuple(str(v) for v in valores):
+                tree.item(id_equipo, values=(actuales[0],) + valores)
+        objetivo = [id_equipo for id_equipo, _ in tabla]
+        for nueva, id_equipo in enumerate(objetivo):
+            vieja = anterior.get(id_equipo, nueva)
+            if nueva != vieja:
+                tree.item(id_equipo, tags=('sube' if nueva < vieja else 'baja',))
+        # la animación en curso apuntaba a otro orden y su resaltado ya no corresponde
+        self.planificador.cancelar(f"posiciones:animar:{g}")
+        self.planificador.cancelar(f"posiciones:resaltado:{g}")
+        self._animar(g, objetivo, 0)
+
+    def _animar(self, g, objetivo, paso):
+        """Una pasada par/impar de intercambios vecinos por cuadro: cada fila avanza a lo sumo un lugar."""
+        tree = self._arboles[g]
+        actual = list(tree.get_children())
+        if actual == objetivo:
+            for pos, id_equipo in enumerate(objetivo, start=1):
+                valores = tree.item(id_equipo, 'values')
+                if str(valores[0]) != str(pos):
+                    tree.item(id_equipo, values=(pos,) + tuple(valores[1:]))
+            self.planificador.una_vez(f"posiciones:resaltado:{g}", RESALTADO_MS,
+                                      lambda: self._quitar_resaltado(g), widget=self.win)
+            return
+        rango = {iid: i for i, iid in enumerate(objetivo)}
+        i = paso % 2
+        while i + 1 < len(actual):
+            if rango[actual[i]] > rango[actual[i + 1]]:
+                tree.move(actual[i + 1], '', i)
+                actual[i], actual[i + 1] = actual[i + 1], actual[i]
+            i += 2
+        self.planificador.una_vez(f"posiciones:animar:{g}", PASO_MS,
+                                  lambda: self._animar(g, objetivo, paso + 1), widget=self.win)
+
+    def _quitar_resaltado(self, g):
+        if g not in self._arboles:
+            return
+        tree = self._arboles[g]
+        for iid in tree.get_children():
+            tree.item(iid, tags=())
+
+    # ============================ MOSTRAR ============================
+    def mostrar(self, grupo=None):
+        self.win.deiconify()
+        self.win.lift()
+        self.win.focus_force()
+        if grupo in self._pestanas:
+            self.nb.select(self._pestanas[grupo])
+
+
+_ventana = None
+
+
+def mostrar_posiciones(master, torneo, grupo=None):
+    """Muestra la ventana de posiciones, creándola solo si no existe (o si se cerró su ventana padre)."""
+    global _ventana
+    if _ventana is None or not _ventana.win.winfo_exists():
+        _ventana = VentanaPosiciones(master, torneo)
+    _ventana.mostrar(grupo)
+    return _ventana